@@ -0,0 +1,59 @@
+"""Micro-benchmark of the accumulation of asset page results in Scrapper.__call__.
+
+Compares growing a dataframe with `pd.concat` at each asset page with FrameBuilder.
+
+Usage:
+    PYTHONPATH=src python scripts/benchmarks/bench_frame_builder.py --sizes 100 1000 10000 50000
+"""
+import argparse
+import time
+import pandas as pd
+from asset_mapping_scrapping.utils.frame_builder import FrameBuilder
+
+
+def asset_page(i: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"area": [float(i)], "unit": ["sqm"], "status": ["Operating"], "ownership": [100.0]}
+    )
+
+
+def with_concat(pages: list) -> pd.DataFrame:
+    asset_df = pd.DataFrame()
+    for asset_url, page in pages:
+        asset_df = pd.concat([asset_df, page.assign(asset_url=asset_url)])
+    return asset_df
+
+
+def with_builder(pages: list) -> pd.DataFrame:
+    builder = FrameBuilder()
+    for asset_url, page in pages:
+        builder.add_frame(page, asset_url=asset_url)
+    return builder.to_frame(columns=["asset_url"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+    parser.add_argument(
+        "--concat-max", type=int, default=10000, help="Largest size run with pd.concat."
+    )
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'concat (s)':>12} {'builder (s)':>12} {'builder us/row':>15}")
+    for size in args.sizes:
+        pages = [(f"https://example.com/asset/{i}", asset_page(i)) for i in range(size)]
+        concat_time = float("nan")
+        if size <= args.concat_max:
+            start = time.perf_counter()
+            with_concat(pages)
+            concat_time = time.perf_counter() - start
+        start = time.perf_counter()
+        with_builder(pages)
+        builder_time = time.perf_counter() - start
+        print(
+            f"{size:>8} {concat_time:>12.3f} {builder_time:>12.3f} {1e6 * builder_time / size:>15.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
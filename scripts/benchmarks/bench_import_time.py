@@ -0,0 +1,99 @@
+"""Benchmark of the startup cost of the CLI and of the scrapper registry.
+
+Every statement is run in a fresh interpreter, so that nothing is already imported, and the
+median wall time over `--repeat` runs is reported. With `--registry-sizes`, the registry is
+filled with that many declared (not imported) scrappers before one of them is looked up, to
+check that startup does not grow with the number of scrappers.
+
+Usage:
+    PYTHONPATH=src python scripts/benchmarks/bench_import_time.py --repeat 5
+    PYTHONPATH=src python scripts/benchmarks/bench_import_time.py --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+STATEMENTS: dict = {
+    "interpreter": "pass",
+    "package": "import asset_mapping_scrapping",
+    "registry": "import asset_mapping_scrapping.scrapper.registry",
+    "cli": "import main",
+    "get_handler": (
+        "from asset_mapping_scrapping.scrapper.registry import ScrapperFactory\n"
+        "ScrapperFactory.get_handler('HongkongLand')"
+    ),
+    "scrapper_base": "import asset_mapping_scrapping.scrapper.scrapper_base",
+}
+
+REGISTRY_STATEMENT: str = (
+    "from asset_mapping_scrapping.scrapper.registry import ScrapperFactory\n"
+    "for i in range({size}):\n"
+    "    ScrapperFactory.register_module(f'Scrapper{{i}}', f'plugins.scrapper_{{i}}')\n"
+    "ScrapperFactory.get_handler('HongkongLand')"
+)
+
+
+def _env() -> dict:
+    src = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [os.path.abspath(src), env.get("PYTHONPATH")])
+    )
+    return env
+
+
+def time_statement(statement: str, repeat: int) -> float:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], env=_env(), check=True)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def top_imports(statement: str, top: int) -> list:
+    """Slowest modules imported by `statement`, from `python -X importtime`."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        env=_env(),
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        rows.append((int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--registry-sizes", type=int, nargs="*", default=[10, 100, 1000])
+    parser.add_argument(
+        "--top", type=int, default=0, help="Show the N slowest imports of the cli."
+    )
+    args = parser.parse_args()
+
+    print(f"{'statement':>16} {'median (ms)':>12}")
+    for name, statement in STATEMENTS.items():
+        print(f"{name:>16} {1e3 * time_statement(statement, args.repeat):>12.1f}")
+
+    for size in args.registry_sizes:
+        duration = time_statement(REGISTRY_STATEMENT.format(size=size), args.repeat)
+        print(f"{f'registry {size}':>16} {1e3 * duration:>12.1f}")
+
+    if args.top:
+        print(f"\n{'cumulative (ms)':>16} module")
+        for cumulative, module in top_imports(STATEMENTS["cli"], args.top):
+            print(f"{cumulative / 1e3:>16.1f} {module}")
+
+
+if __name__ == "__main__":
+    main()
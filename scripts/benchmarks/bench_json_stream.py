@@ -0,0 +1,87 @@
+"""Micro-benchmark of the decoding of portfolio feeds (HongkongLand, Aryaduta, AXA IM).
+
+Compares decoding the whole response with `json.loads` with parsing its items as the
+response is received with `iter_json_items`, in time and in peak memory (tracemalloc), the
+body being read in 64 KiB chunks as from `response.iter_content`.
+
+Usage:
+    PYTHONPATH=src python scripts/benchmarks/bench_json_stream.py --sizes 1000 10000 100000
+"""
+import argparse
+import io
+import json
+import time
+import tracemalloc
+from asset_mapping_scrapping.utils.json_stream import iter_json_items
+
+CHUNK_SIZE = 2**16
+
+
+def feed(size: int) -> bytes:
+    """Body of a Kentico-like feed with `size` items, written straight to bytes."""
+    buffer = io.BytesIO()
+    buffer.write(b'{"items": [')
+    for i in range(size):
+        if i:
+            buffer.write(b", ")
+        item = {
+            "elements": {
+                "name": {"value": f"Property {i}"},
+                "property_categories": {"value": ["type___investment_properties"]},
+                "google_latitude": {"value": str(22.28 + i / 1e6)},
+                "google_longitude": {"value": str(114.16 + i / 1e6)},
+            }
+        }
+        buffer.write(json.dumps(item).encode())
+    buffer.write(b"]}")
+    return buffer.getvalue()
+
+
+def chunks(body: bytes):
+    stream = io.BytesIO(body)
+    while chunk := stream.read(CHUNK_SIZE):
+        yield chunk
+
+
+def with_loads(body: bytes) -> int:
+    # response.json() joins the chunks into the content before decoding it
+    content = b"".join(chunks(body))
+    return sum(1 for item in json.loads(content)["items"] if item["elements"])
+
+
+def with_stream(body: bytes) -> int:
+    return sum(1 for item in iter_json_items(chunks(body), ("items", "*")) if item["elements"])
+
+
+def measure(function, body: bytes) -> tuple:
+    start = time.perf_counter()
+    function(body)
+    duration = time.perf_counter() - start
+    tracemalloc.start()
+    function(body)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(
+        f"{'items':>8} {'body (MB)':>10} {'loads (s)':>10} {'stream (s)':>11} "
+        f"{'loads peak (MB)':>16} {'stream peak (MB)':>17}"
+    )
+    for size in args.sizes:
+        body = feed(size)
+        loads_time, loads_peak = measure(with_loads, body)
+        stream_time, stream_peak = measure(with_stream, body)
+        print(
+            f"{size:>8} {len(body) / 2**20:>10.1f} {loads_time:>10.3f} {stream_time:>11.3f} "
+            f"{loads_peak:>16.1f} {stream_peak:>17.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
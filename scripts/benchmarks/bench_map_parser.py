@@ -0,0 +1,76 @@
+"""Benchmark of the extraction of address and coordinates from google maps embed pages.
+
+Compares the JSON fast path of `parse_embed_page` with the BeautifulSoup / literal_eval path,
+and checks that both return the same (address, latitude, longitude) on every page.
+
+Usage:
+    PYTHONPATH=src python scripts/benchmarks/bench_map_parser.py saved_pages/*.html
+    PYTHONPATH=src python scripts/benchmarks/bench_map_parser.py --synthetic-kb 50 200 1000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from asset_mapping_scrapping.utils.map_parser import (
+    _extract_init_embed,
+    _extract_init_embed_legacy,
+    _parse_init_embed,
+)
+
+
+def synthetic_page(size_kb: int, with_place: bool = True) -> bytes:
+    """Builds an embed page shaped like the ones served by google maps, padded to ~size_kb."""
+    latitude, longitude = random.uniform(-60, 60), random.uniform(-180, 180)
+    l_content = [None] * 30
+    padding = [[i, f"tile {i}", None, [random.random(), random.random()]] for i in range(size_kb * 12)]
+    l_content[0] = padding
+    if with_place:
+        place = [None] * 14
+        place[0] = [None, "1 Example Road", [latitude, longitude]]
+        place[13] = "1 Example Road, Central, Hong Kong"
+        l_content[21] = [None, None, None, place, None, None]
+    else:
+        l_content[21] = [[[None, longitude, latitude]], None, None, None, None, ["Central, Hong Kong"]]
+    script = f"(function(){{window.APP_OPTIONS=[];}})();initEmbed({json.dumps(l_content)});"
+    return f"<html><head><script>{script}</script></head><body></body></html>".encode()
+
+
+def bench(extract, page: bytes, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extract(page)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pages", nargs="*", help="Saved embed pages.")
+    parser.add_argument("--synthetic-kb", type=int, nargs="*", default=[])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = {path: open(path, "rb").read() for path in args.pages}
+    for size_kb in args.synthetic_kb or ([] if pages else [50, 200, 1000]):
+        pages[f"synthetic-{size_kb}kb"] = synthetic_page(size_kb)
+        pages[f"synthetic-{size_kb}kb-no-place"] = synthetic_page(size_kb, with_place=False)
+
+    mismatches = 0
+    print(f"{'page':<40} {'KB':>7} {'legacy (ms)':>12} {'fast (ms)':>10} {'speedup':>8}")
+    for name, page in pages.items():
+        fast = _parse_init_embed(_extract_init_embed(page))
+        legacy = _parse_init_embed(_extract_init_embed_legacy(page))
+        if fast != legacy:
+            mismatches += 1
+            print(f"MISMATCH on {name}: fast={fast} legacy={legacy}")
+        legacy_time = bench(_extract_init_embed_legacy, page, args.repeat)
+        fast_time = bench(_extract_init_embed, page, args.repeat)
+        print(
+            f"{name[-40:]:<40} {len(page) / 1024:>7.0f} {1e3 * legacy_time:>12.2f} "
+            f"{1e3 * fast_time:>10.2f} {legacy_time / fast_time:>7.1f}x"
+        )
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
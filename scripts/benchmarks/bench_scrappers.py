@@ -0,0 +1,363 @@
+"""End to end benchmark of the real estate scrappers against a local fixture server.
+
+HongkongLand (paginated Kentico API), AXAIM (Umbraco GraphQL), AryadutaHotelGroup and a
+portfolio whose asset pages are google maps embed pages are run through `Scrapper.__call__`
+in dev mode (no export) against the fixture server of `fixture_server.py`, with configurable
+latency and payload scale. For every scrapper and stage (main_page, asset_pages, validation,
+total), the benchmark reports the median duration over `--repeat` runs, the throughput, the
+p50/p99 latency of the http requests sent during the stage and, from an extra run under
+tracemalloc, the peak memory allocated during the stage.
+
+Results are saved in scripts/benchmarks/results/<date>_<commit>.json and compared with the
+latest previous result of the same configuration (or `--baseline`), stages slower by more
+than `--threshold` being reported as regressions.
+
+Usage:
+    PYTHONPATH=src python scripts/benchmarks/bench_scrappers.py --latency-ms 20 --scale 1 4
+    PYTHONPATH=src python scripts/benchmarks/bench_scrappers.py --recordings saved_responses/
+"""
+import argparse
+import contextlib
+import contextvars
+import datetime
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass
+import pandas as pd
+from asset_mapping_scrapping.scrapper.registry import ScrapperFactory
+from asset_mapping_scrapping.scrapper.scrapper_base import Scrapper
+from asset_mapping_scrapping.utils.http import configure_http_client
+from asset_mapping_scrapping.utils.map_parser import parse_embed_page
+from fixture_server import Fixtures, FixtureServer
+
+RESULTS_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+STAGES: list = ["main_page", "asset_pages", "validation", "total"]
+
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("stage", default="total")
+
+
+@dataclass
+class EmbedPortfolio(Scrapper):
+    """Portfolio whose coordinates are read from the google maps embed page of every asset."""
+
+    sector: str = "Real Estate"
+    company_name: str = "Embed Portfolio"
+    n_assets: int = 50
+
+    def get_data_from_main_page(self, url: str) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "asset_name": [f"Asset {i}" for i in range(self.n_assets)],
+                "subtype": "office",
+                "asset_url": [f"{url}?id={i}" for i in range(self.n_assets)],
+                "sector": self.sector,
+                "company_name": self.company_name,
+            }
+        )
+
+    def get_data_from_asset_page(self, asset_url: str) -> pd.DataFrame:
+        response = self.http.get(asset_url)
+        response.raise_for_status()
+        address, latitude, longitude = parse_embed_page(response.content)
+        return pd.DataFrame(
+            {"address": [address], "latitude": [latitude], "longitude": [longitude]}
+        )
+
+
+class StageRecorder:
+    """Records the duration, the http request latencies and, when tracemalloc is tracing, the
+    peak memory of nested stages.
+    """
+
+    def __init__(self):
+        self.durations: dict = defaultdict(float)
+        self.peaks: dict = defaultdict(int)
+        self.latencies: dict = defaultdict(list)
+        self._stack: list = []
+
+    def _update_peaks(self) -> None:
+        if not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        for stage, start in self._stack:
+            self.peaks[stage] = max(self.peaks[stage], peak - start)
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        self._update_peaks()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._stack.append(
+            (name, tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0)
+        )
+        token = _current_stage.set(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.perf_counter() - start
+            _current_stage.reset(token)
+            self._update_peaks()
+            self._stack.pop()
+
+    def record_request(self, duration: float) -> None:
+        self.latencies[_current_stage.get()].append(duration)
+
+
+def instrument(scrapper: Scrapper, client, recorder: StageRecorder) -> None:
+    """Wraps the stages of a scrapper instance and the requests of the http client."""
+    get_data_from_main_page = scrapper.get_data_from_main_page
+    fetch_asset_pages = scrapper._fetch_asset_pages
+    validate = scrapper._validate
+    request = client.request
+
+    def main_page(url):
+        with recorder.stage("main_page"):
+            return get_data_from_main_page(url)
+
+    def asset_pages(asset_urls):
+        with recorder.stage("asset_pages"):
+            yield from fetch_asset_pages(asset_urls)
+
+    def validation(base_df):
+        with recorder.stage("validation"):
+            return validate(base_df)
+
+    def timed_request(method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            return request(method, url, **kwargs)
+        finally:
+            recorder.record_request(time.perf_counter() - start)
+
+    scrapper.get_data_from_main_page = main_page
+    scrapper._fetch_asset_pages = asset_pages
+    scrapper._validate = validation
+    client.request = timed_request
+
+
+def scrappers(server: FixtureServer) -> dict:
+    """Scrapper factory and url of every benchmarked source."""
+    return {
+        "HongkongLand": (
+            lambda: ScrapperFactory.get_handler("HongkongLand")(mode="dev"),
+            f"{server.url}/kentico/items?system.type=property_details_page_v2&language=en",
+        ),
+        "AXAIM": (
+            lambda: ScrapperFactory.get_handler("AXAIM")(mode="dev"),
+            f"{server.url}/umbraco",
+        ),
+        "AryadutaHotelGroup": (
+            lambda: ScrapperFactory.get_handler("AryadutaHotelGroup")(mode="dev"),
+            f"{server.url}/aryaduta",
+        ),
+        "EmbedPortfolio": (
+            lambda: EmbedPortfolio(mode="dev", n_assets=server.fixtures.n_items["embed"]),
+            f"{server.url}/maps/embed",
+        ),
+    }
+
+
+def run_once(create, url: str, pool_maxsize: int) -> tuple:
+    recorder = StageRecorder()
+    client = configure_http_client(pool_maxsize=pool_maxsize, cache_dir=None)
+    scrapper = create()
+    instrument(scrapper, client, recorder)
+    # __call__ prints the scrapped frame
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with recorder.stage("total"):
+            df = scrapper(url)
+    return recorder, len(df)
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def bench_scrapper(create, url: str, repeat: int, pool_maxsize: int, memory: bool) -> dict:
+    durations = defaultdict(list)
+    latencies = defaultdict(list)
+    n_requests = defaultdict(list)
+    for _ in range(repeat):
+        recorder, n_rows = run_once(create, url, pool_maxsize)
+        for stage in STAGES:
+            durations[stage].append(recorder.durations.get(stage, 0.0))
+            latencies[stage].extend(recorder.latencies.get(stage, []))
+            n_requests[stage].append(len(recorder.latencies.get(stage, [])))
+    peaks = {}
+    if memory:
+        # tracemalloc slows down allocations, so memory is measured on a separate run
+        tracemalloc.start()
+        try:
+            recorder, _ = run_once(create, url, pool_maxsize)
+        finally:
+            tracemalloc.stop()
+        peaks = recorder.peaks
+
+    result = {"rows": n_rows, "stages": {}}
+    for stage in STAGES:
+        duration = statistics.median(durations[stage])
+        requests_per_run = statistics.median(n_requests[stage])
+        result["stages"][stage] = {
+            "duration_s": duration,
+            "requests": requests_per_run,
+            "requests_per_s": requests_per_run / duration if duration else None,
+            "p50_ms": 1e3 * percentile(latencies[stage], 0.5),
+            "p99_ms": 1e3 * percentile(latencies[stage], 0.99),
+            "peak_mb": peaks[stage] / 2**20 if stage in peaks else None,
+        }
+    total = result["stages"]["total"]["duration_s"]
+    result["rows_per_s"] = n_rows / total if total else None
+    return result
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def latest_result(config: dict, exclude: str) -> dict:
+    """Latest saved result run with the same configuration, if any."""
+    for path in sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), reverse=True):
+        if os.path.abspath(path) == os.path.abspath(exclude):
+            continue
+        with open(path) as f:
+            result = json.load(f)
+        if result.get("config") == config:
+            return result
+    return {}
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Prints the change of the duration of every stage since `baseline`, and returns the
+    stages slower by more than `threshold`.
+    """
+    regressions = []
+    print(f"\nCompared with {baseline['commit']} ({baseline['date']}):")
+    for scale, sources in current["results"].items():
+        for source, result in sources.items():
+            previous = baseline["results"].get(scale, {}).get(source)
+            if previous is None:
+                continue
+            for stage, stats in result["stages"].items():
+                before = previous["stages"].get(stage, {}).get("duration_s")
+                after = stats["duration_s"]
+                if not before or not after:
+                    continue
+                change = after / before - 1
+                flag = ""
+                if change > threshold:
+                    flag = "  REGRESSION"
+                    regressions.append((scale, source, stage, change))
+                print(
+                    f"  x{scale:<5} {source:<20} {stage:<12} {1e3 * before:>9.1f} ms -> "
+                    f"{1e3 * after:>9.1f} ms ({change:+.1%}){flag}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=float, nargs="+", default=[1])
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--embed-kb", type=int, default=50)
+    parser.add_argument("--recordings", help="Directory of recorded responses.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pool-maxsize", type=int, default=10)
+    parser.add_argument("--sources", nargs="*", help="Subset of the sources to run.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run.")
+    parser.add_argument("--baseline", help="Result file to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument(
+        "--fail-on-regression", action="store_true", help="Exit with 1 on a regression."
+    )
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    config = {
+        "scale": args.scale,
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "embed_kb": args.embed_kb,
+        "recordings": args.recordings,
+        "pool_maxsize": args.pool_maxsize,
+    }
+    report = {
+        "commit": git_commit(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "results": {},
+    }
+
+    print(
+        f"{'scale':>6} {'source':<20} {'stage':<12} {'ms':>9} {'req':>6} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'peak MB':>8}"
+    )
+    for scale in args.scale:
+        fixtures = Fixtures(scale=scale, recordings=args.recordings, embed_kb=args.embed_kb)
+        with FixtureServer(
+            fixtures, latency=args.latency_ms / 1e3, jitter=args.jitter_ms / 1e3
+        ) as server:
+            results = report["results"][str(scale)] = {}
+            for source, (create, url) in scrappers(server).items():
+                if args.sources and source not in args.sources:
+                    continue
+                result = results[source] = bench_scrapper(
+                    create, url, args.repeat, args.pool_maxsize, not args.no_memory
+                )
+                for stage, stats in result["stages"].items():
+                    print(
+                        f"{scale:>6g} {source:<20} {stage:<12} {1e3 * stats['duration_s']:>9.1f} "
+                        f"{stats['requests']:>6g} {stats['requests_per_s'] or 0:>8.1f} "
+                        f"{stats['p50_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+                        f"{stats['peak_mb'] if stats['peak_mb'] is not None else float('nan'):>8.1f}"
+                    )
+                print(f"{'':>6} {source:<20} {result['rows']} rows, {result['rows_per_s']:.0f} rows/s")
+
+    path = ""
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(
+            RESULTS_DIR,
+            f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S')}_{report['commit']}.json",
+        )
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        baseline = latest_result(config, exclude=path)
+    regressions = compare(report, baseline, args.threshold) if baseline else []
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
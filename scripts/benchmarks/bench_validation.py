@@ -0,0 +1,83 @@
+"""Benchmark of the validation of scrapped dataframes.
+
+Compares `schema.validate(df)` (pandera) with the compiled single-pass validator on large
+synthetic real estate portfolios, and checks that both raise the same kind of error and the
+same warnings, on a valid frame and on frames breaking a range check and a missing ratio check.
+
+Usage:
+    PYTHONPATH=src python scripts/benchmarks/bench_validation.py --rows 1000000
+"""
+import argparse
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from asset_mapping_scrapping.scrapper.schema import real_estate_schema
+from asset_mapping_scrapping.scrapper.validation import validate
+
+
+def portfolio(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "asset_name": [f"asset {i}" for i in range(n_rows)],
+            "latitude": rng.uniform(-90, 90, n_rows),
+            "longitude": rng.uniform(-180, 180, n_rows),
+            "address": np.where(rng.random(n_rows) < 0.1, None, "1 Example Road"),
+            "city": "Hong Kong",
+            "country": "China",
+            "state": "",
+            "status": "Operating",
+            "subtype": "office",
+            "area": rng.uniform(100, 10000, n_rows),
+            "unit": "sqm",
+            "sector": "Real Estate",
+            "company_name": "Example",
+        }
+    )
+
+
+def outcome(validator, df: pd.DataFrame) -> tuple:
+    """Runs a validator and returns (duration, error type, warning messages)."""
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        start = time.perf_counter()
+        try:
+            validator(df)
+            error = None
+        except Exception as e:
+            error = type(e).__name__
+        duration = time.perf_counter() - start
+    return duration, error, sorted(str(w.message).splitlines()[-1] for w in caught)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    cases = {
+        "valid": lambda df: df,
+        "latitude out of range": lambda df: df.assign(latitude=df["latitude"] + 200),
+        "many missing cities": lambda df: df.assign(city=None),
+    }
+    print(f"{'rows':>9} {'case':<24} {'pandera (s)':>12} {'fused (s)':>10} {'speedup':>8} same")
+    for n_rows in args.rows:
+        base = portfolio(n_rows)
+        for case, make in cases.items():
+            df = make(base)
+            pandera_time, pandera_error, pandera_warnings = outcome(
+                real_estate_schema.validate, df
+            )
+            fused_time, fused_error, fused_warnings = outcome(
+                lambda df: validate(real_estate_schema, df), df
+            )
+            same = pandera_error == fused_error and pandera_warnings == fused_warnings
+            print(
+                f"{n_rows:>9} {case:<24} {pandera_time:>12.3f} {fused_time:>10.3f} "
+                f"{pandera_time / fused_time:>7.1f}x {same}"
+            )
+
+
+if __name__ == "__main__":
+    main()
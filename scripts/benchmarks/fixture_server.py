@@ -0,0 +1,259 @@
+"""Local http stand-in for the websites of the real estate scrappers, used by the offline
+benchmarks.
+
+Routes:
+    GET  /kentico/items?skip=&limit=   Kentico delivery API (HongkongLand)
+    POST /umbraco                      Umbraco heartcore GraphQL API (AXAIM)
+    GET  /aryaduta                     Aryaduta property api (AryadutaHotelGroup)
+    GET  /maps/embed?id=               google maps embed page
+
+Responses are synthetic unless a recording is found in the `recordings` directory
+(kentico.json, umbraco.json, aryaduta.json, embed.html, as saved from the real websites), in
+which case the recorded items are replayed, cycled until `scale` times the base number of
+items is reached. Every response is delayed by `latency` seconds plus a uniform jitter.
+"""
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+# number of items of every source for scale=1
+BASE_ITEMS: dict = {"kentico": 250, "umbraco": 100, "aryaduta": 50, "embed": 50}
+
+
+def kentico_item(i: int) -> dict:
+    categories = ["property_categories___investment_properties"]
+    if i % 3 == 0:
+        categories = ["property_categories___development_properties"]
+    return {
+        "system": {"id": f"kentico-{i}", "type": "property_details_page_v2"},
+        "elements": {
+            "name": {"type": "text", "value": f"Property {i}"},
+            "property_categories": {"type": "taxonomy", "value": categories},
+            "google_latitude": {"type": "text", "value": str(22.28 + i * 1e-5)},
+            "google_longitude": {"type": "text", "value": str(114.16 + i * 1e-5)},
+        },
+    }
+
+
+def umbraco_item(i: int) -> dict:
+    return {
+        "id": f" umbraco-{i} ",
+        "name": f" Asset {i} ",
+        "assetType": "Logistics" if i % 2 else "Office",
+        "addressLine1": f" {i} Example Street ",
+        "city": {"country": " France ", "name": " Paris "},
+        "latitude": 48.85 + i * 1e-5,
+        "longitude": 2.35 + i * 1e-5,
+        "squareMeters": 0.0 if i % 10 == 0 else 1000.0 + i,
+    }
+
+
+def aryaduta_item(i: int) -> dict:
+    return {
+        "properties": [
+            {
+                "name": f" Aryaduta {i} ",
+                "address": f" Jalan Example {i} ",
+                "city": {"name": " Jakarta "},
+            }
+        ]
+    }
+
+
+def embed_page(i: int, size_kb: int = 50) -> bytes:
+    """Google maps embed page of the asset `i`, padded to ~size_kb."""
+    l_content = [None] * 30
+    l_content[0] = [[j, f"tile {j}", None, [j / 7, j / 11]] for j in range(size_kb * 12)]
+    place = [None] * 14
+    place[0] = [None, f"{i} Example Road", [22.28 + i * 1e-5, 114.16 + i * 1e-5]]
+    place[13] = f"{i} Example Road, Central, Hong Kong"
+    l_content[21] = [None, None, None, place, None, None]
+    script = f"(function(){{window.APP_OPTIONS=[];}})();initEmbed({json.dumps(l_content)});"
+    return f"<html><head><script>{script}</script></head><body></body></html>".encode()
+
+
+class Fixtures:
+    """Payloads served by the fixture server."""
+
+    def __init__(
+        self, scale: float = 1, recordings: Optional[str] = None, embed_kb: int = 50
+    ):
+        """
+        Args:
+            scale (float): multiplier of the number of items of every source.
+            recordings (Optional[str]): directory of recorded responses.
+            embed_kb (int): size of the synthetic embed pages.
+        """
+        self.n_items = {
+            source: max(1, int(count * scale)) for source, count in BASE_ITEMS.items()
+        }
+        self.embed_kb = embed_kb
+        self.recordings = self._load_recordings(recordings) if recordings else {}
+        self.kentico_items = self._items("kentico", kentico_item)
+        self.umbraco_items = self._items("umbraco", umbraco_item)
+        self.aryaduta_body = json.dumps(
+            {"data": {"items": self._items("aryaduta", aryaduta_item)}}
+        ).encode()
+        self._embed_pages: dict = {}
+
+    @staticmethod
+    def _load_recordings(directory: str) -> dict:
+        recordings = {}
+        for source, file_name, extract in [
+            ("kentico", "kentico.json", lambda data: data["items"]),
+            (
+                "umbraco",
+                "umbraco.json",
+                lambda data: [
+                    item
+                    for alias in data["data"].values()
+                    for item in alias["properties"]["items"]
+                ],
+            ),
+            ("aryaduta", "aryaduta.json", lambda data: data["data"]["items"]),
+        ]:
+            path = os.path.join(directory, file_name)
+            if os.path.exists(path):
+                with open(path) as f:
+                    recordings[source] = extract(json.load(f))
+        path = os.path.join(directory, "embed.html")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                recordings["embed"] = f.read()
+        return recordings
+
+    def _items(self, source: str, synthetic) -> list:
+        recorded = self.recordings.get(source)
+        if recorded:
+            return list(itertools.islice(itertools.cycle(recorded), self.n_items[source]))
+        return [synthetic(i) for i in range(self.n_items[source])]
+
+    def kentico_page(self, skip: int, limit: int) -> bytes:
+        items = self.kentico_items[skip : skip + limit]
+        return json.dumps(
+            {
+                "items": items,
+                "modular_content": {},
+                "pagination": {"skip": skip, "limit": limit, "count": len(items)},
+            }
+        ).encode()
+
+    def umbraco_response(self, request: dict) -> bytes:
+        aliases = list(request.get("variables", {})) or ["url0"]
+        # items are spread over the queried maps
+        chunks = [self.umbraco_items[i :: len(aliases)] for i in range(len(aliases))]
+        return json.dumps(
+            {
+                "data": {
+                    f"map{i}": {"properties": {"items": chunk}}
+                    for i, chunk in enumerate(chunks)
+                }
+            }
+        ).encode()
+
+    def embed_page(self, i: int) -> bytes:
+        if "embed" in self.recordings:
+            return self.recordings["embed"]
+        page = self._embed_pages.get(i)
+        if page is None:
+            page = self._embed_pages[i] = embed_page(i, self.embed_kb)
+        return page
+
+
+class FixtureServer:
+    """Threaded http server serving Fixtures on localhost, in a background thread.
+
+    Example:
+        with FixtureServer(Fixtures(scale=4), latency=0.05) as server:
+            requests.get(f"{server.url}/aryaduta")
+    """
+
+    def __init__(self, fixtures: Fixtures, latency: float = 0.0, jitter: float = 0.0):
+        """
+        Args:
+            fixtures (Fixtures): payloads to serve.
+            latency (float): delay of every response, in seconds.
+            jitter (float): maximum random delay added to `latency`, in seconds.
+        """
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.n_requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, body: bytes, content_type: str, status: int = 200) -> None:
+                delay = server.latency + random.uniform(0, server.jitter)
+                if delay > 0:
+                    time.sleep(delay)
+                with server._lock:
+                    server.n_requests += 1
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                fixtures = server.fixtures
+                if parts.path == "/kentico/items":
+                    body = fixtures.kentico_page(
+                        int(query.get("skip", 0)), int(query.get("limit", 100))
+                    )
+                    self._send(body, "application/json")
+                elif parts.path == "/aryaduta":
+                    self._send(fixtures.aryaduta_body, "application/json")
+                elif parts.path == "/maps/embed":
+                    self._send(fixtures.embed_page(int(query.get("id", 0))), "text/html")
+                else:
+                    self._send(b"not found", "text/plain", status=404)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if urlsplit(self.path).path == "/umbraco":
+                    self._send(
+                        server.fixtures.umbraco_response(json.loads(body or b"{}")),
+                        "application/json",
+                    )
+                else:
+                    self._send(b"not found", "text/plain", status=404)
+
+        return Handler
+
+    def start(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
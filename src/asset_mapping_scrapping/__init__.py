@@ -1,9 +0,0 @@
-from asset_mapping_scrapping.scrapper.individual_scrappers.real_estate.hongkong_land import (
-    HongkongLand,
-)
-from asset_mapping_scrapping.scrapper.individual_scrappers.real_estate.aryaduta_hotel_group import (
-    AryadutaHotelGroup,
-)
-from asset_mapping_scrapping.scrapper.individual_scrappers.real_estate.axa_im import (
-    AXAIM,
-)
\ No newline at end of file
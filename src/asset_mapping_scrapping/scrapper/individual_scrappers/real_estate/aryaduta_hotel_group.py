@@ -1,9 +1,6 @@
-from typing import List, Dict
-from bs4 import BeautifulSoup
 import pandas as pd
-import requests
 from asset_mapping_scrapping.scrapper.scrapper_base import Scrapper, ScrapperFactory
-from asset_mapping_scrapping.utils.global_vars import HEADERS
+from asset_mapping_scrapping.utils.frame_builder import FrameBuilder
 
 from dataclasses import dataclass
 import logging
@@ -22,17 +19,14 @@ class AryadutaHotelGroup(Scrapper):
     def __post_init__(self):
         return super().__post_init__()
     
-    def _get_list_assets(self, url: str) -> List[Dict[str, str]]:
-        response = requests.get(url, headers=HEADERS)
-        asset_list = response.json()
-        data = []
-        asset_list = asset_list['data']['items']
-        for asset in asset_list:
+    def _get_list_assets(self, url: str) -> pd.DataFrame:
+        data = FrameBuilder()
+        for asset in self._iter_json_items(url, ("data", "items", "*")):
             properties = asset["properties"][0]
             asset_name = properties["name"].strip()
             address = properties["address"].strip()
             city = properties['city']['name'].strip()
-            data.append(
+            data.add_record(
                 {
                     "asset_name": asset_name,
                     "address": address,
@@ -41,7 +35,7 @@ class AryadutaHotelGroup(Scrapper):
                     "state": "",
                 }
             )
-        return data
+        return data.to_frame()
 
     def get_data_from_main_page(self, url: str) -> pd.DataFrame:
         data = self._get_list_assets(url)
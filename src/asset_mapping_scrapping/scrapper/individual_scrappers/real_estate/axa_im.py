@@ -1,8 +1,8 @@
 from typing import List, Dict
 import pandas as pd
-import requests
 from asset_mapping_scrapping.scrapper.scrapper_base import Scrapper, ScrapperFactory
-from dataclasses import dataclass, field
+from asset_mapping_scrapping.utils.frame_builder import FrameBuilder
+from dataclasses import dataclass
 import logging
 
 logger = logging.getLogger("VerboseLogger")
@@ -17,25 +17,66 @@ class AXAIM(Scrapper):
     def __post_init__(self):
         return super().__post_init__()
     
-    def _get_payload(self, path) -> Dict[str, str]:
+    # only the fields read in _get_list_assets are queried
+    fields = """
+          id
+          name
+          assetType
+          addressLine1
+          city {
+            ... on City {
+              country
+              name
+            }
+          }
+          latitude
+          longitude
+          squareMeters"""
+
+    def _get_payload(self, paths: List[str]) -> Dict[str, str]:
+        """Builds a single GraphQL query fetching the assets of all map paths, each path being
+        queried under its own alias (map0, map1...).
+        """
+        variables = {f"url{i}": path for i, path in enumerate(paths)}
+        maps = "".join(
+            f"""
+  map{i}: map(url: $url{i}) {{
+    properties: children {{
+      items {{
+        ... on Asset {{{self.fields}
+        }}
+      }}
+    }}
+  }}"""
+            for i in range(len(paths))
+        )
         object_data = {
           "operationName": "Map",
-          "query": "query Map($url: String) {\n  map(url: $url) {\n    header\n    description\n    properties: children {\n      items {\n        ... on Asset {\n          id\n          name\n          url\n          filters {\n            name\n            __typename\n          }\n          assetType\n          acquisitionDate\n          addressLine1\n          bannerText\n          caseStudyUrl\n          city {\n            ... on City {\n              country\n              name\n              __typename\n            }\n            __typename\n          }\n          description\n          energyRating\n          images {\n            url\n            media {\n              name\n              __typename\n            }\n            __typename\n          }\n          isInDevelopment\n          latitude\n          longitude\n          zipCode\n          squareMeters\n          type {\n            ... on AXACore {\n              surfaceArea\n              __typename\n            }\n            ... on Logistics {\n              clearHeight\n              floorLoadingCapacity\n              floorLoadingCapacitySQM\n              grossLettableArea\n              numberOfDockDoors\n              __typename\n            }\n            ... on ResidentialMap {\n              assetManager\n              numberOfUnits\n              __typename\n            }\n            ... on AAI {\n              investmentDate\n              valueOfInvestment\n              installedCapacity\n              numberOfUsers\n              fleet\n              networkSize\n              __typename\n            }\n            ... on ASI {\n              investmentDate\n              valueOfInvestment\n              numberOfBeds\n              squareMetres\n              __typename\n            }\n            ... on ASIS {\n              investmentDate\n              valueOfInvestment\n              numberOfBeds\n              squareMetres\n              __typename\n            }\n            __typename\n          }\n          __typename\n        }\n        __typename\n      }\n      __typename\n    }\n    __typename\n  }\n  locations: allCity {\n    items {\n      name\n      country\n      latitude\n      longitude\n      id\n      __typename\n    }\n    __typename\n  }\n  tags: allFilter {\n    items {\n      name\n      id\n      __typename\n    }\n    __typename\n  }\n}",
-          "variables": {
-            "url": path
-          }
-        } 
+          "query": f"query Map({', '.join(f'${name}: String' for name in variables)}) {{{maps}\n}}",
+          "variables": variables
+        }
 
         return object_data
 
-    def _get_list_assets(self, url) -> List[Dict[str, str]]:
-        data = []
+    def _get_list_assets(self, url) -> pd.DataFrame:
+        data = FrameBuilder()
 
-        for path in self.paths:
-            object_data = self._get_payload(path)
-            response = requests.post(url, json = object_data , headers={"Umb-Project-Alias": "axa-interactive-map"  })
-            asset_list = response.json()
-            items = asset_list["data"]["map"]["properties"]["items"]
+        object_data = self._get_payload(self.paths)
+        errors = []
+        # the items of every map (map0, map1...) are parsed as they are received; every map
+        # must be in the response, otherwise its assets would be exported as removed
+        items = self._iter_json_items(
+            url,
+            ("data", "*", "properties", "items", "*"),
+            method="POST",
+            required=[
+                ("data", f"map{i}", "properties", "items") for i in range(len(self.paths))
+            ],
+            collect={("errors", "*"): errors},
+            json=object_data,
+            headers={"Umb-Project-Alias": "axa-interactive-map"},
+        )
+        try:
             for item in items:
                 id = item["id"].strip()
                 asset_name = item["name"].strip()
@@ -49,21 +90,25 @@ class AXAIM(Scrapper):
                 subtype = item["assetType"].strip()
                 if area == 0.0:
                     area = None
-                data.append(
-                {
-                    "id": id,
-                    "asset_name": asset_name,
-                    "area": area,
-                    "unit": unit,
-                    "address": address,
-                    "city": city,
-                    "country": country,
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "subtype": subtype,
-                }
-            )
-        return data
+                data.add_record(
+                    {
+                        "id": id,
+                        "asset_name": asset_name,
+                        "area": area,
+                        "unit": unit,
+                        "address": address,
+                        "city": city,
+                        "country": country,
+                        "latitude": latitude,
+                        "longitude": longitude,
+                        "subtype": subtype,
+                    }
+                )
+        except ValueError as e:
+            raise ValueError(f"Incomplete GraphQL response, {e} Errors: {errors}") from e
+        if errors:
+            raise ValueError(f"GraphQL errors: {errors}")
+        return data.to_frame()
 
     def get_data_from_main_page(self, url: str) -> pd.DataFrame:
         data = self._get_list_assets(url)
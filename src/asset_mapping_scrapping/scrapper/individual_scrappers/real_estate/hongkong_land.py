@@ -1,8 +1,7 @@
 from typing import Tuple, List, Dict
-from bs4 import BeautifulSoup
 import pandas as pd
-import requests
 from asset_mapping_scrapping.scrapper.scrapper_base import Scrapper, ScrapperFactory
+from asset_mapping_scrapping.utils.frame_builder import FrameBuilder
 from dataclasses import dataclass, field
 import logging
 
@@ -14,6 +13,7 @@ logger = logging.getLogger("VerboseLogger")
 class HongkongLand(Scrapper):
     sector: str = "Real Estate"
     company_name: str = "Hongkong Land"
+    page_size: int = 100
 
     def __post_init__(self):
         return super().__post_init__()
@@ -23,20 +23,26 @@ class HongkongLand(Scrapper):
         result = [item.split("___")[1].replace("_", " ").title() for item in arr]
         return ','.join(result)
     def _get_list_assets(self, url: str) -> pd.DataFrame:
-        response = requests.get(url)
-        response = response.json()["items"]
-        result = []
-        for item in response:
+        result = FrameBuilder()
+        items = self._iter_pages(
+            url,
+            items_path=("items", "*"),
+            scheme="offset",
+            page_size=self.page_size,
+            offset_param="skip",
+            limit_param="limit",
+        )
+        for item in items:
             item = item["elements"]
             subtype = self._convert_to_subtype(item["property_categories"]["value"])
-            result.append({
+            result.add_record({
                 "asset_name": item["name"]["value"],
                 "subtype": subtype,
                 "latitude": item["google_latitude"]["value"],
                 "longitude": item["google_longitude"]["value"],
                 "status": "Operating" if "Investment Properties" in subtype else "Under development"
             })
-        return pd.DataFrame(result)
+        return result.to_frame()
     def get_data_from_main_page(self, url: str) -> pd.DataFrame:
         asset_list = self._get_list_assets(url)
         df_final: pd.DataFrame = pd.DataFrame(asset_list)
@@ -0,0 +1,91 @@
+import importlib
+import threading
+
+# group of the entry points through which other distributions can provide scrappers:
+# [project.entry-points."asset_mapping_scrapping.scrappers"]
+# MyScrapper = "my_package.my_module:MyScrapper"
+ENTRY_POINT_GROUP: str = "asset_mapping_scrapping.scrappers"
+
+_REAL_ESTATE: str = "asset_mapping_scrapping.scrapper.individual_scrappers.real_estate"
+
+# name of every scrapper of the package -> module defining it. A scrapper module is only
+# imported when the scrapper is requested, so that startup does not grow with the number of
+# scrappers nor pay for the dependencies of the ones that are not run.
+SCRAPPER_MODULES: dict = {
+    "HongkongLand": f"{_REAL_ESTATE}.hongkong_land",
+    "AryadutaHotelGroup": f"{_REAL_ESTATE}.aryaduta_hotel_group",
+    "AXAIM": f"{_REAL_ESTATE}.axa_im",
+}
+
+
+class ScrapperFactory:
+    """Registry of the scrappers. Scrapper classes register themselves with `register_handler`
+    when their module is imported; `get_handler` imports that module on first use, looking it
+    up in SCRAPPER_MODULES, then in the entry points of the installed distributions.
+    """
+
+    scrapper_mapping = {}
+    _lock = threading.RLock()
+
+    @classmethod
+    def register_handler(cls):
+        """Method to record a class as a new scrapper that inherits from
+        the Scrapper class.
+        """
+
+        def wrapper(handler_cls):
+            cls.scrapper_mapping[handler_cls.__name__] = handler_cls
+            return handler_cls
+
+        return wrapper
+
+    @classmethod
+    def register_module(cls, name: str, module: str) -> None:
+        """Declares the module defining a scrapper, without importing it.
+
+        Args:
+            name (str): name of the scrapper class.
+            module (str): dotted path of the module defining it.
+        """
+        SCRAPPER_MODULES[name] = module
+
+    @classmethod
+    def available(cls) -> list:
+        """Names of all known scrappers, imported or not."""
+        from importlib.metadata import entry_points
+
+        names = set(SCRAPPER_MODULES) | set(cls.scrapper_mapping)
+        names.update(entry_point.name for entry_point in entry_points(group=ENTRY_POINT_GROUP))
+        return sorted(names)
+
+    @classmethod
+    def _load(cls, name: str) -> None:
+        if name in SCRAPPER_MODULES:
+            importlib.import_module(SCRAPPER_MODULES[name])
+            return
+        # scanning the installed distributions is only needed for external scrappers
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP, name=name):
+            cls.scrapper_mapping.setdefault(name, entry_point.load())
+            return
+
+    @classmethod
+    def get_handler(cls, output_type):
+        """Returns the scrapper class named `output_type`, importing its module if needed.
+
+        Raises:
+            KeyError: if no scrapper has this name.
+        """
+        handler = cls.scrapper_mapping.get(output_type)
+        if handler is None:
+            with cls._lock:
+                if output_type not in cls.scrapper_mapping:
+                    cls._load(output_type)
+            handler = cls.scrapper_mapping.get(output_type)
+        if handler is None:
+            raise KeyError(
+                f"Unknown scrapper {output_type}, available scrappers: "
+                f"{', '.join(cls.available())}."
+            )
+        return handler
@@ -2,6 +2,26 @@ import pandera as pa
 import numpy as np
 import datetime
 
+
+def missing_ratio_check(max_ratio: float = 0.25, **kwargs) -> pa.Check:
+    """Check that less than `max_ratio` of the values of a column (or of every column of a
+    dataframe) are missing. The threshold is stored in the statistics of the check, which lets
+    the compiled validator compute all missing ratios in a single pass.
+
+    Args:
+        max_ratio (float): maximum allowed ratio of missing values.
+        **kwargs: other arguments of pa.Check (name, error, raise_warning...).
+
+    Returns:
+        pa.Check: the check.
+    """
+    return pa.Check(
+        lambda obj: np.all(obj.isna().sum() / len(obj) < max_ratio),
+        statistics={"max_missing_ratio": max_ratio},
+        **kwargs,
+    )
+
+
 base_schema: dict = {
     "id": pa.Column(object, required=False),
     "latitude": pa.Column(
@@ -14,7 +34,7 @@ base_schema: dict = {
                 title="Latitude range check",
                 error="Latitudes in EPSG:4326 coordinate system should be between -90 and 90 degrees.",
             ),
-            pa.Check(lambda s: s.isna().sum() / len(s) < 0.25),
+            missing_ratio_check(),
         ],
         nullable=True,
         required=False,
@@ -30,7 +50,7 @@ base_schema: dict = {
                 title="Longitude range check",
                 error="Longitudes in EPSG:4326 coordinate system should be between -180 and 180 degrees.",
             ),
-            pa.Check(lambda s: s.isna().sum() / len(s) < 0.25),
+            missing_ratio_check(),
         ],
         nullable=True,
         required=False,
@@ -38,8 +58,7 @@ base_schema: dict = {
     ),
     "address": pa.Column(
         str,
-        pa.Check(
-            lambda s: s.isna().sum() / len(s) < 0.25,
+        missing_ratio_check(
             name="missing_address",
             title="Percentage of missing address",
             error="More than 25% of values in column address are missing",
@@ -50,8 +69,7 @@ base_schema: dict = {
     ),
     "country": pa.Column(
         str,
-        pa.Check(
-            lambda s: s.isna().sum() / len(s) < 0.25,
+        missing_ratio_check(
             name="missing_country",
             title="Percentage of missing country",
             error="More than 25% of values in column country are missing",
@@ -62,8 +80,7 @@ base_schema: dict = {
     ),
     "state": pa.Column(
         str,
-        pa.Check(
-            lambda s: s.isna().sum() / len(s) < 0.25,
+        missing_ratio_check(
             name="missing_state",
             title="Percentage of missing state",
             error="More than 25% of values in column state are missing",
@@ -74,8 +91,7 @@ base_schema: dict = {
     ),
     "city": pa.Column(
         str,
-        pa.Check(
-            lambda s: s.isna().sum() / len(s) < 0.25,
+        missing_ratio_check(
             name="missing_city",
             title="Percentage of missing city",
             error="More than 25% of values in column city are missing",
@@ -89,8 +105,7 @@ base_schema: dict = {
     "subtype": pa.Column(str, nullable=False, required=False),
     "status": pa.Column(
         str,
-        pa.Check(
-            lambda s: s.isna().sum() / len(s) < 0.25,
+        missing_ratio_check(
             name="missing_status",
             title="Percentage of missing status",
             error="More than 25% of values in column status are missing",
@@ -114,8 +129,7 @@ base_checks: list = [
         title="Location columns availability",
         error="Not all columns required to locate the asset are available. Please provide either (latitude, longitude) or (address, city, state, country)",
     ),  # check that there is essential data about location
-    pa.Check(
-        lambda df: np.all(df.isna().sum() / len(df) < 0.25),
+    missing_ratio_check(
         name="total_missing_values",
         title="Total missing values",
         error="Some columns have more than 25% missing values. Please check that this is not a collection issue",
@@ -138,8 +152,7 @@ real_estate_schema = pa.DataFrameSchema(
         "area": pa.Column(
             float,
             [
-                pa.Check(
-                    lambda s: s.isna().sum() / len(s) < 0.25,
+                missing_ratio_check(
                     name="missing_area",
                     title="Percentage of missing area",
                     error="More than 25% of values in column area are missing",
@@ -1,23 +1,43 @@
-import numpy as np
-import requests
 import pandas as pd
-import datetime
-import os
-from typing import Union, Literal
-import pandera as pa
-from bs4 import BeautifulSoup
+import contextvars
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Union, Literal, Iterable, Iterator, Optional, Tuple, Callable
 from dataclasses import dataclass
 from abc import abstractmethod
-from rich.progress import track
-import yaml
-from pandera.dtypes import DateTime
-from asset_mapping_scrapping.scrapper.schema import sector_schema_mapping
-from asset_mapping_scrapping.utils.export import export_source
+from asset_mapping_scrapping.utils.export import (
+    ExportManager,
+    export_source,
+    schema_dtypes,
+)
+from asset_mapping_scrapping.utils.checkpoint import AssetCheckpoint
+from asset_mapping_scrapping.utils.frame_builder import FrameBuilder
+from asset_mapping_scrapping.utils.json_stream import iter_json_items
+from asset_mapping_scrapping.utils.delta import SnapshotStore, compute_delta, content_hash
+from asset_mapping_scrapping.utils.pagination import (
+    page_urls,
+    iter_pages,
+    iter_cursor_pages,
+    iter_streamed_pages,
+)
+from asset_mapping_scrapping.utils.http import HttpClient, get_http_client
+from asset_mapping_scrapping.utils.metrics import metrics
+from asset_mapping_scrapping.utils.progress import track
+from asset_mapping_scrapping.scrapper.registry import ScrapperFactory  # noqa: F401 (re-export)
 import logging
 
+if TYPE_CHECKING:
+    # pandera, ~200ms to import, is only imported once a scrapper validates its result
+    import pandera as pa
+
 logger = logging.getLogger("VerboseLogger")
 
 
+class SourceUnchanged(Exception):
+    """Raised by a scrapper whose main page has the content hash it was told to skip."""
+
+
 @dataclass
 class Scrapper:
     """Abstract class that serves as mother class of scrappers for the
@@ -29,34 +49,164 @@ class Scrapper:
     s3_bucket_name: str = "vuong"
     s3_base_path: str = "app_data/asset_mapping/input_data/"
     mode: Literal["dev", "prod"] = "prod"
-    _schema: Union[pa.DataFrameSchema, dict] = None
+    asset_page_workers: int = 8
+    validation_workers: int = 1
+    delta: bool = False
+    export_format: Literal["csv", "parquet"] = "csv"
+    # compression of csv exports, opt-in so that keys stay <source>_<date>.csv by default
+    compression: Optional[Literal["gzip", "zstd"]] = None
+    snapshot_dir: str = ".snapshots"
+    resume: bool = False
+    checkpoint_dir: str = ".checkpoints"
+    unchanged_hash: Optional[str] = None
+    # whether to compute `content_hash` even without `unchanged_hash`, e.g. for the scheduler
+    hash_main_page: bool = False
+    _schema: Union["pa.DataFrameSchema", dict] = None
 
     def __post_init__(self):
         self.source_name = self.__class__.__name__
+        self.asset_page_errors: dict = {}
+        # content hash of the main page of the last call, see `unchanged_hash`
+        self.content_hash: Optional[str] = None
 
     @property
-    def schema(self) -> Union[pa.DataFrameSchema, dict]:
+    def schema(self) -> Union["pa.DataFrameSchema", dict]:
         """Pandera schema to assess whether the dataframe has a correct format, only allowed columns etc.
 
         Returns:
             pa.Schema: Pandera schema to assess whether the dataframe has a correct format,
             only allowed columns etc.
         """
+        from asset_mapping_scrapping.scrapper.schema import sector_schema_mapping
+
         if self._schema is None:
             if isinstance(self.sector, list):
                 self._schema: dict = {s: sector_schema_mapping[s] for s in self.sector}
             else:
-                self._schema: pa.DataFrameSchema = sector_schema_mapping[self.sector]
+                self._schema: "pa.DataFrameSchema" = sector_schema_mapping[self.sector]
         return self._schema
 
-    def _generate_urls(self, **kwargs) -> list[str]:
+    @property
+    def http(self) -> HttpClient:
+        """Pooled http client shared by all scrappers of the process."""
+        return get_http_client()
+
+    def _generate_urls(
+        self,
+        url: str,
+        scheme: Literal["offset", "page"] = "offset",
+        page_size: int = 100,
+        **kwargs,
+    ) -> Iterator[str]:
         """This function is used to generate urls from a base url. It can be useful for websites requesting some API,
         and rendering a 'next page' parameter. This function needs to be called in get_data_from_main_page.
 
-        Returns:
-            list[str]: list of urls.
+        Args:
+            url (str): url of the collection, without paging parameters.
+            scheme (Literal["offset", "page"]): "offset" for skip/limit APIs, "page" for page-number APIs.
+            page_size (int): number of items per page.
+            **kwargs: names of the paging parameters and bounds, see `page_urls`.
+
+        Yields:
+            str: url of the next page.
         """
-        pass
+        yield from page_urls(url, scheme=scheme, page_size=page_size, **kwargs)
+
+    def _iter_json_items(
+        self,
+        url: str,
+        path: tuple,
+        method: str = "GET",
+        required: Union[bool, Iterable[tuple]] = True,
+        collect: Optional[dict] = None,
+        **kwargs,
+    ) -> Iterator:
+        """Yields the values at `path` of a JSON response as it is downloaded, e.g. the items of
+        a portfolio feed, without decoding the whole document: memory is proportional to one
+        item rather than to the feed.
+
+        Args:
+            url (str): url of the request.
+            path (tuple): keys and indices leading to the items, "*" matching any of them, e.g.
+            ("data", "items", "*"), see JsonItemParser.
+            method (str): http method.
+            required (Union[bool, Iterable[tuple]]): containers of the items that must be in
+            the response, by default at least one, so that an error payload or a change of
+            schema fails the source instead of yielding no item (see `iter_json_items`).
+            collect (Optional[dict]): other values to collect, see `iter_json_items`.
+            **kwargs: arguments of the request (json payload, headers...).
+
+        Yields:
+            items of the response, in order.
+        """
+        response = self.http.request(method, url, stream=True, **kwargs)
+        try:
+            response.raise_for_status()
+            yield from iter_json_items(
+                response.iter_content(2**16), path, required=required, collect=collect
+            )
+        finally:
+            response.close()
+
+    def _iter_pages(
+        self,
+        url: str,
+        extract_items: Optional[Callable[[object], list]] = None,
+        scheme: Literal["offset", "page", "cursor"] = "offset",
+        page_size: int = 100,
+        prefetch: int = 2,
+        next_url: Optional[Callable[[object], Optional[str]]] = None,
+        items_path: Optional[tuple] = None,
+        **kwargs,
+    ) -> Iterator:
+        """Yields the items of a paginated JSON API one by one, downloading the next pages while
+        the current one is parsed. Only a few pages are held in memory at a time, or a single
+        item with `items_path`.
+
+        Args:
+            url (str): url of the collection, without paging parameters (first page for "cursor").
+            extract_items (Optional[Callable[[object], list]]): returns the items of a decoded
+            page, unused if `items_path` is given.
+            scheme (Literal["offset", "page", "cursor"]): pagination scheme of the API.
+            page_size (int): number of items per page ("offset" and "page").
+            prefetch (int): number of pages downloaded ahead ("offset" and "page"), unused if
+            `items_path` is given.
+            next_url (Optional[Callable[[object], Optional[str]]]): returns the url of the next
+            page from a decoded page ("cursor").
+            items_path (Optional[tuple]): path of the items in a page ("offset" and "page"),
+            see `_iter_json_items`. Items are then parsed from the response stream and yielded
+            as they are parsed, pages being downloaded one after the other.
+            **kwargs: names of the paging parameters, see `page_urls`.
+
+        Yields:
+            items of the pages, in order.
+        """
+        if items_path is not None:
+            if scheme == "cursor":
+                raise ValueError("items_path needs the offset or page scheme.")
+            yield from iter_streamed_pages(
+                lambda page_url: self._iter_json_items(page_url, items_path),
+                self._generate_urls(url, scheme=scheme, page_size=page_size, **kwargs),
+                page_size=page_size,
+            )
+            return
+
+        def fetch(page_url: str) -> object:
+            response = self.http.get(page_url)
+            response.raise_for_status()
+            with metrics.stage("parse"):
+                return response.json()
+
+        if scheme == "cursor":
+            yield from iter_cursor_pages(fetch, url, extract_items, next_url)
+        else:
+            yield from iter_pages(
+                fetch,
+                self._generate_urls(url, scheme=scheme, page_size=page_size, **kwargs),
+                extract_items,
+                page_size=page_size,
+                prefetch=prefetch,
+            )
 
     @abstractmethod
     def get_data_from_main_page(self, url: Union[str, list]) -> pd.DataFrame:
@@ -85,22 +235,198 @@ class Scrapper:
         """
         pass
 
-    def export_to_s3(self, df: pd.DataFrame) -> None:
+    def _get_asset_page_safe(
+        self, asset_url: str
+    ) -> Tuple[str, Optional[pd.DataFrame]]:
+        try:
+            return asset_url, self.get_data_from_asset_page(asset_url)
+        except Exception as e:
+            logger.error(
+                f"Error on getting data from asset page on {asset_url}.", exc_info=True
+            )
+            self.asset_page_errors[asset_url] = repr(e)
+            return asset_url, None
+
+    def _fetch_asset_pages(
+        self, asset_urls: Iterable[str]
+    ) -> Iterator[Tuple[str, Optional[pd.DataFrame]]]:
+        """Calls `self.get_data_from_asset_page` on every asset url, with at most
+        `self.asset_page_workers` pages fetched at the same time. Results are yielded in the
+        order of `asset_urls`. A failing page yields None and its error is kept in
+        `self.asset_page_errors`. Pages are submitted `2 * self.asset_page_workers` at most
+        ahead of the consumer, so that a consumer that fails or stops iterating only waits for
+        the pages being fetched.
+
+        Args:
+            asset_urls (Iterable[str]): urls of the asset pages.
+
+        Yields:
+            Tuple[str, Optional[pd.DataFrame]]: asset url and data of its page.
+        """
+        if self.asset_page_workers <= 1:
+            yield from map(self._get_asset_page_safe, asset_urls)
+            return
+        asset_urls = iter(asset_urls)
+        with ThreadPoolExecutor(max_workers=self.asset_page_workers) as executor:
+            pending = deque()
+
+            def submit_next() -> None:
+                for asset_url in itertools.islice(asset_urls, 1):
+                    # each task runs in a copy of the caller context to keep the log attribution
+                    pending.append(
+                        executor.submit(
+                            contextvars.copy_context().run, self._get_asset_page_safe, asset_url
+                        )
+                    )
+
+            try:
+                for _ in range(2 * self.asset_page_workers):
+                    submit_next()
+                while pending:
+                    result = pending.popleft().result()
+                    submit_next()
+                    yield result
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _validate(self, base_df: pd.DataFrame) -> None:
+        """Validates the dataframe against the schema of its sector. For multi-sector scrappers,
+        the frame is split by sector in a single pass and every partition is validated against
+        the schema of its sector, on `self.validation_workers` threads. Rows whose sector has no
+        schema are reported.
+
+        Args:
+            base_df (pd.DataFrame): dataframe resulting from the scrapping.
+        """
+        from asset_mapping_scrapping.scrapper.schema import sector_schema_mapping
+        from asset_mapping_scrapping.scrapper.validation import validate
+
+        if not isinstance(self.schema, dict):
+            validate(self.schema, base_df)
+            return
+
+        partitions: dict = dict(
+            tuple(base_df.groupby("sector", sort=False, dropna=False))
+        )
+        for sector, partition in partitions.items():
+            if sector not in self.schema:
+                logger.warning(
+                    f"{len(partition)} rows of sector {sector!r} are not validated: "
+                    + (
+                        "sector not declared by the scrapper."
+                        if sector in sector_schema_mapping
+                        else "no schema in sector_schema_mapping."
+                    )
+                )
+
+        def validate_sector(sector: str) -> None:
+            schema = self.schema[sector]
+            partition = partitions.get(sector, base_df.iloc[0:0])
+            validate(schema, partition.filter(list(schema.columns.keys())))
+
+        if self.validation_workers <= 1:
+            for sector in self.schema:
+                validate_sector(sector)
+        else:
+            with ThreadPoolExecutor(max_workers=self.validation_workers) as executor:
+                # list() re-raises the first validation error
+                list(executor.map(validate_sector, self.schema))
+
+    def export_to_s3(
+        self, df: pd.DataFrame, exporter: Optional[ExportManager] = None
+    ) -> list:
         """Creates the s3 key and exports the dataframe to this key.
 
         Args:
             df (pd.DataFrame): dataframe resulting from the scrapping.
+            exporter (Optional[ExportManager]): export manager of the run; if given, the upload
+            is queued on it instead of being done right away.
+
+        Returns:
+            list: futures of the uploads (see `export_source`), none in dev mode.
         """
-        path: str = os.path.join(
-            self.s3_base_path,
-            self.source_name,
-            f"{self.source_name}_{str(datetime.date.today())}.csv",
-        )
         if self.mode == "dev":
             logging.info("Dev mode activated. No export to s3.")
-            return
-        export_source(df, self.source_name, self.s3_base_path, self.s3_bucket_name)
-    def __call__(self, url: Union[str, list]):
+            return []
+        if self.delta:
+            return self._export_delta_to_s3(df, exporter)
+        return [
+            export_source(
+                df,
+                self.source_name,
+                self.s3_base_path,
+                self.s3_bucket_name,
+                compression=self.compression,
+                export_format=self.export_format,
+                dtypes=self._export_dtypes(),
+                exporter=exporter,
+            )
+        ]
+
+    def remove_checkpoint(self) -> None:
+        """Deletes the checkpoint of the asset pages, once the result is exported: a rerun
+        must not resume from it.
+        """
+        AssetCheckpoint(self.source_name, self.checkpoint_dir).remove()
+
+    def _export_dtypes(self) -> dict:
+        """Dtypes of the output columns, as declared in the schema(s) of the scrapper."""
+        schemas = (
+            [self.schema]
+            if not isinstance(self.schema, dict)
+            else list(self.schema.values())
+        )
+        return schema_dtypes(schemas)
+
+    def _export_delta_to_s3(
+        self, df: pd.DataFrame, exporter: Optional[ExportManager] = None
+    ) -> list:
+        """Exports only the assets added, changed or removed since the last export, along with
+        the manifest of the full state. The manifest is kept locally once the export succeeded,
+        to serve as reference for the next run.
+
+        Args:
+            df (pd.DataFrame): dataframe resulting from the scrapping.
+            exporter (Optional[ExportManager]): export manager of the run.
+
+        Returns:
+            list: futures of the uploads.
+        """
+        snapshots = SnapshotStore(self.snapshot_dir)
+        delta = compute_delta(df, snapshots.load(self.source_name))
+        logger.info(
+            f"{len(delta.added)} added, {len(delta.changed)} changed and "
+            f"{len(delta.removed)} removed assets since last export."
+        )
+        parts = {
+            "added": delta.added,
+            "changed": delta.changed,
+            "removed": delta.removed,
+        }
+        exports = [
+            export_source(
+                part,
+                self.source_name,
+                self.s3_base_path,
+                self.s3_bucket_name,
+                suffix=f"_{name}",
+                compression=self.compression,
+                export_format=self.export_format,
+                dtypes=self._export_dtypes(),
+                exporter=exporter,
+            )
+            for name, part in {**parts, "manifest": delta.manifest}.items()
+            if name == "manifest" or not part.empty
+        ]
+        save_manifest = lambda: snapshots.save(self.source_name, delta.manifest)
+        if exporter is not None:
+            exporter.on_success(exports, save_manifest)
+        elif all(future.exception() is None for future in exports):
+            save_manifest()
+        return exports
+
+    def __call__(self, url: Union[str, list]) -> pd.DataFrame:
         """Call of the class in charge of scrapping some main page. If column 'asset_url' is present in output of
         `self.get_data_from_main_page`, then `self.get_data_from_asset_page` is called on individual asset pages.
         Results are merged onto the dataframe resulting from the main page.
@@ -108,62 +434,64 @@ class Scrapper:
         Args:
             url (Union[str, list]): input url or urls (sometimes websites have portfolios on different pages, but pages have
             same structure).
+
+        Returns:
+            pd.DataFrame: validated dataframe, to be exported with `self.export_to_s3`.
+
+        Every parsed asset page is recorded in a checkpoint (see AssetCheckpoint), to be removed
+        with `self.remove_checkpoint` once the dataframe is exported. If `self.resume`, the pages
+        recorded by a previous run that did not complete are restored instead of being fetched
+        again.
+
+        If `self.hash_main_page` or `self.unchanged_hash` is set, the content hash of the main
+        page is kept in `self.content_hash`. If it equals `self.unchanged_hash`,
+        SourceUnchanged is raised before any asset page is fetched.
         """
         try:
             if isinstance(url, list) and len(url) == 1:
                 url = url[0]
-            base_df: pd.DataFrame = self.get_data_from_main_page(url)
+            with metrics.stage("main_page"):
+                base_df: pd.DataFrame = self.get_data_from_main_page(url)
         except Exception as e:
             logger.error(f"Error on getting data from main page on {url}.")
             logger.exception(e)
+        if self.hash_main_page or self.unchanged_hash is not None:
+            self.content_hash = content_hash(base_df)
+            if self.content_hash == self.unchanged_hash:
+                raise SourceUnchanged(f"Main page of {self.source_name} is unchanged.")
         if "asset_url" in base_df.columns:
-            asset_df: pd.DataFrame = pd.DataFrame()
-            for i, row in track(base_df.iterrows(), total=len(base_df)):
-                try:
-                    asset_df = pd.concat(
-                        [
-                            asset_df,
-                            self.get_data_from_asset_page(row["asset_url"]).assign(
-                                asset_url=row["asset_url"]
-                            ),
-                        ]
-                    )
-                except:
-                    logger.error(
-                        f"Error on getting data from asset page on {row['asset_url']}."
-                    )
-
-            base_df = base_df.merge(asset_df, on="asset_url", how="left").drop(
-                columns="asset_url"
-            )
-        if isinstance(self.schema, pa.DataFrameSchema):
-            self.schema.validate(base_df)
-        else:
-            for sector, schema in self.schema.items():
-                schema.validate(
-                    base_df.query("sector == @sector").filter(
-                        list(schema.columns.keys())
-                    )
+            asset_builder = FrameBuilder()
+            checkpoint = AssetCheckpoint(self.source_name, self.checkpoint_dir)
+            done: dict = checkpoint.load() if self.resume else {}
+            remaining = [url for url in base_df["asset_url"] if url not in done]
+            if done:
+                logger.info(
+                    f"Resuming from checkpoint: {len(base_df) - len(remaining)} asset pages "
+                    f"restored, {len(remaining)} left."
                 )
+                for asset_url in base_df["asset_url"]:
+                    if asset_url in done:
+                        asset_builder.add_records(done[asset_url], asset_url=asset_url)
+            checkpoint.open(resume=self.resume)
+            try:
+                with metrics.stage("asset_pages"):
+                    for asset_url, asset_page_df in track(
+                        self._fetch_asset_pages(remaining),
+                        description=self.source_name,
+                        total=len(remaining),
+                    ):
+                        if asset_page_df is not None:
+                            checkpoint.append(asset_url, asset_page_df)
+                            asset_builder.add_frame(asset_page_df, asset_url=asset_url)
+            finally:
+                checkpoint.close()
+            with metrics.stage("merge"):
+                asset_df: pd.DataFrame = asset_builder.to_frame(columns=["asset_url"])
+                base_df = base_df.merge(asset_df, on="asset_url", how="left").drop(
+                    columns="asset_url"
+                )
+        metrics.set("rows", len(base_df))
+        with metrics.stage("validation"):
+            self._validate(base_df)
         print(base_df.to_string())
-        # self.export_to_s3(base_df)
-
-
-class ScrapperFactory:
-    scrapper_mapping = {}
-
-    @classmethod
-    def register_handler(cls):
-        """Method to record a class as a new scrapper that inherits from
-        the Scrapper class.
-        """
-
-        def wrapper(handler_cls):
-            cls.scrapper_mapping[handler_cls.__name__] = handler_cls
-            return handler_cls
-
-        return wrapper
-
-    @classmethod
-    def get_handler(cls, output_type):
-        return cls.scrapper_mapping[output_type]
+        return base_df
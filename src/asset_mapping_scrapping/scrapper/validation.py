@@ -0,0 +1,301 @@
+import warnings
+from dataclasses import dataclass, field
+from typing import Optional
+import numpy as np
+import pandas as pd
+import pandera as pa
+from pandera.engines import pandas_engine
+
+
+@dataclass
+class ColumnPlan:
+    name: str
+    column: pa.Column
+    coerce: bool
+    # (index of the check in the column, kind of the check, check)
+    checks: list = field(default_factory=list)
+
+
+@dataclass
+class SchemaPlan:
+    """Validation plan of a DataFrameSchema. Checks whose behaviour is fully described by their
+    name and statistics (missing ratios, ranges, comparisons, memberships) are evaluated by
+    vectorised code sharing a single computation of missing values; any other check is called
+    once, as pandera would.
+    """
+
+    schema: pa.DataFrameSchema
+    columns: list
+    frame_checks: list
+
+
+# builtin checks evaluated by `_passes`, with the statistics each one is built from
+_VECTORISED = {
+    "in_range": {"min_value", "max_value"},
+    "greater_than": {"min_value"},
+    "greater_than_or_equal_to": {"min_value"},
+    "less_than": {"max_value"},
+    "less_than_or_equal_to": {"max_value"},
+    "equal_to": {"value"},
+    "not_equal_to": {"value"},
+    "isin": {"allowed_values"},
+    "notin": {"forbidden_values"},
+}
+
+
+def _check_kind(check: pa.Check) -> str:
+    """Kind of a check. Builtin checks are recognised by their check function rather than by
+    their name, which a schema may override (`pa.Check.in_range(..., name="latitude_range")`).
+    """
+    statistics = check.statistics or {}
+    if "max_missing_ratio" in statistics:
+        return "missing_ratio"
+    builtin = getattr(check._check_fn, "__name__", None)
+    if (
+        builtin in _VECTORISED
+        and builtin in pa.Check.CHECK_FUNCTION_REGISTRY
+        and _VECTORISED[builtin] <= statistics.keys()
+    ):
+        return builtin
+    return "custom"
+
+
+def compile_schema(schema: pa.DataFrameSchema) -> SchemaPlan:
+    columns = [
+        ColumnPlan(
+            name=name,
+            column=column,
+            coerce=column.coerce or schema.coerce,
+            checks=[(i, _check_kind(check), check) for i, check in enumerate(column.checks)],
+        )
+        for name, column in schema.columns.items()
+    ]
+    frame_checks = [
+        (i, _check_kind(check), check) for i, check in enumerate(schema.checks)
+    ]
+    return SchemaPlan(schema=schema, columns=columns, frame_checks=frame_checks)
+
+
+_plans: dict = {}
+
+
+def get_plan(schema: pa.DataFrameSchema) -> SchemaPlan:
+    """Returns the compiled plan of a schema, compiling it on first use."""
+    plan: Optional[SchemaPlan] = _plans.get(id(schema))
+    if plan is None or plan.schema is not schema:
+        plan = _plans[id(schema)] = compile_schema(schema)
+    return plan
+
+
+def _passes(kind: str, check: pa.Check, values: pd.Series) -> pd.Series:
+    """Vectorised evaluation of a builtin check on non missing values."""
+    statistics = check.statistics
+    if kind == "in_range":
+        lower = (
+            values >= statistics["min_value"]
+            if statistics.get("include_min", True)
+            else values > statistics["min_value"]
+        )
+        upper = (
+            values <= statistics["max_value"]
+            if statistics.get("include_max", True)
+            else values < statistics["max_value"]
+        )
+        return lower & upper
+    if kind == "greater_than":
+        return values > statistics["min_value"]
+    if kind == "greater_than_or_equal_to":
+        return values >= statistics["min_value"]
+    if kind == "less_than":
+        return values < statistics["max_value"]
+    if kind == "less_than_or_equal_to":
+        return values <= statistics["max_value"]
+    if kind == "equal_to":
+        return values == statistics["value"]
+    if kind == "not_equal_to":
+        return values != statistics["value"]
+    if kind == "isin":
+        return values.isin(statistics["allowed_values"])
+    if kind == "notin":
+        return ~values.isin(statistics["forbidden_values"])
+    raise ValueError(f"Check kind {kind} is not vectorised.")
+
+
+def _fail(
+    schema: pa.DataFrameSchema,
+    df: pd.DataFrame,
+    check: pa.Check,
+    message: str,
+    failure_cases=None,
+    check_index: Optional[int] = None,
+) -> None:
+    """Raises a SchemaError, or a warning if the check only warns, like pandera does."""
+    if check is not None and check.raise_warning:
+        warnings.warn(message, UserWarning)
+        return
+    raise pa.errors.SchemaError(
+        schema,
+        df,
+        message,
+        failure_cases=failure_cases,
+        check=check,
+        check_index=check_index,
+    )
+
+
+def _dtype_passes(dtype, series: pd.Series) -> bool:
+    """Whether a series has the dtype of its column. String columns, which pandera checks with
+    one python call per element, are checked by pandas' C type inference instead.
+    """
+    if isinstance(dtype, pandas_engine.NpString) and series.dtype == object:
+        if pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+            return True
+    return bool(np.all(dtype.check(pandas_engine.Engine.dtype(series.dtype), series)))
+
+
+def _failure_cases(values: pd.Series) -> pd.DataFrame:
+    return pd.DataFrame({"index": values.index, "failure_case": values.values})
+
+
+def validate(schema: pa.DataFrameSchema, df: pd.DataFrame) -> pd.DataFrame:
+    """Validates a dataframe against a schema, raising the same errors and warnings as
+    `schema.validate(df)`, but computing missing values once for all columns and evaluating
+    builtin checks with vectorised code.
+
+    Args:
+        schema (pa.DataFrameSchema): schema to validate against.
+        df (pd.DataFrame): dataframe to validate.
+
+    Raises:
+        pa.errors.SchemaError: at the first failing check.
+
+    Returns:
+        pd.DataFrame: validated dataframe, with coerced columns.
+    """
+    plan = get_plan(schema)
+    df = df.copy(deep=False)
+
+    # presence of columns
+    for column_plan in plan.columns:
+        if column_plan.column.required and column_plan.name not in df.columns:
+            _fail(
+                schema,
+                df,
+                None,
+                f"column '{column_plan.name}' not in dataframe\n{df.head()}",
+                failure_cases=column_plan.name,
+            )
+    extra_columns = [name for name in df.columns if name not in schema.columns]
+    if schema.strict == "filter":
+        df = df.drop(columns=extra_columns)
+    elif schema.strict and extra_columns:
+        _fail(
+            schema,
+            df,
+            None,
+            f"column '{extra_columns[0]}' not in DataFrameSchema {schema.columns}",
+            failure_cases=extra_columns[0],
+        )
+
+    present = [
+        column_plan for column_plan in plan.columns if column_plan.name in df.columns
+    ]
+    for column_plan in present:
+        if column_plan.coerce and column_plan.column.dtype is not None:
+            try:
+                df[column_plan.name] = column_plan.column.dtype.try_coerce(
+                    df[column_plan.name]
+                )
+            except pa.errors.ParserError as e:
+                _fail(
+                    schema,
+                    df,
+                    None,
+                    f"Error while coercing '{column_plan.name}' to type "
+                    f"{column_plan.column.dtype}: {e}",
+                    failure_cases=e.failure_cases,
+                )
+
+    # single pass over the frame for missing values
+    n_rows = len(df)
+    null_counts = df.isna().sum()
+
+    for column_plan in present:
+        column = column_plan.column
+        series = df[column_plan.name]
+        if not column.nullable and null_counts[column_plan.name] > 0:
+            _fail(
+                schema,
+                df,
+                None,
+                f"non-nullable series '{column_plan.name}' contains null values:\n"
+                f"{series[series.isna()].head()}",
+                failure_cases=_failure_cases(series[series.isna()]),
+            )
+        if column.dtype is not None and not _dtype_passes(column.dtype, series):
+            _fail(
+                schema,
+                df,
+                None,
+                f"expected series '{column_plan.name}' to have type {column.dtype}, "
+                f"got {series.dtype}",
+                failure_cases=str(series.dtype),
+            )
+        values = None
+        for i, kind, check in column_plan.checks:
+            if kind == "missing_ratio":
+                passed = (
+                    n_rows > 0
+                    and null_counts[column_plan.name] / n_rows
+                    < check.statistics["max_missing_ratio"]
+                )
+                if not passed:
+                    _fail(
+                        schema,
+                        df,
+                        check,
+                        f"{column!r} failed series or dataframe validator {i}:\n{check!r}",
+                        check_index=i,
+                    )
+                continue
+            if kind == "custom":
+                if not np.all(check(series).check_passed):
+                    _fail(
+                        schema,
+                        df,
+                        check,
+                        f"{column!r} failed series or dataframe validator {i}:\n{check!r}",
+                        check_index=i,
+                    )
+                continue
+            if values is None:
+                values = series.dropna()
+            mask = _passes(kind, check, values)
+            if not mask.all():
+                failure_cases = _failure_cases(values[~mask])
+                _fail(
+                    schema,
+                    df,
+                    check,
+                    f"{column!r} failed element-wise validator {i}:\n{check!r}\n"
+                    f"failure cases:\n{failure_cases}",
+                    failure_cases=failure_cases,
+                    check_index=i,
+                )
+
+    for i, kind, check in plan.frame_checks:
+        if kind == "missing_ratio":
+            passed = n_rows > 0 and bool(
+                np.all(null_counts / n_rows < check.statistics["max_missing_ratio"])
+            )
+        else:
+            passed = bool(np.all(check(df).check_passed))
+        if not passed:
+            _fail(
+                schema,
+                df,
+                check,
+                f"{schema!r} failed series or dataframe validator {i}:\n{check!r}",
+                check_index=i,
+            )
+    return df
@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import pandas as pd
+
+
+class AssetCheckpoint:
+    """Append-only log of the asset pages scrapped by a source, kept on local disk so that a
+    crashed run can be resumed without fetching the finished pages again. Every line holds the
+    url of an asset page and the rows parsed from it, as JSON.
+
+    Lines are flushed as they are written and synced to disk every `sync_every` pages, and a
+    line truncated by a crash is ignored when the checkpoint is loaded. Values are restored
+    from their JSON form, e.g. dates become ISO strings.
+    """
+
+    def __init__(
+        self, source_name: str, directory: str = ".checkpoints", sync_every: int = 50
+    ):
+        """
+        Args:
+            source_name (str): name of the scrapper.
+            directory (str): folder of the checkpoints.
+            sync_every (int): number of pages between two syncs to disk.
+        """
+        self.path = os.path.join(directory, f"{source_name}.jsonl")
+        self.sync_every = sync_every
+        self._lock = threading.Lock()
+        self._file = None
+        self._n_unsynced = 0
+
+    def load(self) -> dict:
+        """Pages recorded in the checkpoint.
+
+        Returns:
+            dict: mapping between asset urls and the rows (list of records) of their page.
+        """
+        pages = {}
+        if not os.path.exists(self.path):
+            return pages
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    page = json.loads(line)
+                except json.JSONDecodeError:
+                    # last line of a run that crashed while writing it
+                    continue
+                pages[page["asset_url"]] = page["rows"]
+        return pages
+
+    def open(self, resume: bool) -> None:
+        """Opens the checkpoint for writing, keeping the recorded pages if `resume`."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            self._file = open(self.path, "a" if resume else "w")
+            if resume and self._file.tell() > 0:
+                with open(self.path, "rb") as f:
+                    f.seek(-1, os.SEEK_END)
+                    truncated = f.read(1) != b"\n"
+                if truncated:
+                    # keep the truncated line apart from the next one
+                    self._file.write("\n")
+
+    def append(self, asset_url: str, df: pd.DataFrame) -> None:
+        """Records the rows parsed from an asset page."""
+        line = (
+            f'{{"asset_url": {json.dumps(asset_url)}, '
+            f'"rows": {df.to_json(orient="records", date_format="iso")}}}\n'
+        )
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._n_unsynced += 1
+            if self._n_unsynced >= self.sync_every:
+                os.fsync(self._file.fileno())
+                self._n_unsynced = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+                self._n_unsynced = 0
+
+    def remove(self) -> None:
+        """Deletes the checkpoint, once the run it belongs to succeeded."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,122 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Optional
+import pandas as pd
+
+
+@dataclass
+class Delta:
+    """Changes of a portfolio between two runs.
+
+    Attributes:
+        added (pd.DataFrame): rows whose key was not in the previous run.
+        changed (pd.DataFrame): rows whose key existed but whose content changed.
+        removed (pd.DataFrame): keys (column asset_key) that are no longer present.
+        manifest (pd.DataFrame): compact full state, one (asset_key, row_hash) per row.
+    """
+
+    added: pd.DataFrame
+    changed: pd.DataFrame
+    removed: pd.DataFrame
+    manifest: pd.DataFrame
+
+    @property
+    def is_empty(self) -> bool:
+        return self.added.empty and self.changed.empty and self.removed.empty
+
+
+def asset_keys(df: pd.DataFrame) -> pd.Series:
+    """Stable identity of every asset: its `id` when available, otherwise a hash of its name
+    and coordinates. Assets sharing the same identity are told apart by their rank.
+
+    Args:
+        df (pd.DataFrame): scrapped portfolio.
+
+    Returns:
+        pd.Series: one key per row.
+    """
+    parts = [df["asset_name"].astype(str)]
+    for column in ("latitude", "longitude"):
+        if column in df.columns:
+            parts.append(pd.to_numeric(df[column], errors="coerce").round(6).astype(str))
+    fallback = (
+        parts[0]
+        .str.cat(parts[1:], sep="|")
+        .map(lambda s: hashlib.sha1(s.encode()).hexdigest())
+    )
+    if "id" in df.columns:
+        keys = df["id"].astype(str).where(df["id"].notna(), fallback)
+    else:
+        keys = fallback
+    rank = keys.groupby(keys).cumcount()
+    return keys.where(rank == 0, keys + "#" + rank.astype(str))
+
+
+def row_hashes(df: pd.DataFrame) -> pd.Series:
+    """Hash of the content of every row, independent of the order of the columns."""
+    return (
+        pd.util.hash_pandas_object(df[sorted(df.columns)], index=False)
+        .astype(str)
+        .values
+    )
+
+
+def content_hash(df: pd.DataFrame) -> str:
+    """Hash of the content of a dataframe, independent of the order of its rows and columns.
+    Cells are hashed as strings, so that lists or dicts scrapped from a page can be hashed too.
+    """
+    return hashlib.sha256("\n".join(sorted(row_hashes(df.astype(str)))).encode()).hexdigest()
+
+
+def compute_delta(df: pd.DataFrame, previous_manifest: Optional[pd.DataFrame]) -> Delta:
+    """Compares a portfolio with the manifest of the previous run.
+
+    Args:
+        df (pd.DataFrame): scrapped portfolio.
+        previous_manifest (Optional[pd.DataFrame]): manifest of the previous run, None if
+        there is no previous run, in which case every row is added.
+
+    Returns:
+        Delta: added, changed and removed rows, and the manifest of this run.
+    """
+    manifest = pd.DataFrame(
+        {"asset_key": asset_keys(df).values, "row_hash": row_hashes(df)}
+    )
+    if previous_manifest is None:
+        previous_manifest = manifest.iloc[0:0]
+    previous_hashes = previous_manifest.set_index("asset_key")["row_hash"]
+    previous_row_hash = manifest["asset_key"].map(previous_hashes)
+    is_added = previous_row_hash.isna().values
+    is_changed = ~is_added & (previous_row_hash != manifest["row_hash"]).values
+    removed = previous_manifest.loc[
+        ~previous_manifest["asset_key"].isin(manifest["asset_key"]), ["asset_key"]
+    ]
+    with_keys = df.assign(asset_key=manifest["asset_key"].values)
+    return Delta(
+        added=with_keys[is_added],
+        changed=with_keys[is_changed],
+        removed=removed.reset_index(drop=True),
+        manifest=manifest,
+    )
+
+
+class SnapshotStore:
+    """Keeps the manifest of the last exported run of every source on local disk."""
+
+    def __init__(self, directory: str = ".snapshots"):
+        self.directory = directory
+
+    def _path(self, source_name: str) -> str:
+        return os.path.join(self.directory, f"{source_name}.manifest.csv")
+
+    def load(self, source_name: str) -> Optional[pd.DataFrame]:
+        if not os.path.exists(self._path(source_name)):
+            return None
+        return pd.read_csv(self._path(source_name), dtype=str)
+
+    def save(self, source_name: str, manifest: pd.DataFrame) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._path(source_name)}.tmp"
+        manifest.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self._path(source_name))
@@ -1,36 +1,484 @@
-import boto3
 import datetime
+import hashlib
+import json
 import os
+import threading
+import zlib
 import pandas as pd
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterator, Literal, Optional
+from asset_mapping_scrapping.utils.logger import source_context
+from asset_mapping_scrapping.utils.metrics import metrics
 
+# S3 requires every part of a multipart upload but the last one to be at least 5 MB
+MIN_PART_SIZE: int = 8 * 2**20
 
-def upload_df_to_s3(bucket_name: str, df: pd.DataFrame, key: str) -> None:
-    """Upload any file to s3.
+EXTENSIONS: dict = {None: ".csv", "gzip": ".csv.gz", "zstd": ".csv.zst"}
+
+# text columns repeated on every row, stored as dictionaries in columnar formats
+CATEGORICAL_COLUMNS: list = ["sector", "company_name", "unit", "type", "subtype", "country"]
+
+
+class _NoCompression:
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def _compressor(compression: Optional[Literal["gzip", "zstd"]]):
+    """Returns an incremental compressor with `compress` and `flush` methods."""
+    if compression is None:
+        return _NoCompression()
+    if compression == "gzip":
+        return zlib.compressobj(wbits=31)  # gzip container
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(
+                "zstd compression requires the zstandard package: pip install zstandard"
+            ) from e
+        return zstandard.ZstdCompressor().compressobj()
+    raise ValueError(f"Unknown compression {compression}.")
+
+
+def iter_csv_chunks(df: pd.DataFrame, chunk_rows: int = 50_000) -> Iterator[bytes]:
+    """Serialises a dataframe to csv, `chunk_rows` rows at a time.
+
+    Args:
+        df (pd.DataFrame): dataframe to serialise.
+        chunk_rows (int): number of rows per chunk.
+
+    Yields:
+        bytes: csv content, the first chunk carrying the header.
+    """
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start : start + chunk_rows].to_csv(
+            index=False, header=start == 0
+        ).encode()
+
+
+class S3StreamWriter:
+    """Binary file-like object uploading what is written to it to s3. Data is sent through a
+    multipart upload as soon as MIN_PART_SIZE bytes are buffered; if the whole file is smaller,
+    it is sent with a single put_object on close.
+    """
+
+    def __init__(self, s3, bucket_name: str, key: str, tagging: str):
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.key = key
+        self.tagging = tagging
+        self.closed = False
+        self._buffer = bytearray()
+        self._position = 0
+        self._upload_id = None
+        self._parts = []
+        self._sha256 = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        """Checksum of the bytes written so far."""
+        return self._sha256.hexdigest()
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        self._position += len(data)
+        self._sha256.update(data)
+        if len(self._buffer) >= MIN_PART_SIZE:
+            self._upload_part()
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def flush(self) -> None:
+        pass
+
+    def _upload_part(self) -> None:
+        if self._upload_id is None:
+            self._upload_id = self.s3.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, Tagging=self.tagging
+            )["UploadId"]
+        part_number = len(self._parts) + 1
+        etag = self.s3.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=bytes(self._buffer),
+        )["ETag"]
+        self._parts.append({"ETag": etag, "PartNumber": part_number})
+        self._buffer.clear()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self._upload_id is None:
+            # small file, a single request is enough
+            self.s3.put_object(
+                Bucket=self.bucket_name,
+                Body=bytes(self._buffer),
+                Key=self.key,
+                Tagging=self.tagging,
+            )
+            return
+        if self._buffer:
+            self._upload_part()
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=self.key,
+            UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+
+    def abort(self) -> None:
+        self.closed = True
+        if self._upload_id is not None:
+            self.s3.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=self.key, UploadId=self._upload_id
+            )
+
+
+def _coerce(series: pd.Series, coerced: pd.Series) -> pd.Series:
+    """Returns `coerced`, the conversion of `series` with errors="coerce".
+
+    Raises:
+        ValueError: if the conversion turned some values into nulls.
+    """
+    invalid = coerced.isna() & series.notna()
+    if invalid.any():
+        raise ValueError(
+            f"{invalid.sum()} values could not be converted, e.g. {series[invalid].iloc[0]!r}"
+        )
+    return coerced
+
+
+def compact_dtypes(df: pd.DataFrame, dtypes: Optional[dict] = None) -> pd.DataFrame:
+    """Converts a dataframe to compact dtypes before a columnar export: low cardinality text
+    columns become categoricals, float columns become float32 when no value is altered by the
+    conversion, and other columns are cast to the dtype given by the schema. A column that
+    cannot be converted without losing values is kept as it is, with a warning.
+
+    Args:
+        df (pd.DataFrame): dataframe to convert.
+        dtypes (Optional[dict]): dtype of every column, as declared in the sector schemas
+        (see `schema_dtypes`).
+
+    Returns:
+        pd.DataFrame: converted dataframe.
+    """
+    dtypes = dtypes or {}
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        dtype = dtypes.get(name)
+        try:
+            if dtype == "float64" or (dtype is None and series.dtype.kind == "f"):
+                if series.dtype.kind not in "biuf":
+                    series = _coerce(series, pd.to_numeric(series, errors="coerce"))
+                series = series.astype("float64")
+                as_float32 = series.astype("float32")
+                if (as_float32.astype("float64").eq(series) | series.isna()).all():
+                    series = as_float32
+            elif name in CATEGORICAL_COLUMNS or (
+                dtype == "str" and series.nunique() <= len(series) / 2
+            ):
+                series = series.astype("category")
+            elif dtype == "str":
+                series = series.astype("string")
+            elif dtype is not None and dtype.startswith("datetime64"):
+                series = _coerce(series, pd.to_datetime(series, errors="coerce"))
+        except (TypeError, ValueError) as e:
+            logging.warning(f"Column {name} kept as {series.dtype}: {e}")
+        columns[name] = series
+    return pd.DataFrame(columns, index=df.index)
+
+
+def schema_dtypes(schemas: list) -> dict:
+    """Dtypes of the columns declared in pandera schemas, e.g. {"area": "float64"}."""
+    dtypes = {}
+    for schema in schemas:
+        for name, column in schema.columns.items():
+            if column.dtype is not None:
+                dtypes.setdefault(name, str(column.dtype))
+    return dtypes
+
+
+def _write_csv(writer, df: pd.DataFrame, compression, chunk_rows: int) -> None:
+    compressor = _compressor(compression)
+    for chunk in iter_csv_chunks(df, chunk_rows):
+        writer.write(compressor.compress(chunk))
+    writer.write(compressor.flush())
+
+
+def _write_parquet(
+    writer, df: pd.DataFrame, dtypes: Optional[dict], chunk_rows: int
+) -> None:
+    try:
+        import pyarrow
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Parquet export requires the pyarrow package: pip install pyarrow"
+        ) from e
+    df = compact_dtypes(df, dtypes)
+    table_schema = pyarrow.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(writer, table_schema, compression="zstd") as parquet_writer:
+        # one row group per chunk
+        for start in range(0, max(len(df), 1), chunk_rows):
+            parquet_writer.write_table(
+                pyarrow.Table.from_pandas(
+                    df.iloc[start : start + chunk_rows],
+                    schema=table_schema,
+                    preserve_index=False,
+                )
+            )
+
+
+def upload_df_to_s3(
+    bucket_name: str,
+    df: pd.DataFrame,
+    key: str,
+    compression: Optional[Literal["gzip", "zstd"]] = None,
+    s3=None,
+    chunk_rows: int = 50_000,
+    export_format: Literal["csv", "parquet"] = "csv",
+    dtypes: Optional[dict] = None,
+    tagging: Optional[str] = None,
+) -> dict:
+    """Upload any file to s3. The dataframe is serialised chunk by chunk and streamed to s3
+    through an S3StreamWriter, so that the file is never held in memory as a whole.
 
     Args:
         bucket_name (str): bucket name
         df (dataFrame) : dataframe
         key (str): file name in s3
+        compression (Optional[Literal["gzip", "zstd"]]): compression of csv files, none if None.
+        s3: s3 client, created if None.
+        chunk_rows (int): number of rows serialised at a time.
+        export_format (Literal["csv", "parquet"]): format of the file.
+        dtypes (Optional[dict]): dtypes declared by the schema, used by the parquet format.
+        tagging (Optional[str]): s3 tags of the object, owner=<caller name> if None.
+
+    Returns:
+        dict: key, number of bytes and sha256 checksum of the uploaded file.
     """
-    
-    username = boto3.client("sts").get_caller_identity()["Arn"].split("/")[-1]
-    s3 = boto3.client("s3")
-    s3.put_object(Bucket=bucket_name, Body = df.to_csv(index=False), Key=key, Tagging=f"owner={username}")
+
+    if tagging is None:
+        tagging = f"owner={get_owner_name()}"
+    if s3 is None:
+        import boto3
+
+        s3 = boto3.client("s3")
+    writer = S3StreamWriter(s3, bucket_name, key, tagging=tagging)
+    with metrics.stage("export"):
+        try:
+            if export_format == "parquet":
+                _write_parquet(writer, df, dtypes, chunk_rows)
+            else:
+                _write_csv(writer, df, compression, chunk_rows)
+            writer.close()
+        except Exception:
+            writer.abort()
+            raise
+    metrics.inc("exported_rows_total", len(df))
+    metrics.inc("exported_bytes_total", writer.tell())
+    return {"key": key, "bytes": writer.tell(), "sha256": writer.sha256}
+
+
+def get_owner_name() -> str:
+    """Name of the aws identity running the export, used to tag the exported objects."""
+    import boto3
+
+    return boto3.client("sts").get_caller_identity()["Arn"].split("/")[-1]
+
+
+class ExportManager:
+    """Exports the results of all sources of a run. The s3 client and the owner tag are created
+    once for the run, uploads are queued as sources complete and run concurrently, and a
+    manifest listing every exported object is written when the manager is closed.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str = "vuong",
+        base_path: str = "app_data/asset_mapping/input_data/",
+        max_workers: int = 8,
+        run_id: Optional[str] = None,
+    ):
+        """
+        Args:
+            bucket_name (str): bucket of the run manifest.
+            base_path (str): prefix of the run manifest.
+            max_workers (int): maximum number of simultaneous uploads.
+            run_id (Optional[str]): id of the run in the manifest name, the current time if None.
+        """
+        self.bucket_name = bucket_name
+        self.base_path = base_path
+        self.run_id = run_id or datetime.datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
+        self.entries: list = []
+        self._lock = threading.Lock()
+        self._s3 = None
+        self._tagging = None
+        self._futures: list = []
+        self._callbacks: list = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _clients(self):
+        """Creates the s3 client and resolves the owner tag on first use (thread-safe)."""
+        with self._lock:
+            if self._s3 is None:
+                import boto3
+
+                self._s3 = boto3.client("s3")
+                self._tagging = f"owner={get_owner_name()}"
+            return self._s3, self._tagging
+
+    def _upload(
+        self, source_name: str, df: pd.DataFrame, bucket_name: str, key: str, **kwargs
+    ) -> dict:
+        entry = {
+            "source": source_name,
+            "bucket": bucket_name,
+            "key": key,
+            "rows": len(df),
+        }
+        with source_context(source_name):
+            try:
+                s3, tagging = self._clients()
+                entry.update(
+                    upload_df_to_s3(
+                        bucket_name=bucket_name,
+                        df=df,
+                        key=key,
+                        s3=s3,
+                        tagging=tagging,
+                        **kwargs,
+                    ),
+                    status="exported",
+                )
+            except Exception as e:
+                entry.update(status="failed", error=repr(e))
+                logging.error(f"Export of {key} failed.", exc_info=True)
+                raise
+            finally:
+                with self._lock:
+                    self.entries.append(entry)
+        return entry
+
+    def submit(
+        self, source_name: str, df: pd.DataFrame, bucket_name: str, key: str, **kwargs
+    ) -> Future:
+        """Queues the upload of a dataframe.
+
+        Args:
+            source_name (str): source the dataframe comes from.
+            df (pd.DataFrame): dataframe to upload.
+            bucket_name (str): bucket name.
+            key (str): file name in s3.
+            **kwargs: other arguments of `upload_df_to_s3` (format, compression, dtypes).
+
+        Returns:
+            Future: resolved with the manifest entry of the upload.
+        """
+        future = self._executor.submit(
+            self._upload, source_name, df, bucket_name, key, **kwargs
+        )
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def on_success(self, futures: list, callback: Callable[[], None]) -> None:
+        """Calls `callback` when the manager is closed, if all `futures` succeeded."""
+        with self._lock:
+            self._callbacks.append((futures, callback))
+
+    def close(self) -> list:
+        """Waits for all uploads, runs the success callbacks and writes the run manifest.
+
+        Returns:
+            list: manifest entries, one per upload.
+        """
+        self._executor.shutdown(wait=True)
+        for futures, callback in self._callbacks:
+            if all(future.exception() is None for future in futures):
+                callback()
+        if self.entries:
+            key = os.path.join(self.base_path, "_runs", f"run_{self.run_id}.json")
+            try:
+                s3, tagging = self._clients()
+                s3.put_object(
+                    Bucket=self.bucket_name,
+                    Key=key,
+                    Body=json.dumps(
+                        {"run_id": self.run_id, "objects": self.entries}, indent=2
+                    ),
+                    Tagging=tagging,
+                )
+                logging.info(f"Run manifest written to s3://{self.bucket_name}/{key}.")
+            except Exception as e:
+                logging.error(f"Run manifest could not be written: {e!r}")
+        return self.entries
+
 
 def export_source(
     df: pd.DataFrame,
     source_name: str,
     base_path: str = "app_data/asset_mapping/input_data/",
     bucket_name: str = "vuong",
-):
-    df.to_csv("tmp.csv", index=False)
+    suffix: str = "",
+    compression: Optional[Literal["gzip", "zstd"]] = None,
+    export_format: Literal["csv", "parquet"] = "csv",
+    dtypes: Optional[dict] = None,
+    exporter: Optional[ExportManager] = None,
+) -> Future:
+    """Exports the dataframe of a source to s3, under <base_path>/<source_name>/.
+
+    Returns:
+        Future: resolved with the key, size and checksum of the uploaded file (see
+        `upload_df_to_s3`). When an `exporter` is given, the upload is queued on it; otherwise
+        it is done right away and the returned future is already done.
+    """
+    extension = ".parquet" if export_format == "parquet" else EXTENSIONS[compression]
     path = os.path.join(
-        base_path, source_name, f"{source_name}_{str(datetime.date.today())}.csv"
+        base_path,
+        source_name,
+        f"{source_name}_{str(datetime.date.today())}{suffix}{extension}",
     )
+    if exporter is not None:
+        return exporter.submit(
+            source_name,
+            df,
+            bucket_name,
+            path,
+            compression=compression,
+            export_format=export_format,
+            dtypes=dtypes,
+        )
+    future = Future()
     try:
-        upload_df_to_s3(bucket_name=bucket_name, df=df, key=path)
+        future.set_result(
+            upload_df_to_s3(
+                bucket_name=bucket_name,
+                df=df,
+                key=path,
+                compression=compression,
+                export_format=export_format,
+                dtypes=dtypes,
+            )
+        )
     except Exception as e:
-        logging.error(e)
-    finally:
-        os.remove("tmp.csv")
+        logging.error(f"Export of {path} failed.", exc_info=True)
+        future.set_exception(e)
+    return future
@@ -0,0 +1,70 @@
+from typing import Iterable, Optional
+import pandas as pd
+
+
+class FrameBuilder:
+    """Accumulates rows column by column and materialises a single dataframe at the end.
+    Appending is linear in the number of added rows, as opposed to growing a dataframe with
+    `pd.concat`, which copies the whole frame at each step.
+    """
+
+    def __init__(self):
+        self._columns: dict = {}
+        self._n_rows: int = 0
+
+    def __len__(self) -> int:
+        return self._n_rows
+
+    def _pad(self, n_added: int) -> None:
+        """Fills columns missing from the last added rows with None."""
+        self._n_rows += n_added
+        for values in self._columns.values():
+            if len(values) < self._n_rows:
+                values.extend([None] * (self._n_rows - len(values)))
+
+    def _column(self, name: str) -> list:
+        if name not in self._columns:
+            self._columns[name] = [None] * self._n_rows
+        return self._columns[name]
+
+    def add_record(self, record: dict, **constants) -> None:
+        """Adds a single row.
+
+        Args:
+            record (dict): mapping between column names and values.
+            **constants: values added to the row, e.g. asset_url.
+        """
+        for name, value in {**record, **constants}.items():
+            self._column(name).append(value)
+        self._pad(1)
+
+    def add_records(self, records: Iterable[dict], **constants) -> None:
+        for record in records:
+            self.add_record(record, **constants)
+
+    def add_frame(self, df: pd.DataFrame, **constants) -> None:
+        """Adds all rows of a dataframe.
+
+        Args:
+            df (pd.DataFrame): rows to add.
+            **constants: values set on every added row, e.g. asset_url.
+        """
+        n_added = len(df)
+        for name in df.columns.difference(list(constants), sort=False):
+            self._column(name).extend(df[name].tolist())
+        for name, value in constants.items():
+            self._column(name).extend([value] * n_added)
+        self._pad(n_added)
+
+    def to_frame(self, columns: Optional[list] = None) -> pd.DataFrame:
+        """Materialises the accumulated rows.
+
+        Args:
+            columns (Optional[list]): columns to create even if no row was added.
+
+        Returns:
+            pd.DataFrame: dataframe with one row per added row.
+        """
+        for name in columns or []:
+            self._column(name)
+        return pd.DataFrame(self._columns)
@@ -0,0 +1,236 @@
+import logging
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from asset_mapping_scrapping.utils.global_vars import HEADERS
+from asset_mapping_scrapping.utils.http_cache import HttpCache
+from asset_mapping_scrapping.utils.logger import current_source
+from asset_mapping_scrapping.utils.metrics import metrics
+from asset_mapping_scrapping.utils.throttle import Throttler, parse_retry_after
+
+logger = logging.getLogger("VerboseLogger")
+
+
+class HttpClient:
+    """Http client shared by all scrappers of a process. It keeps one `requests.Session` per
+    host, so that connections are kept alive and reused between calls, and the number of
+    simultaneous connections to a host is bounded by `pool_maxsize`. If `cache_dir` is set,
+    GET and POST responses go through an HttpCache, streamed (`stream=True`) ones included.
+    Requests are throttled per host, within the limits of their source, and throttled or failed
+    requests are retried with backoff (see Throttler).
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        timeout: float = 60,
+        headers: Optional[dict] = None,
+        cache_dir: Optional[str] = None,
+        cache_max_mb: float = 512,
+        throttle: Optional[dict] = None,
+    ):
+        """
+        Args:
+            pool_connections (int): number of connection pools kept per session.
+            pool_maxsize (int): maximum number of simultaneous connections to a host.
+            timeout (float): default timeout of requests, in seconds.
+            headers (Optional[dict]): default headers, HEADERS if None.
+            cache_dir (Optional[str]): folder of the on-disk response cache, no cache if None.
+            cache_max_mb (float): maximum size of the response cache, in MB.
+            throttle (Optional[dict]): `throttle` section of the yaml config, see Throttler.
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.headers = dict(HEADERS if headers is None else headers)
+        self.cache: Optional[HttpCache] = (
+            HttpCache(cache_dir, max_bytes=int(cache_max_mb * 2**20))
+            if cache_dir is not None
+            else None
+        )
+        self.throttler = Throttler(throttle)
+        self._sessions: dict = {}
+        self._lock = threading.Lock()
+
+    def session(self, url: str) -> requests.Session:
+        """Returns the session dedicated to the host of `url`, creating it if needed."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize,
+                    pool_block=True,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def request(
+        self, method: str, url: str, use_cache: bool = True, **kwargs
+    ) -> requests.Response:
+        """Sends a request through the session of the host of `url`.
+
+        Args:
+            method (str): http method.
+            url (str): url of the request.
+            use_cache (bool): whether the response cache may be used for this request.
+            **kwargs: arguments of `requests.Session.request`.
+
+        Returns:
+            requests.Response: response, possibly served from the cache.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session(url)
+        if (
+            self.cache is None
+            or not use_cache
+            or method.upper() not in ("GET", "POST")
+        ):
+            return self._send(session, method, url, **kwargs)
+
+        key = self.cache.key(
+            method,
+            url,
+            params=kwargs.get("params"),
+            data=kwargs.get("data"),
+            json_body=kwargs.get("json"),
+            headers=kwargs.get("headers"),
+        )
+        meta = self.cache.load(key)
+        if meta is not None:
+            kwargs["headers"] = {
+                **(kwargs.get("headers") or {}),
+                **self.cache.conditional_headers(meta),
+            }
+        response = self._send(session, method, url, **kwargs)
+        stream = bool(kwargs.get("stream"))
+        if meta is not None and response.status_code == 304:
+            self.cache.record("hits")
+            response.close()
+            return self.cache.to_response(key, meta, response, stream=stream)
+        self.cache.record("misses" if meta is None else "revalidations")
+        if stream:
+            # the body is copied to disk as it is received and read back from there
+            return self.cache.store_stream(key, response)
+        self.cache.store(key, response)
+        return response
+
+    def _send(
+        self, session: requests.Session, method: str, url: str, **kwargs
+    ) -> requests.Response:
+        """Sends a request within the limits of its host, retrying it on connection errors,
+        timeouts and retryable status codes, as long as the retry budget of the source allows.
+        A Retry-After header pauses the whole host; otherwise the request is retried after a
+        jittered exponential backoff. The last response, or error, is returned, or raised.
+        """
+        source = current_source()
+        host = urlsplit(url).netloc
+        policy = self.throttler.policy(source)
+        limiter = self.throttler.limiter(source, host)
+        attempt = 0
+        while True:
+            response, error = None, None
+            started_at = limiter.acquire()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            finally:
+                limiter.release(
+                    started_at,
+                    throttled=error is not None
+                    or (response is not None and response.status_code in policy.throttle_statuses),
+                )
+            if response is not None:
+                metrics.record_response(url, response, streamed=bool(kwargs.get("stream")))
+                if response.status_code not in policy.retry_statuses:
+                    return response
+            reason = str(response.status_code) if error is None else type(error).__name__
+
+            retry_after = (
+                parse_retry_after(response.headers.get("Retry-After"))
+                if response is not None
+                else None
+            )
+            if (
+                attempt >= policy.max_retries
+                or method.upper() not in policy.retry_methods
+                or (retry_after is not None and retry_after > policy.max_retry_after)
+                or not self.throttler.budget(source).spend()
+            ):
+                if error is not None:
+                    raise error
+                return response
+            if retry_after is not None:
+                delay = retry_after
+                limiter.pause(retry_after)
+            else:
+                delay = policy.backoff(attempt)
+            if response is not None:
+                response.close()
+            metrics.inc("http_retries_total", host=host, reason=reason)
+            logger.warning(
+                f"Retrying {method} {url} in {delay:.1f}s after {reason} "
+                f"(retry {attempt + 1}/{policy.max_retries})."
+            )
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+
+_http_client: Optional[HttpClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Returns the http client of the process, created with default settings on first use."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient()
+        return _http_client
+
+
+def http_cache_stats() -> dict:
+    """Hit, miss and revalidation counts of the response cache of the process."""
+    cache = get_http_client().cache
+    return dict(cache.stats) if cache is not None else {}
+
+
+def merge_http_cache_stats(stats: dict) -> None:
+    """Adds cache counts recorded in a child process to the ones of this process."""
+    cache = get_http_client().cache
+    if cache is not None:
+        cache.merge(stats)
+
+
+def configure_http_client(**kwargs) -> HttpClient:
+    """Replaces the http client of the process. Keyword arguments are the ones of HttpClient,
+    typically read from the `http` section of the yaml config.
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = HttpClient(**kwargs)
+        return _http_client
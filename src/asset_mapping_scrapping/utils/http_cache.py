@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class HttpCache:
+    """Persistent cache of http responses. Responses carrying an `ETag` or a `Last-Modified`
+    header are stored on disk; the next identical request is sent with `If-None-Match` /
+    `If-Modified-Since` and a 304 answer is served from disk. When the cache grows beyond
+    `max_bytes`, least recently used entries are evicted.
+
+    Each entry is made of two files named after the cache key: `<key>.json` with the status,
+    headers and url of the response, and `<key>.body` with its content.
+    """
+
+    def __init__(self, directory: str = ".http_cache", max_bytes: int = 512 * 2**20):
+        """
+        Args:
+            directory (str): folder where responses are stored.
+            max_bytes (int): maximum size of the cache on disk.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats: dict = {"hits": 0, "misses": 0, "revalidations": 0}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def key(
+        method: str,
+        url: str,
+        params: Optional[dict] = None,
+        data=None,
+        json_body=None,
+        headers: Optional[dict] = None,
+    ) -> str:
+        """Builds the cache key of a request. The body (e.g. a GraphQL payload) is part of the
+        key, so that different queries sent to the same url are cached separately.
+        """
+        body = data if isinstance(data, (str, bytes)) else json.dumps(data, sort_keys=True)
+        if isinstance(body, str):
+            body = body.encode()
+        parts = [
+            method.upper(),
+            url,
+            json.dumps(params, sort_keys=True, default=str),
+            hashlib.sha256(body).hexdigest(),
+            hashlib.sha256(
+                json.dumps(json_body, sort_keys=True, default=str).encode()
+            ).hexdigest(),
+            json.dumps(
+                {k.lower(): v for k, v in (headers or {}).items()}, sort_keys=True
+            ),
+        ]
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def _entries(self):
+        """Yields (key, last access time, size) of every entry on disk."""
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            key = name[: -len(".json")]
+            try:
+                meta_stat = os.stat(self._path(key, "json"))
+                body_size = os.path.getsize(self._path(key, "body"))
+            except FileNotFoundError:
+                continue
+            yield key, meta_stat.st_mtime, meta_stat.st_size + body_size
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def merge(self, stats: dict) -> None:
+        """Adds counts recorded by another process (process backend) to this cache."""
+        with self._lock:
+            for outcome, count in stats.items():
+                self.stats[outcome] = self.stats.get(outcome, 0) + count
+
+    def load(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key, "json")) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not os.path.exists(self._path(key, "body")):
+            return None
+        return meta
+
+    @staticmethod
+    def conditional_headers(meta: dict) -> dict:
+        headers = {}
+        if meta["headers"].get("ETag"):
+            headers["If-None-Match"] = meta["headers"]["ETag"]
+        if meta["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+        return headers
+
+    @staticmethod
+    def _is_storable(response: requests.Response) -> bool:
+        """Whether a response is successful and can be revalidated later."""
+        return response.status_code == 200 and (
+            "ETag" in response.headers or "Last-Modified" in response.headers
+        )
+
+    def _tmp_path(self, key: str, suffix: str) -> str:
+        return f"{self._path(key, suffix)}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def _write_entry(self, key: str, response: requests.Response, body_tmp_path: str) -> dict:
+        """Publishes an entry whose body was written to `body_tmp_path`, and returns its
+        metadata. Files are written to temporary paths first, so that a concurrent reader never
+        sees half an entry.
+        """
+        meta = {
+            "url": response.url,
+            "status_code": response.status_code,
+            "encoding": response.encoding,
+            "headers": dict(response.headers),
+            "stored_at": time.time(),
+        }
+        previous = sum(
+            os.path.getsize(self._path(key, suffix))
+            for suffix in ("json", "body")
+            if os.path.exists(self._path(key, suffix))
+        )
+        body_size = os.path.getsize(body_tmp_path)
+        os.replace(body_tmp_path, self._path(key, "body"))
+        meta_tmp_path = self._tmp_path(key, "json")
+        with open(meta_tmp_path, "w") as f:
+            f.write(json.dumps(meta))
+        os.replace(meta_tmp_path, self._path(key, "json"))
+        with self._lock:
+            self._size += body_size + len(json.dumps(meta)) - previous
+        if self._size > self.max_bytes:
+            self.evict()
+        return meta
+
+    def store(self, key: str, response: requests.Response) -> None:
+        """Stores a successful response if it can be revalidated later."""
+        if not self._is_storable(response):
+            return
+        body_tmp_path = self._tmp_path(key, "body")
+        with open(body_tmp_path, "wb") as f:
+            f.write(response.content)
+        self._write_entry(key, response, body_tmp_path)
+
+    def store_stream(
+        self, key: str, response: requests.Response, chunk_size: int = 2**16
+    ) -> requests.Response:
+        """Same as `store` for a response requested with `stream=True`: its body is copied to
+        disk chunk by chunk, never held in memory, and the returned response streams it back
+        from disk. Responses that cannot be stored are returned untouched.
+
+        Args:
+            key (str): cache key of the request.
+            response (requests.Response): streamed response received.
+            chunk_size (int): size of the chunks copied to disk, in bytes.
+
+        Returns:
+            requests.Response: response to read instead of `response`.
+        """
+        if not self._is_storable(response):
+            return response
+        body_tmp_path = self._tmp_path(key, "body")
+        try:
+            with open(body_tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size):
+                    f.write(chunk)
+        except BaseException:
+            os.remove(body_tmp_path)
+            raise
+        finally:
+            response.close()
+        meta = self._write_entry(key, response, body_tmp_path)
+        return self.to_response(key, meta, response, stream=True)
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the cache fits in `max_bytes`."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[1])
+            self._size = sum(size for _, _, size in entries)
+            for key, _, size in entries:
+                if self._size <= self.max_bytes:
+                    break
+                for suffix in ("json", "body"):
+                    try:
+                        os.remove(self._path(key, suffix))
+                    except FileNotFoundError:
+                        pass
+                self._size -= size
+
+    def to_response(
+        self,
+        key: str,
+        meta: dict,
+        revalidation: requests.Response,
+        stream: bool = False,
+    ) -> requests.Response:
+        """Builds the response served from disk after a 304 answer.
+
+        Args:
+            key (str): cache key of the request.
+            meta (dict): metadata of the cache entry.
+            revalidation (requests.Response): the 304 response.
+            stream (bool): whether the content is read lazily from disk, through
+            `iter_content`, instead of being loaded at once.
+
+        Returns:
+            requests.Response: response with the stored content.
+        """
+        if stream:
+            # the open file keeps the body readable even if the entry is replaced or evicted
+            body = open(self._path(key, "body"), "rb")
+        else:
+            with open(self._path(key, "body"), "rb") as f:
+                content = f.read()
+        # marks the entry as recently used for eviction
+        os.utime(self._path(key, "json"))
+        response = requests.Response()
+        response.status_code = meta["status_code"]
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        response.url = meta["url"]
+        response.encoding = meta["encoding"]
+        response.request = revalidation.request
+        response.elapsed = revalidation.elapsed
+        if stream:
+            response.raw = body
+            response._content = False
+        else:
+            response._content = content
+        response.from_cache = True
+        return response
@@ -0,0 +1,189 @@
+import codecs
+import json
+import re
+from typing import Iterable, Iterator, Optional, Union
+
+_STRUCTURAL = re.compile(r'[{}\[\]",:]')
+_STRING_END = re.compile(r'(?:[^"\\]|\\.)*"', re.S)
+_NOT_WHITESPACE = re.compile(r"\S")
+# characters that may continue a number, e.g. "5.5e" + "2"
+_NUMBER_TAIL = re.compile(r"[0-9eE+\-.]*")
+_DECODER = json.JSONDecoder()
+
+
+class JsonItemParser:
+    """Incremental parser yielding the values found at a path of a JSON document, e.g. the
+    items of an array, as the document is received. Only the structure around the values is
+    scanned in python; every value is decoded at once by the json module as soon as it is
+    complete, so memory is proportional to the largest value rather than to the document.
+
+    A path is a tuple of object keys and array indices, "*" matching any key or index:
+    ("data", "items", "*") yields the elements of the array `data.items`, and
+    ("data", "*", "properties", "items", "*") the ones of `properties.items` in every value
+    of the object `data`.
+
+    The containers of the values found in the document, e.g. ("data", "hk", "properties",
+    "items"), are listed in `containers`: a document without any container, such as an error
+    payload, yields no value rather than failing.
+    """
+
+    def __init__(self, path: tuple):
+        self.path = tuple(path)
+        # one frame per open container: [is_object, current key or index, expecting a key]
+        self._stack: list = []
+        self._buffer = ""
+        self._expect_value = True
+        # length of an incomplete value to reach before trying to decode it again
+        self._retry_length = 0
+        self._closed = False
+        # concrete paths of the containers opened at `path[:-1]`
+        self.containers: list = []
+
+    def _matches(self, path: tuple) -> bool:
+        return len(self._stack) == len(path) and all(
+            step == "*" or step == frame[1] for step, frame in zip(path, self._stack)
+        )
+
+    def feed(self, text: str) -> list:
+        """Parses the next part of the document.
+
+        Args:
+            text (str): next characters of the document.
+
+        Returns:
+            list: values at `path` completed by this part, in document order.
+        """
+        buffer = self._buffer + text
+        position = 0
+        items = []
+        while True:
+            if self._expect_value:
+                match = _NOT_WHITESPACE.search(buffer, position)
+                if match is None:
+                    position = len(buffer)
+                    break
+                position = match.start()
+                if buffer[position] not in "]}" and self._matches(self.path):
+                    if len(buffer) - position < self._retry_length:
+                        break
+                    try:
+                        item, end = _DECODER.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        end = None
+                    # a number at the end of the buffer may go on in the next part
+                    if end is None or (
+                        not self._closed
+                        and isinstance(item, (int, float))
+                        and not isinstance(item, bool)
+                        and _NUMBER_TAIL.fullmatch(buffer, end) is not None
+                    ):
+                        self._retry_length = 2 * (len(buffer) - position)
+                        break
+                    items.append(item)
+                    position = end
+                    self._retry_length = 0
+                self._expect_value = False
+                continue
+
+            match = _STRUCTURAL.search(buffer, position)
+            if match is None:
+                position = len(buffer)
+                break
+            char, start = match.group(), match.start()
+            if char == '"':
+                end = _STRING_END.match(buffer, start + 1)
+                if end is None:
+                    position = start
+                    break
+                position = end.end()
+                if self._stack and self._stack[-1][0] and self._stack[-1][2]:
+                    self._stack[-1][1] = json.loads(buffer[start:position])
+                    self._stack[-1][2] = False
+                continue
+            position = start + 1
+            if char in "{[" and self.path and self._matches(self.path[:-1]):
+                self.containers.append(tuple(frame[1] for frame in self._stack))
+            if char == "{":
+                self._stack.append([True, None, True])
+            elif char == "[":
+                self._stack.append([False, 0, False])
+                self._expect_value = True
+            elif char in "}]":
+                if not self._stack:
+                    raise ValueError(f"Unexpected {char} at the end of the JSON document.")
+                self._stack.pop()
+            elif char == ":":
+                self._expect_value = True
+            elif self._stack[-1][0]:
+                self._stack[-1][2] = True
+            else:
+                self._stack[-1][1] += 1
+                self._expect_value = True
+        self._buffer = buffer[position:]
+        return items
+
+    def close(self) -> list:
+        """Ends the document, returning the values still held in the buffer.
+
+        Raises:
+            ValueError: if the document is truncated or invalid.
+        """
+        self._closed = True
+        self._retry_length = 0
+        items = self.feed("")
+        if self._buffer.strip() or self._stack:
+            raise ValueError("Truncated or invalid JSON document.")
+        return items
+
+
+def iter_json_items(
+    chunks: Iterable[bytes],
+    path: tuple,
+    required: Union[bool, Iterable[tuple]] = False,
+    collect: Optional[dict] = None,
+) -> Iterator:
+    """Yields the values at `path` of a JSON document received in chunks, see JsonItemParser.
+
+    Args:
+        chunks (Iterable[bytes]): utf-8 encoded document, e.g. `response.iter_content()`.
+        path (tuple): keys and indices leading to the values, "*" matching any of them.
+        required (Union[bool, Iterable[tuple]]): if True, ValueError is raised at the end of
+        the document when no container of the values was found at `path[:-1]`, e.g. for an
+        error payload or after a change of schema. An iterable of concrete paths, e.g.
+        [("data", "map0", "properties", "items")], requires every one of these containers.
+        collect (Optional[dict]): maps other paths to lists, filled with the values found at
+        these paths, e.g. {("errors", "*"): errors} for the errors of a GraphQL response.
+
+    Yields:
+        values at `path`, in document order.
+
+    Raises:
+        ValueError: if the document is truncated or invalid, or a required container is
+        missing.
+    """
+    parser = JsonItemParser(path)
+    collectors = [(JsonItemParser(other), values) for other, values in (collect or {}).items()]
+    decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def feed(text: str) -> list:
+        for collector, values in collectors:
+            values.extend(collector.feed(text))
+        return parser.feed(text)
+
+    for chunk in chunks:
+        yield from feed(decoder.decode(chunk))
+    yield from feed(decoder.decode(b"", final=True))
+    for collector, values in collectors:
+        values.extend(collector.close())
+    yield from parser.close()
+    if required is True:
+        if not parser.containers:
+            raise ValueError(f"No container at {path[:-1]} in the JSON document.")
+    elif required:
+        missing = [
+            container for container in required if tuple(container) not in parser.containers
+        ]
+        if missing:
+            raise ValueError(
+                f"No container at {', '.join(map(str, missing))} in the JSON document."
+            )
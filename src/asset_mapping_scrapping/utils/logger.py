@@ -1,32 +1,256 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
 import datetime
+import multiprocessing
 import os
-import sys
+import queue
+import threading
+import contextlib
+import contextvars
+from collections import defaultdict
+from typing import Optional
+
+_current_source: contextvars.ContextVar = contextvars.ContextVar(
+    "source", default="main"
+)
+_current_stage: contextvars.ContextVar = contextvars.ContextVar("stage", default="")
+
+
+@contextlib.contextmanager
+def source_context(source_name: str):
+    """Attributes every log record emitted in the block to `source_name`. The
+    context is local to the running thread, so concurrent sources do not mix.
+
+    Args:
+        source_name (str): name of the scrapper being run.
+    """
+    token = _current_source.set(source_name)
+    try:
+        yield
+    finally:
+        _current_source.reset(token)
+
+
+@contextlib.contextmanager
+def stage_context(stage: str):
+    """Tags every log record emitted in the block with `stage` (main_page, asset_pages...).
+    Used by `metrics.stage`, so that records and durations share the same stages.
+    """
+    token = _current_stage.set(stage)
+    try:
+        yield
+    finally:
+        _current_stage.reset(token)
+
+
+def current_source() -> str:
+    """Name of the source the running code is attributed to, "main" outside of any source."""
+    return _current_source.get()
+
+
+def current_stage() -> str:
+    """Stage the running code belongs to, "" outside of any stage."""
+    return _current_stage.get()
+
+
+class SourceFilter(logging.Filter):
+    """Tags records with the source and stage of the thread emitting them. It must run in that
+    thread, i.e. on the handlers of the logger, not on the ones of a QueueListener.
+    """
+
+    def filter(self, record):
+        if not hasattr(record, "source"):
+            record.source = _current_source.get()
+            record.stage = _current_stage.get()
+        return True
 
 
 class LoggingCounter(logging.Handler):
+    """Counts the warnings and errors logged by every source. Counting happens in the thread
+    emitting the record, under the lock of the handler, so that counts are exact as soon as a
+    source ends, whatever the number of threads. Child processes count their own records, and
+    the parent merges their counts (see `merge`).
+    """
+
     def __init__(self):
         super().__init__()
-        self.warning_count = 0
-        self.error_count = 0
+        self.counts: dict = defaultdict(lambda: {"warning": 0, "error": 0})
+
+    @property
+    def warning_count(self) -> int:
+        with self.lock:
+            return sum(count["warning"] for count in self.counts.values())
+
+    @property
+    def error_count(self) -> int:
+        with self.lock:
+            return sum(count["error"] for count in self.counts.values())
+
+    def counts_for(self, source_name: str) -> dict:
+        with self.lock:
+            return dict(self.counts[source_name])
+
+    def merge(self, source_name: str, warning_count: int, error_count: int) -> None:
+        """Adds counts recorded in another process (process backend) to this counter."""
+        with self.lock:
+            self.counts[source_name]["warning"] += warning_count
+            self.counts[source_name]["error"] += error_count
+
+    def clear(self, source_name: str) -> None:
+        """Resets the counts of a source, e.g. before it is scrapped again."""
+        with self.lock:
+            self.counts.pop(source_name, None)
 
     def emit(self, record):
+        # called by `handle`, which holds self.lock
+        source = getattr(record, "source", _current_source.get())
         if record.levelno == logging.WARNING:
-            self.warning_count += 1
+            self.counts[source]["warning"] += 1
         elif record.levelno == logging.ERROR:
-            self.error_count += 1
+            self.counts[source]["error"] += 1
 
 
-if not os.path.exists("logs/"):
-    os.makedirs("logs")
-logging.basicConfig(
-    filename=f"logs/{str(datetime.date.today())}.log",
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s",
-)
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single JSON line, with its source and stage."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "source": getattr(record, "source", "main"),
+            "stage": getattr(record, "stage", ""),
+            "message": record.getMessage(),
+            "logger": record.name,
+            "file": f"{record.filename}:{record.lineno}",
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler keeping the traceback apart from the message, so that the JSON records
+    have an `exception` field, and the record picklable for a multiprocessing queue.
+    """
+
+    def prepare(self, record):
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        record.stack_info = None
+        return record
+
+
+class _LogFileHandler(logging.FileHandler):
+    """Handler writing the log of the day, `<directory>/<date>.jsonl`. The directory and the
+    file are created when the first record is written, so that importing the package writes
+    nothing.
+    """
+
+    def __init__(self, directory: str = "logs"):
+        super().__init__(self.path(directory), delay=True)
+
+    @staticmethod
+    def path(directory: str) -> str:
+        return os.path.abspath(os.path.join(directory, f"{datetime.date.today()}.jsonl"))
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+    def set_directory(self, directory: str) -> None:
+        with self.lock:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = self.path(directory)
+
 
 logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# slow handlers (disk, console) run in the thread of a QueueListener: emitting a record only
+# puts it in a queue
+file_handler = _LogFileHandler()
+file_handler.setFormatter(JsonFormatter())
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(logging.Formatter("[%(source)s] %(message)s"))
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_listener = logging.handlers.QueueListener(
+    _log_queue, file_handler, stream_handler, respect_handler_level=True
+)
+_listener.start()
+# listeners run in the process that imported the module first, not in forked children
+_owner_pid = os.getpid()
+# records of child processes (process backend), created on first use
+_process_log_queue: Optional[multiprocessing.Queue] = None
+_process_listener: Optional[logging.handlers.QueueListener] = None
+_process_lock = threading.Lock()
 
 logging_counter = LoggingCounter()
 logger.addHandler(logging_counter)
-logger.addHandler(logging.StreamHandler())
+queue_handler = _QueueHandler(_log_queue)
+logger.addHandler(queue_handler)
+for handler in logger.handlers:
+    handler.addFilter(SourceFilter())
+
+
+def set_log_directory(directory: str) -> None:
+    """Writes the log files to `directory` instead of `logs/`, from the next record on."""
+    file_handler.set_directory(directory)
+
+
+def process_log_queue() -> multiprocessing.Queue:
+    """Queue to pass to child processes (see `log_to_queue`); its records are written by the
+    handlers of this process.
+    """
+    global _process_log_queue, _process_listener
+    with _process_lock:
+        if _process_log_queue is None:
+            _process_log_queue = multiprocessing.Queue()
+            _process_listener = logging.handlers.QueueListener(
+                _process_log_queue, file_handler, stream_handler, respect_handler_level=True
+            )
+            _process_listener.start()
+        return _process_log_queue
+
+
+def log_to_queue(log_queue: multiprocessing.Queue) -> None:
+    """Sends the records of this (child) process to the parent through `log_queue`, instead of
+    writing them to the log file and console itself. Warnings and errors are still counted in
+    this process, and sent to the parent with the report of the source.
+    """
+    if os.getpid() == _owner_pid:
+        # spawned child, which started its own listener on import
+        _listener.stop()
+    queue_handler.queue = log_queue
+
+
+def stop_logging() -> None:
+    """Writes the records still queued and stops the listeners, at exit."""
+    if os.getpid() != _owner_pid:
+        return
+    _listener.stop()
+    with _process_lock:
+        if _process_listener is not None:
+            _process_listener.stop()
+
+
+atexit.register(stop_logging)
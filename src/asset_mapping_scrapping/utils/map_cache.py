@@ -0,0 +1,250 @@
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+def normalize_url(url: str) -> str:
+    """Normalises a url so that equivalent urls share the same cache entry: lower case scheme
+    and host, no default port, no fragment, sorted query parameters and no trailing slash.
+
+    Args:
+        url (str): url to normalise.
+
+    Returns:
+        str: normalised url.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+    if (scheme, netloc.rsplit(":", 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parts.path.rstrip("/") if parts.path not in ("", "/") else ""
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+class ResolutionCache:
+    """Persistent cache of map url resolutions, stored in a SQLite file. Entries expire after
+    `ttl` seconds and the least recently used ones are evicted beyond `max_entries`.
+    Concurrent lookups of the same url are deduplicated: only the first caller resolves it,
+    the other ones wait for its result.
+
+    Every thread of every process opens its own connection when it first uses the cache: a
+    SQLite connection must not be used by a forked process, e.g. a worker of the process
+    backend, and a connection per thread lets lookups run concurrently.
+    """
+
+    def __init__(
+        self,
+        path: str = ".map_cache.sqlite",
+        ttl_days: float = 30,
+        max_entries: int = 100_000,
+    ):
+        """
+        Args:
+            path (str): path of the SQLite file.
+            ttl_days (float): lifetime of an entry, in days.
+            max_entries (int): maximum number of entries kept.
+        """
+        self.path = path
+        self.ttl = ttl_days * 24 * 3600
+        self.max_entries = max_entries
+        self._pid = None
+        self._reset()
+
+    def _reset(self) -> None:
+        """Forgets the connections, locks and lookups in progress, e.g. the ones a forked
+        process inherited from its parent.
+        """
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._inflight: dict = {}
+        self._n_inserts = 0
+        self._local = threading.local()
+        self._connections: list = []
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection of the calling thread, opened on first use."""
+        if self._pid != os.getpid():
+            self._reset()
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            with connection:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute(
+                    """CREATE TABLE IF NOT EXISTS resolutions (
+                        namespace TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        value TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL,
+                        PRIMARY KEY (namespace, key)
+                    )"""
+                )
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS resolutions_accessed_at "
+                    "ON resolutions (accessed_at)"
+                )
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def close(self) -> None:
+        """Closes the connections opened by the threads of this process. The cache can still
+        be used afterwards: connections are opened again on demand.
+        """
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for connection in connections:
+            connection.close()
+
+    def get(self, namespace: str, key: str) -> Optional[object]:
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            row = connection.execute(
+                "SELECT value, created_at FROM resolutions WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                return None
+            connection.execute(
+                "UPDATE resolutions SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key),
+            )
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: object) -> None:
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now, now),
+            )
+        with self._lock:
+            self._n_inserts += 1
+            evict = self._n_inserts % 100 == 0
+        if evict:
+            with connection:
+                self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        connection.execute(
+            "DELETE FROM resolutions WHERE created_at < ?", (time.time() - self.ttl,)
+        )
+        connection.execute(
+            """DELETE FROM resolutions WHERE rowid IN (
+                SELECT rowid FROM resolutions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )""",
+            (self.max_entries,),
+        )
+
+    def resolve(
+        self,
+        namespace: str,
+        url: str,
+        resolver: Callable[[str], object],
+        is_cacheable: Callable[[object], bool] = lambda value: True,
+    ) -> object:
+        """Returns the cached resolution of `url`, calling `resolver` on a miss.
+
+        Args:
+            namespace (str): kind of resolution, e.g. the name of the resolving function.
+            url (str): url to resolve.
+            resolver (Callable[[str], object]): function resolving the url.
+            is_cacheable (Callable[[object], bool]): whether a result may be stored.
+
+        Returns:
+            object: json-like result of the resolution.
+        """
+        key = normalize_url(url)
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+        # after `get`, which resets the state inherited by a forked process
+        with self._lock:
+            future = self._inflight.get((namespace, key))
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[(namespace, key)] = future
+        if not owner:
+            return future.result()
+        try:
+            # another caller may have stored it between the first lookup and now
+            value = self.get(namespace, key)
+            if value is None:
+                value = resolver(url)
+                if is_cacheable(value):
+                    self.set(namespace, key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[(namespace, key)]
+
+
+_resolution_cache: Optional[ResolutionCache] = None
+_resolution_cache_lock = threading.Lock()
+
+
+def get_resolution_cache() -> ResolutionCache:
+    global _resolution_cache
+    with _resolution_cache_lock:
+        if _resolution_cache is None:
+            _resolution_cache = ResolutionCache()
+        return _resolution_cache
+
+
+def configure_resolution_cache(**kwargs) -> ResolutionCache:
+    """Replaces the resolution cache of the process, closing the previous one. Keyword
+    arguments are the ones of ResolutionCache, typically read from the `map_cache` section of
+    the yaml config.
+    """
+    global _resolution_cache
+    with _resolution_cache_lock:
+        if _resolution_cache is not None:
+            _resolution_cache.close()
+        _resolution_cache = ResolutionCache(**kwargs)
+        return _resolution_cache
+
+
+def cached_resolution(
+    namespace: str,
+    is_cacheable: Callable[[object], bool] = lambda value: True,
+    decode: Callable[[object], object] = lambda value: value,
+):
+    """Decorator caching the result of a function resolving a single url.
+
+    Args:
+        namespace (str): kind of resolution.
+        is_cacheable (Callable[[object], bool]): whether a result may be stored.
+        decode (Callable[[object], object]): rebuilds the result from its json form.
+    """
+
+    def wrapper(func):
+        @functools.wraps(func)
+        def cached_func(url: str):
+            return decode(
+                get_resolution_cache().resolve(namespace, url, func, is_cacheable)
+            )
+
+        cached_func.uncached = func
+        return cached_func
+
+    return wrapper
@@ -1,19 +1,52 @@
-from bs4 import BeautifulSoup
 import pandas as pd
-import requests
 import re
 import ast
-from asset_mapping_scrapping.utils.global_vars import HEADERS
+import json
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Tuple, Union
+from asset_mapping_scrapping.utils.http import get_http_client
+from asset_mapping_scrapping.utils.map_cache import cached_resolution
+from asset_mapping_scrapping.utils.metrics import metrics
 
+logger = logging.getLogger("VerboseLogger")
 
-def parse_google_map(s_url):
-    print(f"Parsing `{s_url}`")
-    o_response = requests.get(s_url, headers=HEADERS)
-    o_soup = BeautifulSoup(o_response.content, features="html.parser")
+
+_INIT_EMBED_CALL = re.compile(r"initEmbed\(\s*")
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _extract_init_embed(page: Union[str, bytes]) -> list:
+    """Fast path: finds the `initEmbed(...)` call of a google maps embed page and decodes its
+    payload as JSON, without building the html tree.
+
+    Raises:
+        ValueError: if there is no `initEmbed` call or its payload is not valid JSON.
+    """
+    if isinstance(page, bytes):
+        page = page.decode("utf-8", errors="replace")
+    match = _INIT_EMBED_CALL.search(page)
+    if match is None:
+        raise ValueError("No initEmbed call found in page.")
+    l_content, _ = _JSON_DECODER.raw_decode(page, match.end())
+    return l_content
+
+
+def _extract_init_embed_legacy(page: Union[str, bytes]) -> list:
+    """Slow path: reads the payload of the `initEmbed(...)` call in the first script of the page
+    as a python literal.
+    """
+    from bs4 import BeautifulSoup
+
+    o_soup = BeautifulSoup(page, features="html.parser")
     s_script = o_soup.find("script").text
-    l_content = ast.literal_eval(
+    return ast.literal_eval(
         re.findall("initEmbed\((.*)\);", s_script)[0].replace("null", "None")
     )
+
+
+def _parse_init_embed(l_content: list) -> Tuple[str, float, float]:
     if (l_content[21][3] is not None):
         s_address_1 = l_content[21][3][13]
         s_address_2 = l_content[21][3][0][1]
@@ -33,6 +66,34 @@ def parse_google_map(s_url):
         return s_address, f_latitude, f_longitude
 
 
+def parse_embed_page(page: Union[str, bytes]) -> Tuple[str, float, float]:
+    """Extracts the address and coordinates of a google maps embed page. The JSON fast path is
+    tried first, the BeautifulSoup / literal_eval path is kept as a fallback.
+
+    Args:
+        page (Union[str, bytes]): html of the embed page.
+
+    Returns:
+        Tuple[str, float, float]: address, latitude and longitude.
+    """
+    with metrics.stage("parse"):
+        try:
+            l_content = _extract_init_embed(page)
+        except ValueError:
+            l_content = _extract_init_embed_legacy(page)
+        return _parse_init_embed(l_content)
+
+
+@cached_resolution("parse_google_map", decode=tuple)
+def parse_google_map(s_url):
+    print(f"Parsing `{s_url}`")
+    o_response = get_http_client().get(s_url)
+    return parse_embed_page(o_response.content)
+
+
+@cached_resolution(
+    "decode_ggmaps_url", is_cacheable=lambda value: value["latitude"] is not None
+)
 def decode_ggmaps_url(ggmaps_url: str) -> dict:
     """Extracts the latitude and longitude data from a url pointing to google maps, in its contracted
     format. Ex: http://goo.gl/maps/cfD5s
@@ -43,7 +104,7 @@ def decode_ggmaps_url(ggmaps_url: str) -> dict:
     Returns:
         dict: dictionary with keys latitude and longitude
     """
-    r = requests.get(ggmaps_url, headers=HEADERS)
+    r = get_http_client().get(ggmaps_url)
     if r.status_code == 200:
         redirection_url = r.url
         match = re.search(
@@ -59,3 +120,79 @@ def decode_ggmaps_url(ggmaps_url: str) -> dict:
     else:
         latitude, longitude = None, None
     return {"latitude": latitude, "longitude": longitude}
+
+
+def _resolve_many(
+    resolver: Callable[[str], object], urls: Iterable[str], max_workers: int
+) -> list:
+    """Calls `resolver` on every url with at most `max_workers` calls at the same time.
+
+    Returns:
+        list: (url, result, error) for every url, in the order of `urls`. result is None
+        and error the representation of the exception when the resolution failed.
+    """
+
+    def resolve(url):
+        try:
+            return url, resolver(url), None
+        except Exception as e:
+            logger.warning(f"Could not resolve map url {url}: {e!r}")
+            return url, None, repr(e)
+
+    urls = list(urls)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, resolve, url) for url in urls
+        ]
+        return [future.result() for future in futures]
+
+
+def resolve_map_urls(urls: Iterable[str], max_workers: int = 8) -> pd.DataFrame:
+    """Batch version of `parse_google_map`. Urls are resolved concurrently, and a url shared
+    by several assets is only fetched once.
+
+    Args:
+        urls (Iterable[str]): google maps embed urls.
+        max_workers (int): maximum number of urls resolved at the same time.
+
+    Returns:
+        pd.DataFrame: one row per url, in input order, with columns url, address, latitude,
+        longitude and error (None when the resolution succeeded).
+    """
+    rows = []
+    for url, result, error in _resolve_many(parse_google_map, urls, max_workers):
+        address, latitude, longitude = result if result is not None else (None,) * 3
+        rows.append(
+            {
+                "url": url,
+                "address": address,
+                "latitude": latitude,
+                "longitude": longitude,
+                "error": error,
+            }
+        )
+    return pd.DataFrame(
+        rows, columns=["url", "address", "latitude", "longitude", "error"]
+    )
+
+
+def decode_ggmaps_urls(urls: Iterable[str], max_workers: int = 8) -> pd.DataFrame:
+    """Batch version of `decode_ggmaps_url`.
+
+    Args:
+        urls (Iterable[str]): google maps urls in contracted format.
+        max_workers (int): maximum number of urls decoded at the same time.
+
+    Returns:
+        pd.DataFrame: one row per url, in input order, with columns url, address, latitude,
+        longitude and error. address is always None since short links only carry
+        coordinates; it is there so that results of both batch functions can be merged
+        the same way into a scrapper's dataframe.
+    """
+    rows = []
+    for url, result, error in _resolve_many(decode_ggmaps_url, urls, max_workers):
+        result = result if result is not None else {"latitude": None, "longitude": None}
+        rows.append({"url": url, "address": None, **result, "error": error})
+    return pd.DataFrame(
+        rows, columns=["url", "address", "latitude", "longitude", "error"]
+    )
@@ -0,0 +1,205 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+from asset_mapping_scrapping.utils.logger import current_source, stage_context
+
+# prefix of the metric names in the Prometheus textfile
+PREFIX: str = "asset_scrapper_"
+
+# help text of the metrics written by the scrapper
+DESCRIPTIONS: dict = {
+    "stage_duration_seconds": "Time spent in a stage of the scrapping of a source.",
+    "http_responses_total": "Http responses received, by host and status code.",
+    "http_downloaded_bytes_total": "Bytes of http response bodies downloaded, by host.",
+    "http_retries_total": "Http requests retried, by host and reason.",
+    "rows": "Rows of the scrapped dataframe of a source.",
+    "exported_rows_total": "Rows exported to s3.",
+    "exported_bytes_total": "Bytes uploaded to s3.",
+    "source_succeeded": "1 if the scrapping of the source succeeded, 0 otherwise.",
+    "source_skipped": "1 if the source was skipped because its main page was unchanged.",
+    "log_records": "Warnings and errors logged while scrapping a source.",
+}
+
+
+class Metrics:
+    """Thread-safe registry of the metrics of a run. Every value is labelled with the source
+    being scrapped (see `source_context`), so that a slow source or stage can be told apart.
+
+    Three kinds of metrics are kept, as in Prometheus: counters (`inc`), gauges (`set`) and
+    summaries of durations (`observe`, keeping the sum, count and max of the observations).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (kind, name, labels) -> value, or [sum, count, max] for summaries
+        self._values: dict = {}
+
+    @staticmethod
+    def _labels(labels: dict) -> tuple:
+        labels.setdefault("source", current_source())
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = ("counter", name, self._labels(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        key = ("gauge", name, self._labels(labels))
+        with self._lock:
+            self._values[key] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = ("summary", name, self._labels(labels))
+        with self._lock:
+            summary = self._values.setdefault(key, [0.0, 0, 0.0])
+            summary[0] += value
+            summary[1] += 1
+            summary[2] = max(summary[2], value)
+
+    @contextlib.contextmanager
+    def stage(self, stage: str, **labels):
+        """Times the block as an observation of stage_duration_seconds{stage=...}. Log records
+        emitted in the block are tagged with the stage.
+        """
+        start = time.perf_counter()
+        try:
+            with stage_context(stage):
+                yield
+        finally:
+            self.observe(
+                "stage_duration_seconds", time.perf_counter() - start, stage=stage, **labels
+            )
+
+    def record_response(self, url: str, response, streamed: bool = False) -> None:
+        """Counts an http response and the bytes of its body.
+
+        Args:
+            url (str): url of the request.
+            response (requests.Response): response received.
+            streamed (bool): whether the body is streamed, in which case its bytes are counted
+            as they are read through `response.iter_content`: Content-Length is missing from
+            chunked responses and is the compressed size of compressed ones.
+        """
+        host = urlsplit(url).netloc
+        self.inc("http_responses_total", host=host, status=response.status_code)
+        if not streamed:
+            self.inc("http_downloaded_bytes_total", len(response.content), host=host)
+            return
+        iter_content = response.iter_content
+        # the body may be read after the source context is left, e.g. by a prefetch thread
+        source = current_source()
+
+        def counted_iter_content(chunk_size=1, decode_unicode=False):
+            for chunk in iter_content(chunk_size, decode_unicode):
+                self.inc("http_downloaded_bytes_total", len(chunk), host=host, source=source)
+                yield chunk
+
+        # also used by `response.content`
+        response.iter_content = counted_iter_content
+
+    def snapshot(self, source: Optional[str] = None) -> list:
+        """Json-serialisable copy of the metrics, restricted to `source` if given."""
+        with self._lock:
+            items = list(self._values.items())
+        snapshot = []
+        for (kind, name, labels), value in items:
+            labels = dict(labels)
+            if source is not None and labels.get("source") != source:
+                continue
+            entry = {"kind": kind, "name": name, "labels": labels}
+            if kind == "summary":
+                entry.update(sum=value[0], count=value[1], max=value[2])
+            else:
+                entry["value"] = value
+            snapshot.append(entry)
+        return snapshot
+
+    def merge(self, snapshot: list) -> None:
+        """Adds metrics recorded in another process (process backend) to this registry."""
+        with self._lock:
+            for entry in snapshot:
+                key = (
+                    entry["kind"],
+                    entry["name"],
+                    tuple(sorted(entry["labels"].items())),
+                )
+                if entry["kind"] == "counter":
+                    self._values[key] = self._values.get(key, 0) + entry["value"]
+                elif entry["kind"] == "gauge":
+                    self._values[key] = entry["value"]
+                else:
+                    summary = self._values.setdefault(key, [0.0, 0, 0.0])
+                    summary[0] += entry["sum"]
+                    summary[1] += entry["count"]
+                    summary[2] = max(summary[2], entry["max"])
+
+    def clear(self, source: Optional[str] = None) -> None:
+        """Removes the metrics of `source`, or all metrics if None."""
+        with self._lock:
+            self._values = {
+                key: value
+                for key, value in self._values.items()
+                if source is not None and dict(key[2]).get("source") != source
+            }
+
+    def write_json(self, path: str) -> None:
+        _write_atomic(path, json.dumps(self.snapshot(), indent=2))
+
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+        by_name: dict = {}
+        for entry in self.snapshot():
+            by_name.setdefault((entry["name"], entry["kind"]), []).append(entry)
+        for (name, kind), entries in sorted(by_name.items()):
+            metric = f"{PREFIX}{name}"
+            if name in DESCRIPTIONS:
+                lines.append(f"# HELP {metric} {DESCRIPTIONS[name]}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for entry in entries:
+                labels = _format_labels(entry["labels"])
+                if kind == "summary":
+                    lines.append(f"{metric}_sum{labels} {entry['sum']}")
+                    lines.append(f"{metric}_count{labels} {entry['count']}")
+                else:
+                    lines.append(f"{metric}{labels} {entry['value']}")
+            if kind == "summary":
+                lines.append(f"# TYPE {metric}_max gauge")
+                lines.extend(
+                    f"{metric}_max{_format_labels(entry['labels'])} {entry['max']}"
+                    for entry in entries
+                )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Writes the textfile read by the node exporter textfile collector."""
+        _write_atomic(path, self.to_prometheus())
+
+
+def _format_labels(labels: dict) -> str:
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    return (
+        "{"
+        + ",".join(f'{key}="{escape(value)}"' for key, value in sorted(labels.items()))
+        + "}"
+    )
+
+
+def _write_atomic(path: str, content: str) -> None:
+    # the collector must never read a partially written file
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+metrics = Metrics()
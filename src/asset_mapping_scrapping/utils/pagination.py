@@ -0,0 +1,180 @@
+import contextvars
+import itertools
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Literal, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger("VerboseLogger")
+
+
+def with_query_params(url: str, **params) -> str:
+    """Returns `url` with the given query parameters added or replaced."""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update({key: str(value) for key, value in params.items()})
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def page_urls(
+    url: str,
+    scheme: Literal["offset", "page"] = "offset",
+    page_size: int = 100,
+    offset_param: str = "skip",
+    limit_param: str = "limit",
+    page_param: str = "page",
+    first_page: int = 1,
+    max_pages: Optional[int] = None,
+) -> Iterator[str]:
+    """Generates the urls of the successive pages of a paginated API.
+
+    Args:
+        url (str): url of the collection, without paging parameters.
+        scheme (Literal["offset", "page"]): "offset" for skip/limit APIs, "page" for
+        page-number APIs.
+        page_size (int): number of items per page.
+        offset_param (str): name of the offset parameter ("offset" scheme).
+        limit_param (str): name of the page size parameter.
+        page_param (str): name of the page number parameter ("page" scheme).
+        first_page (int): number of the first page ("page" scheme).
+        max_pages (Optional[int]): maximum number of pages, unbounded if None.
+
+    Yields:
+        str: url of the next page.
+    """
+    for i in itertools.count() if max_pages is None else range(max_pages):
+        if scheme == "offset":
+            yield with_query_params(
+                url, **{offset_param: i * page_size, limit_param: page_size}
+            )
+        elif scheme == "page":
+            yield with_query_params(
+                url, **{page_param: first_page + i, limit_param: page_size}
+            )
+        else:
+            raise ValueError(f"Unknown pagination scheme {scheme}.")
+
+
+class _PageSizeCheck:
+    """Warns once when a page with less than `page_size` items is followed by more items."""
+
+    def __init__(self, page_size: int):
+        self.page_size = page_size
+        # size of the last page shorter than page_size, if any
+        self.short_page = None
+        self.warned = False
+
+    def add_page(self, count: int) -> None:
+        if self.short_page is not None and not self.warned:
+            logger.warning(
+                f"A page had {self.short_page} items for a page size of {self.page_size} but "
+                "was not the last one: the API caps the page size, lower it to not skip items."
+            )
+            self.warned = True
+        if count < self.page_size:
+            self.short_page = count
+
+
+def iter_pages(
+    fetch: Callable[[str], object],
+    urls: Iterator[str],
+    extract_items: Callable[[object], list],
+    page_size: int,
+    prefetch: int = 2,
+) -> Iterator:
+    """Fetches pages and yields their items one by one. While the items of a page are consumed,
+    the next `prefetch` pages are already being downloaded. Iteration stops at the first empty
+    page: a page with less than `page_size` items is not always the last one, as some APIs cap
+    the page size below the requested one. When a short page is followed by more items, a
+    warning is logged, since offsets computed from `page_size` then skip items.
+
+    Args:
+        fetch (Callable[[str], object]): downloads and decodes a page.
+        urls (Iterator[str]): urls of the successive pages, see `page_urls`.
+        extract_items (Callable[[object], list]): returns the items of a decoded page.
+        page_size (int): number of items of a full page.
+        prefetch (int): number of pages downloaded ahead.
+
+    Yields:
+        items of the pages, in order.
+    """
+    with ThreadPoolExecutor(max_workers=prefetch + 1) as executor:
+        pending = deque()
+
+        def submit_next() -> None:
+            url = next(urls, None)
+            if url is not None:
+                pending.append(executor.submit(contextvars.copy_context().run, fetch, url))
+
+        for _ in range(prefetch + 1):
+            submit_next()
+        page_size_check = _PageSizeCheck(page_size)
+        while pending:
+            items = extract_items(pending.popleft().result())
+            if not items:
+                for future in pending:
+                    future.cancel()
+                return
+            page_size_check.add_page(len(items))
+            submit_next()
+            yield from items
+
+
+def iter_streamed_pages(
+    stream_page: Callable[[str], Iterator], urls: Iterator[str], page_size: int
+) -> Iterator:
+    """Same as `iter_pages` for pages whose items are parsed as the response is received (see
+    `iter_json_items`). Items are yielded as soon as they are parsed, so that a single item is
+    held in memory rather than whole pages; pages are downloaded one after the other.
+
+    Args:
+        stream_page (Callable[[str], Iterator]): downloads a page and yields its items.
+        urls (Iterator[str]): urls of the successive pages, see `page_urls`.
+        page_size (int): number of items of a full page.
+
+    Yields:
+        items of the pages, in order.
+    """
+    page_size_check = _PageSizeCheck(page_size)
+    for url in urls:
+        count = 0
+        for item in stream_page(url):
+            count += 1
+            yield item
+        if count == 0:
+            return
+        page_size_check.add_page(count)
+
+
+def iter_cursor_pages(
+    fetch: Callable[[str], object],
+    url: str,
+    extract_items: Callable[[object], list],
+    next_url: Callable[[object], Optional[str]],
+) -> Iterator:
+    """Same as `iter_pages` for cursor-based APIs, where the url of a page is only known once
+    the previous page is downloaded. The next page is downloaded while the items of the
+    current one are consumed.
+
+    Args:
+        fetch (Callable[[str], object]): downloads and decodes a page.
+        url (str): url of the first page.
+        extract_items (Callable[[object], list]): returns the items of a decoded page.
+        next_url (Callable[[object], Optional[str]]): returns the url of the next page from a
+        decoded page, or None/empty on the last page.
+
+    Yields:
+        items of the pages, in order.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(contextvars.copy_context().run, fetch, url)
+        while future is not None:
+            page = future.result()
+            url = next_url(page)
+            future = (
+                executor.submit(contextvars.copy_context().run, fetch, url)
+                if url
+                else None
+            )
+            yield from extract_items(page)
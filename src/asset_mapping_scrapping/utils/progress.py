@@ -0,0 +1,51 @@
+import contextlib
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+from rich.progress import Progress
+
+# rich allows a single live display per console: sources scrapped concurrently (thread backend,
+# daemon) share one Progress, with one task per source
+_lock = threading.Lock()
+_progress: Optional[Progress] = None
+_task_count = 0
+
+
+@contextlib.contextmanager
+def progress_task(description: str, total: Optional[float] = None) -> Iterator[Callable]:
+    """Adds a task to the progress display shared by the running sources, starting the display
+    with the first task and stopping it with the last one.
+
+    Args:
+        description (str): text shown before the bar, e.g. the name of the source.
+        total (Optional[float]): number of steps of the task, None if unknown.
+
+    Yields:
+        Callable: `advance(steps=1)`, to call as steps are done.
+    """
+    global _progress, _task_count
+    with _lock:
+        if _progress is None:
+            _progress = Progress()
+            _progress.start()
+        progress = _progress
+        task_id = progress.add_task(description, total=total)
+        _task_count += 1
+    try:
+        yield lambda steps=1: progress.advance(task_id, steps)
+    finally:
+        with _lock:
+            progress.remove_task(task_id)
+            _task_count -= 1
+            if _task_count == 0:
+                progress.stop()
+                _progress = None
+
+
+def track(sequence: Iterable, description: str, total: Optional[float] = None) -> Iterator:
+    """Yields the items of `sequence`, advancing a task of the shared progress display, like
+    `rich.progress.track` but safe to use from several threads at once.
+    """
+    with progress_task(description, total) as advance:
+        for item in sequence:
+            yield item
+            advance()
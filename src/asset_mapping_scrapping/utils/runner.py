@@ -0,0 +1,698 @@
+import datetime
+import os
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field, fields
+from typing import TYPE_CHECKING, Union, Literal, Optional
+from asset_mapping_scrapping.scrapper.registry import ScrapperFactory
+from asset_mapping_scrapping.utils.http import (
+    configure_http_client,
+    get_http_client,
+    http_cache_stats,
+    merge_http_cache_stats,
+)
+from asset_mapping_scrapping.utils.map_cache import configure_resolution_cache
+from asset_mapping_scrapping.utils.metrics import metrics
+from asset_mapping_scrapping.utils.scheduler import Scheduler
+from asset_mapping_scrapping.utils.work_queue import Task, WorkQueue
+from asset_mapping_scrapping.utils.logger import (
+    log_to_queue,
+    logging_counter,
+    logger,
+    process_log_queue,
+    source_context,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from asset_mapping_scrapping.utils.export import ExportManager
+
+
+@dataclass
+class SourceReport:
+    """Outcome of the scrapping of a single source."""
+
+    source_name: str
+    succeeded: bool
+    duration: float
+    warning_count: int = 0
+    error_count: int = 0
+    http_cache: dict = field(default_factory=dict)
+    # the main page was unchanged, the source was neither scrapped further nor exported
+    skipped: bool = False
+    # content hash of the main page (see Scrapper.content_hash)
+    content_hash: Optional[str] = None
+    # scrapped dataframe, sent back to the parent process to be exported (process backend)
+    result: Optional["pd.DataFrame"] = None
+    # metrics of the source, merged into the ones of the parent process (process backend)
+    metrics: list = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        """Json-serialisable form of the report, without the scrapped dataframe."""
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.name != "result"}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SourceReport":
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
+
+
+def run_source(
+    scrapper_name: str,
+    url: Union[str, list],
+    mode: Literal["dev", "prod"] = "prod",
+    delta: bool = False,
+    export_format: Literal["csv", "parquet"] = "csv",
+    exporter: Optional["ExportManager"] = None,
+    resume: bool = False,
+    unchanged_hash: Optional[str] = None,
+    compression: Optional[Literal["gzip", "zstd"]] = None,
+    hash_main_page: bool = False,
+) -> SourceReport:
+    """Instantiates and runs a single scrapper. Any exception is logged and attributed to the
+    source, so that one failing source does not stop the others.
+
+    Args:
+        scrapper_name (str): name of a class registered in ScrapperFactory.
+        url (Union[str, list]): url(s) to scrape.
+        mode (Literal["dev", "prod"]): if "dev", no export to s3.
+        delta (bool): if True, only changes since the last export are exported.
+        export_format (Literal["csv", "parquet"]): format of the exported files.
+        exporter (Optional[ExportManager]): export manager of the run. If None, the scrapped
+        dataframe is returned in the report instead of being exported.
+        resume (bool): if True, asset pages checkpointed by a previous run are not fetched again.
+        unchanged_hash (Optional[str]): if the main page has this content hash, the source is
+        skipped after its main page (see SourceUnchanged).
+        compression (Optional[Literal["gzip", "zstd"]]): compression of csv exports, none if
+        None.
+        hash_main_page (bool): if True, the content hash of the main page is reported even
+        without `unchanged_hash`, for the next runs to compare with.
+
+    Returns:
+        SourceReport: outcome of the run.
+    """
+    with source_context(scrapper_name):
+        start = time.perf_counter()
+        cache_stats_before = http_cache_stats()
+        succeeded = True
+        skipped = False
+        result = None
+        scrapper = None
+        logger.info(f"Scraping {scrapper_name}")
+        try:
+            # imported here, like pandas, only once a source runs
+            from asset_mapping_scrapping.scrapper.scrapper_base import SourceUnchanged
+
+            with metrics.stage("scrape"):
+                scrapper = ScrapperFactory.get_handler(scrapper_name)(
+                    mode=mode,
+                    delta=delta,
+                    export_format=export_format,
+                    compression=compression,
+                    resume=resume,
+                    unchanged_hash=unchanged_hash,
+                    hash_main_page=hash_main_page,
+                )
+                result = scrapper(url)
+            if exporter is not None:
+                # the checkpoint is kept until the result is exported, for a rerun to resume
+                exporter.on_success(
+                    scrapper.export_to_s3(result, exporter), scrapper.remove_checkpoint
+                )
+                result = None
+
+            logger.info(f"{scrapper_name} ended gracefully")
+        except SourceUnchanged:
+            skipped = True
+            logger.info(f"{scrapper_name} main page is unchanged, skipped")
+        except Exception as e:
+            succeeded = False
+            logger.error(f"In {scrapper_name}:")
+            logger.exception(e)
+        counts = logging_counter.counts_for(scrapper_name)
+        return SourceReport(
+            source_name=scrapper_name,
+            succeeded=succeeded,
+            duration=time.perf_counter() - start,
+            warning_count=counts["warning"],
+            error_count=counts["error"],
+            skipped=skipped,
+            content_hash=scrapper.content_hash if scrapper is not None else None,
+            # only exact when sources do not share the process, i.e. for the process backend
+            http_cache={
+                outcome: count - cache_stats_before.get(outcome, 0)
+                for outcome, count in http_cache_stats().items()
+            },
+            result=result,
+            metrics=metrics.snapshot(source=scrapper_name),
+        )
+
+
+def _init_worker_process(http_config: dict, map_cache_config: dict, log_queue) -> None:
+    log_to_queue(log_queue)
+    configure_http_client(**http_config)
+    if map_cache_config:
+        configure_resolution_cache(**map_cache_config)
+
+
+def run_sources(
+    sources: dict,
+    mode: Literal["dev", "prod"] = "prod",
+    delta: bool = False,
+    export_format: Literal["csv", "parquet"] = "csv",
+    workers: int = 1,
+    backend: Literal["thread", "process"] = "thread",
+    http_config: dict = None,
+    map_cache_config: dict = None,
+    export_workers: int = 8,
+    throttle_config: dict = None,
+    resume: bool = False,
+    compression: Optional[Literal["gzip", "zstd"]] = None,
+) -> list[SourceReport]:
+    """Runs every source of the config, serially if `workers` is 1, otherwise concurrently
+    on a pool of threads or processes. Results are queued for export as soon as a source
+    completes, and all uploads of the run share a single ExportManager.
+
+    Args:
+        sources (dict): mapping between scrapper names and url(s).
+        mode (Literal["dev", "prod"]): if "dev", no export to s3.
+        delta (bool): if True, only changes since the last export are exported.
+        export_format (Literal["csv", "parquet"]): format of the exported files.
+        workers (int): maximum number of sources scrapped at the same time.
+        backend (Literal["thread", "process"]): kind of pool used when workers > 1.
+        http_config (dict): settings of the shared http client (see HttpClient).
+        map_cache_config (dict): settings of the map resolution cache (see ResolutionCache).
+        export_workers (int): maximum number of simultaneous uploads to s3.
+        throttle_config (dict): throttling and retry settings, per source (see Throttler).
+        resume (bool): if True, asset pages checkpointed by a previous run are not fetched again.
+        compression (Optional[Literal["gzip", "zstd"]]): compression of csv exports, none if
+        None.
+
+    Returns:
+        list[SourceReport]: one report per source, in the order of the config.
+    """
+    http_config = {**(http_config or {}), "throttle": throttle_config}
+    configure_http_client(**http_config)
+    if map_cache_config:
+        configure_resolution_cache(**map_cache_config)
+    # pandas and the export stack are only imported once a run starts
+    from asset_mapping_scrapping.utils.export import ExportManager
+
+    exporter = ExportManager(max_workers=export_workers)
+    reports = []
+    try:
+        reports = _run_sources(
+            sources,
+            mode,
+            delta,
+            export_format,
+            workers,
+            backend,
+            exporter,
+            http_config,
+            map_cache_config,
+            resume,
+            compression,
+        )
+    finally:
+        entries = exporter.close()
+    if entries:
+        failed = [entry for entry in entries if entry["status"] == "failed"]
+        logger.info(f"{len(entries) - len(failed)} files exported to s3.")
+        if failed:
+            logger.error(
+                f"{len(failed)} exports failed: {', '.join(entry['key'] for entry in failed)}."
+            )
+        # a source is only done once all its files are exported
+        failed_sources = {entry["source"] for entry in failed}
+        for report in reports:
+            if report.source_name in failed_sources:
+                report.succeeded = False
+    return reports
+
+
+def _run_sources(
+    sources: dict,
+    mode: Literal["dev", "prod"],
+    delta: bool,
+    export_format: Literal["csv", "parquet"],
+    workers: int,
+    backend: Literal["thread", "process"],
+    exporter: "ExportManager",
+    http_config: dict,
+    map_cache_config: dict,
+    resume: bool,
+    compression: Optional[Literal["gzip", "zstd"]],
+) -> list[SourceReport]:
+    if workers <= 1 or len(sources) <= 1:
+        return [
+            run_source(
+                name, url, mode, delta, export_format, exporter, resume, compression=compression
+            )
+            for name, url in sources.items()
+        ]
+
+    max_workers = min(workers, len(sources))
+    if backend == "thread":
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    else:
+        # child processes get their own http client, configured like the parent's one, and
+        # send their log records to the parent
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker_process,
+            initargs=(http_config, map_cache_config, process_log_queue()),
+        )
+    reports = []
+    with executor:
+        futures = {
+            name: executor.submit(
+                run_source,
+                name,
+                url,
+                mode,
+                delta,
+                export_format,
+                exporter if backend == "thread" else None,
+                resume,
+                compression=compression,
+            )
+            for name, url in sources.items()
+        }
+        for name, future in futures.items():
+            try:
+                report = future.result()
+            except Exception as e:
+                # the worker itself died (e.g. a killed process), the source is lost
+                with source_context(name):
+                    logger.error(f"In {name}:")
+                    logger.exception(e)
+                reports.append(SourceReport(name, False, 0.0))
+                continue
+            if backend == "process":
+                # log records of child processes were counted in the child
+                logging_counter.merge(name, report.warning_count, report.error_count)
+                merge_http_cache_stats(report.http_cache)
+                metrics.merge(report.metrics)
+                if report.result is not None:
+                    with source_context(name):
+                        scrapper = ScrapperFactory.get_handler(name)(
+                            mode=mode,
+                            delta=delta,
+                            export_format=export_format,
+                            compression=compression,
+                        )
+                        exporter.on_success(
+                            scrapper.export_to_s3(report.result, exporter),
+                            scrapper.remove_checkpoint,
+                        )
+                    report.result = None
+            reports.append(report)
+    return reports
+
+
+def log_summary(reports: list[SourceReport]) -> None:
+    failed = [report.source_name for report in reports if not report.succeeded]
+    for report in reports:
+        logger.info(
+            f"{report.source_name}: {_status(report)} in "
+            f"{report.duration:.1f}s ({report.warning_count} warnings, {report.error_count} errors)"
+        )
+        stage_durations = _stage_durations(report.source_name)
+        if stage_durations:
+            logger.info(f"{report.source_name} stages: {stage_durations}")
+    logger.info(f"{len(reports)} sources were scrapped,")
+    if failed:
+        logger.info(f"{len(failed)} failed: {', '.join(failed)}.")
+    logger.info(f"{logging_counter.warning_count} warnings have been encountered.")
+    logger.info(f"{logging_counter.error_count} errors have been encountered.")
+    cache_stats = http_cache_stats()
+    if cache_stats:
+        logger.info(
+            f"HTTP cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['revalidations']} revalidations."
+        )
+
+
+def _status(report: SourceReport) -> str:
+    if not report.succeeded:
+        return "failed"
+    return "skipped" if report.skipped else "ok"
+
+
+def _stage_durations(source_name: str) -> str:
+    durations = [
+        (entry["labels"]["stage"], entry["sum"])
+        for entry in metrics.snapshot(source=source_name)
+        if entry["name"] == "stage_duration_seconds"
+    ]
+    return ", ".join(
+        f"{stage} {duration:.1f}s"
+        for stage, duration in sorted(durations, key=lambda item: -item[1])
+    )
+
+
+def write_metrics(
+    reports: list[SourceReport],
+    json_path: Optional[str] = "metrics/metrics.json",
+    textfile_path: Optional[str] = "metrics/asset_scrapper.prom",
+) -> None:
+    """Writes the metrics of the run, as JSON and as a Prometheus textfile (to be collected by
+    the node exporter textfile collector).
+
+    Args:
+        reports (list[SourceReport]): reports of the run, see `run_sources`.
+        json_path (Optional[str]): path of the JSON file, not written if None.
+        textfile_path (Optional[str]): path of the Prometheus textfile, not written if None.
+    """
+    for report in reports:
+        metrics.set("source_succeeded", int(report.succeeded), source=report.source_name)
+        metrics.set("source_skipped", int(report.skipped), source=report.source_name)
+        metrics.set(
+            "log_records", report.warning_count, source=report.source_name, level="warning"
+        )
+        metrics.set(
+            "log_records", report.error_count, source=report.source_name, level="error"
+        )
+    if json_path:
+        metrics.write_json(json_path)
+        logger.info(f"Metrics written to {json_path}.")
+    if textfile_path:
+        metrics.write_prometheus(textfile_path)
+        logger.info(f"Metrics written to {textfile_path}.")
+
+
+def _configure_run(options: dict) -> None:
+    configure_http_client(
+        **{**(options.get("http_config") or {}), "throttle": options.get("throttle_config")}
+    )
+    if options.get("map_cache_config"):
+        configure_resolution_cache(**options["map_cache_config"])
+
+
+def enqueue_run(
+    queue_path: str,
+    sources: dict,
+    mode: Literal["dev", "prod"] = "prod",
+    delta: bool = False,
+    export_format: Literal["csv", "parquet"] = "csv",
+    http_config: dict = None,
+    map_cache_config: dict = None,
+    export_workers: int = 8,
+    throttle_config: dict = None,
+    resume: bool = False,
+    compression: Optional[Literal["gzip", "zstd"]] = None,
+) -> str:
+    """Adds the sources of a run to a work queue, to be scrapped by workers (see `run_worker`).
+    Arguments are the ones of `run_sources`, and are passed to the workers through the queue.
+
+    Returns:
+        str: id of the run.
+    """
+    queue = WorkQueue(queue_path)
+    try:
+        run_id = queue.enqueue(
+            sources,
+            options={
+                "mode": mode,
+                "delta": delta,
+                "export_format": export_format,
+                "http_config": http_config,
+                "map_cache_config": map_cache_config,
+                "export_workers": export_workers,
+                "throttle_config": throttle_config,
+                "resume": resume,
+                "compression": compression,
+            },
+        )
+    finally:
+        queue.close()
+    logger.info(f"Run {run_id} queued in {queue_path} with {len(sources)} sources.")
+    return run_id
+
+
+def _run_task(queue: WorkQueue, task: Task, worker_id: str, options: dict) -> SourceReport:
+    """Scrapes and exports a leased source, renewing its lease until it is done."""
+    from asset_mapping_scrapping.utils.export import ExportManager
+
+    stop = threading.Event()
+
+    def heartbeat() -> None:
+        while not stop.wait(queue.lease_seconds / 3):
+            if not queue.heartbeat(task, worker_id):
+                with source_context(task.source):
+                    logger.warning(f"Lease of {task.source} lost, another worker may run it.")
+                return
+
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+    # counters of a worker are kept across runs, the report must only cover this one
+    metrics.clear(source=task.source)
+    logging_counter.clear(task.source)
+    try:
+        exporter = ExportManager(
+            max_workers=options.get("export_workers", 8),
+            run_id=f"{task.run_id}_{task.source}",
+        )
+        report = run_source(
+            task.source,
+            task.url,
+            mode=options.get("mode", "prod"),
+            delta=options.get("delta", False),
+            export_format=options.get("export_format", "csv"),
+            compression=options.get("compression"),
+            exporter=exporter,
+            # a source leased again after a worker died resumes its checkpoint
+            resume=options.get("resume", False) or task.attempts > 1,
+        )
+        entries = exporter.close()
+        if any(entry["status"] == "failed" for entry in entries):
+            report.succeeded = False
+        counts = logging_counter.counts_for(task.source)
+        report.warning_count = counts["warning"]
+        report.error_count = counts["error"]
+        report.metrics = metrics.snapshot(source=task.source)
+    finally:
+        stop.set()
+        heartbeat_thread.join()
+    if not queue.complete(task, worker_id, report.succeeded, report.to_dict()):
+        with source_context(task.source):
+            logger.warning(f"Lease of {task.source} expired, its report is discarded.")
+    return report
+
+
+def run_worker(
+    queue_path: str,
+    run_id: Optional[str] = None,
+    worker_id: Optional[str] = None,
+    lease_seconds: float = 300,
+    idle_timeout: float = 0,
+    poll_interval: float = 5,
+) -> list[SourceReport]:
+    """Scrapes sources leased from a work queue until there is nothing left to do. Several
+    workers, on one or several hosts, can share the same queue.
+
+    Args:
+        queue_path (str): path of the SQLite work queue.
+        run_id (Optional[str]): only work on this run, on any run if None.
+        worker_id (Optional[str]): id of the worker in the queue, <host>-<pid> if None.
+        lease_seconds (float): duration of the leases, renewed while a source is scrapped.
+        idle_timeout (float): time to wait for new work before stopping, in seconds.
+        poll_interval (float): time between two polls of an empty queue, in seconds.
+
+    Returns:
+        list[SourceReport]: reports of the sources scrapped by this worker.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = WorkQueue(queue_path, lease_seconds=lease_seconds)
+    reports = []
+    configured_run = None
+    idle_since = time.monotonic()
+    try:
+        while True:
+            task = queue.lease(worker_id, run_id)
+            if task is None:
+                if time.monotonic() - idle_since >= idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+            options = queue.options(task.run_id)
+            if task.run_id != configured_run:
+                _configure_run(options)
+                configured_run = task.run_id
+            logger.info(
+                f"Worker {worker_id} leased {task.source} of run {task.run_id} "
+                f"(attempt {task.attempts})."
+            )
+            reports.append(_run_task(queue, task, worker_id, options))
+            idle_since = time.monotonic()
+    finally:
+        queue.close()
+    return reports
+
+
+def wait_for_run(
+    queue_path: str,
+    run_id: str,
+    local_reports: list[SourceReport] = (),
+    poll_interval: float = 5,
+    timeout: Optional[float] = None,
+) -> list[SourceReport]:
+    """Waits for all sources of a queued run to be done, and aggregates the reports of all
+    workers. Their metrics and logging counters are merged into the ones of this process.
+    Sources whose worker died are leased again by the other workers, or given up after
+    `max_attempts` leases; sources not done after `timeout` are given up.
+
+    Args:
+        queue_path (str): path of the SQLite work queue.
+        run_id (str): id of the run.
+        local_reports (list[SourceReport]): reports of the sources scrapped by this process,
+        whose counters are already in this process.
+        poll_interval (float): time between two polls of the queue, in seconds.
+        timeout (Optional[float]): maximum time to wait for the run, in seconds, no limit if
+        None.
+
+    Returns:
+        list[SourceReport]: one report per source, in the order of the config.
+    """
+    queue = WorkQueue(queue_path)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        while True:
+            # leases are otherwise only reclaimed by workers leasing sources
+            queue.reclaim_expired(run_id)
+            if queue.is_finished(run_id):
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                given_up = queue.fail_unfinished(
+                    run_id, f"run not finished after {timeout:g} seconds"
+                )
+                logger.error(f"Run {run_id} timed out, {given_up} sources given up.")
+                break
+            time.sleep(poll_interval)
+        reports = [SourceReport.from_dict(report) for report in queue.reports(run_id)]
+    finally:
+        queue.close()
+    local_sources = {report.source_name for report in local_reports}
+    for report in reports:
+        if report.source_name in local_sources:
+            continue
+        logging_counter.merge(report.source_name, report.warning_count, report.error_count)
+        metrics.merge(report.metrics)
+    return reports
+
+
+def _run_scheduled(
+    scheduler: Scheduler, source: str, started_at: float, options: dict
+) -> SourceReport:
+    """Scrapes and exports a due source of the daemon, and records its outcome."""
+    from asset_mapping_scrapping.utils.export import ExportManager
+
+    # counters of the daemon are kept across runs, the report must only cover this one
+    metrics.clear(source=source)
+    logging_counter.clear(source)
+    # the retry budget covers a run, not the lifetime of the daemon
+    get_http_client().throttler.reset_budget(source)
+    state = scheduler.state.get(source)
+    started = datetime.datetime.fromtimestamp(started_at).strftime("%Y-%m-%dT%H-%M-%S")
+    # a check that raised is recorded as failed too, otherwise the source would stay due
+    status, content_hash = "failed", None
+    try:
+        exporter = ExportManager(
+            max_workers=options.get("export_workers", 8), run_id=f"{started}_{source}"
+        )
+        report = run_source(
+            source,
+            scheduler.sources[source],
+            mode=options.get("mode", "prod"),
+            delta=options.get("delta", False),
+            export_format=options.get("export_format", "csv"),
+            compression=options.get("compression"),
+            exporter=exporter,
+            # a source whose last check failed resumes its checkpoint
+            resume=options.get("resume", False) or state.get("status") == "failed",
+            unchanged_hash=scheduler.unchanged_hash(source, started_at),
+            hash_main_page=True,
+        )
+        entries = exporter.close()
+        if any(entry["status"] == "failed" for entry in entries):
+            report.succeeded = False
+        counts = logging_counter.counts_for(source)
+        report.warning_count = counts["warning"]
+        report.error_count = counts["error"]
+        status, content_hash = _status(report), report.content_hash
+    finally:
+        scheduler.state.record(source, status, started_at, content_hash=content_hash)
+    return report
+
+
+def run_daemon(
+    sources: dict,
+    schedule_config: Optional[dict] = None,
+    metrics_config: Optional[dict] = None,
+    stop: Optional[threading.Event] = None,
+    workers: int = 1,
+    **options,
+) -> None:
+    """Keeps running in a single process and scrapes every source when it is due, according
+    to its schedule (see Scheduler), until `stop` is set. The http client, caches and imports
+    are set up once for the lifetime of the daemon, instead of at each run. At most
+    `workers` sources are scrapped at the same time, most overdue first. A source whose
+    main page has the same content hash as its last full scrape, younger than its ttl, is
+    skipped before its asset pages. The outcome of every check is kept in the state file, so
+    that a restarted daemon resumes the schedules.
+
+    Args:
+        sources (dict): mapping between scrapper names and url(s).
+        schedule_config (Optional[dict]): `schedule` section of the yaml config.
+        metrics_config (Optional[dict]): `metrics` section of the yaml config, the metrics
+        files are updated after every check (see `write_metrics`).
+        stop (Optional[threading.Event]): stops the daemon once the running sources are done.
+        workers (int): maximum number of sources scrapped at the same time.
+        **options: settings of the runs, as for `enqueue_run` (mode, http_config...).
+    """
+    stop = stop or threading.Event()
+    _configure_run(options)
+    scheduler = Scheduler(sources, schedule_config, max_concurrency=workers)
+    logger.info(
+        f"Daemon started with {len(sources)} sources, "
+        f"{scheduler.max_concurrency} at a time."
+    )
+    running: dict = {}
+    with ThreadPoolExecutor(max_workers=scheduler.max_concurrency) as executor:
+        while True:
+            for source, future in list(running.items()):
+                if not future.done():
+                    continue
+                del running[source]
+                try:
+                    report = future.result()
+                except Exception as e:
+                    # e.g. the state file could not be written
+                    with source_context(source):
+                        logger.error(f"In {source}:")
+                        logger.exception(e)
+                    continue
+                log_summary([report])
+                write_metrics([report], **(metrics_config or {}))
+            if stop.is_set():
+                if not running:
+                    break
+            else:
+                for source in scheduler.due():
+                    if len(running) >= scheduler.max_concurrency:
+                        break
+                    if source not in running:
+                        running[source] = executor.submit(
+                            _run_scheduled, scheduler, source, time.time(), options
+                        )
+            if running and (stop.is_set() or len(running) >= scheduler.max_concurrency):
+                # nothing can start before a running source is done, due sources included
+                wait(list(running.values()), return_when=FIRST_COMPLETED)
+                continue
+            # running sources are polled every second, the schedule every poll_interval
+            timeout = scheduler.seconds_until_next(running=running)
+            stop.wait(min(timeout, 1.0) if running else timeout)
+    logger.info("Daemon stopped.")
@@ -0,0 +1,206 @@
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Optional, Union
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*$")
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_duration(value: Union[str, float, int]) -> float:
+    """Number of seconds of a duration of the config, e.g. 90, "30m", "6h" or "1d"."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _DURATION.match(value)
+    if match is None:
+        raise ValueError(f"Invalid duration {value}.")
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+@dataclass
+class SchedulePolicy:
+    """Schedule of a source, read from the `schedule` section of the yaml config.
+
+    Attributes:
+        every (float): time between two checks of the source, in seconds.
+        ttl (float): maximum age of the last full scrape, in seconds. Until then, a check whose
+        main page has the same content hash as the last scrape skips the asset pages and the
+        export; after it, the source is scrapped again whatever its hash.
+        retry_every (Optional[float]): time before a failed source is checked again, `every`
+        if None.
+        enabled (bool): whether the source is scheduled at all.
+    """
+
+    every: float = 86400
+    ttl: float = 7 * 86400
+    retry_every: Optional[float] = None
+    enabled: bool = True
+
+    @classmethod
+    def from_config(cls, *configs: Optional[dict]) -> "SchedulePolicy":
+        """Builds a policy from config sections, later sections overriding earlier ones."""
+        names = {field.name for field in fields(cls)}
+        settings = {}
+        for config in configs:
+            for name, value in (config or {}).items():
+                if name not in names:
+                    raise ValueError(f"Unknown schedule setting {name}.")
+                if name in ("every", "ttl", "retry_every") and value is not None:
+                    value = parse_duration(value)
+                settings[name] = value
+        return cls(**settings)
+
+
+class SchedulerState:
+    """Outcome of the last runs of every source, kept in a JSON file so that a restarted daemon
+    knows which sources are due. For every source: time of the last check (`last_attempt`),
+    of the last successful check (`last_success`) and full scrape (`last_scrape`), status of
+    the last check and content hash of the main page of the last full scrape.
+    """
+
+    def __init__(self, path: str = ".scheduler_state.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.sources: dict = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.sources = json.load(f)
+
+    def get(self, source: str) -> dict:
+        with self._lock:
+            return dict(self.sources.get(source, {}))
+
+    def record(
+        self,
+        source: str,
+        status: str,
+        started_at: float,
+        content_hash: Optional[str] = None,
+    ) -> None:
+        """Records the outcome of a check and saves the state.
+
+        Args:
+            source (str): name of the scrapper.
+            status (str): "ok" (scrapped), "skipped" (unchanged) or "failed".
+            started_at (float): time the check started (time.time()).
+            content_hash (Optional[str]): content hash of the main page, for a full scrape.
+        """
+        with self._lock:
+            entry = self.sources.setdefault(source, {})
+            entry["last_attempt"] = started_at
+            entry["status"] = status
+            if status == "failed":
+                entry["failures"] = entry.get("failures", 0) + 1
+            else:
+                entry["failures"] = 0
+                entry["last_success"] = started_at
+            if status == "ok":
+                entry["last_scrape"] = started_at
+                entry["content_hash"] = content_hash
+            self._save()
+
+    def _save(self) -> None:
+        # a crash while saving must not lose the previous state
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.sources, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class Scheduler:
+    """Decides which sources are due, and whether a due source may be skipped when its main
+    page is unchanged. The config has a `default` section applying to every source, and a
+    `sources` section overriding it for some sources:
+
+        schedule:
+            state_path: .scheduler_state.json
+            default:
+                every: 6h
+                ttl: 7d
+            sources:
+                HongkongLand:
+                    every: 1h
+    """
+
+    def __init__(
+        self, sources: dict, config: Optional[dict] = None, max_concurrency: int = 1
+    ):
+        """
+        Args:
+            sources (dict): mapping between scrapper names and url(s).
+            config (Optional[dict]): `schedule` section of the yaml config.
+            max_concurrency (int): maximum number of sources scrapped at the same time.
+        """
+        config = config or {}
+        if "max_concurrency" in config:
+            raise ValueError(
+                "schedule.max_concurrency is not supported, the number of sources scrapped at "
+                "the same time is set by --workers."
+            )
+        self.sources = sources
+        self.max_concurrency = max_concurrency
+        self.poll_interval: float = parse_duration(config.get("poll_interval", 60))
+        self.state = SchedulerState(config.get("state_path", ".scheduler_state.json"))
+        self.policies: dict = {
+            source: SchedulePolicy.from_config(
+                config.get("default"), (config.get("sources") or {}).get(source)
+            )
+            for source in sources
+        }
+
+    def next_run(self, source: str) -> Optional[float]:
+        """Time (time.time()) at which the source is due, None if it is disabled."""
+        policy = self.policies[source]
+        if not policy.enabled:
+            return None
+        state = self.state.get(source)
+        if "last_attempt" not in state:
+            return 0.0
+        if state["status"] == "failed" and policy.retry_every is not None:
+            return state["last_attempt"] + policy.retry_every
+        return state["last_attempt"] + policy.every
+
+    def due(self, now: Optional[float] = None) -> list:
+        """Sources due at `now`, most overdue first."""
+        now = time.time() if now is None else now
+        next_runs = {source: self.next_run(source) for source in self.sources}
+        return sorted(
+            (
+                source
+                for source, next_run in next_runs.items()
+                if next_run is not None and next_run <= now
+            ),
+            key=lambda source: next_runs[source],
+        )
+
+    def unchanged_hash(self, source: str, now: Optional[float] = None) -> Optional[str]:
+        """Content hash with which a check of the source is skipped, None if the last full
+        scrape is older than the ttl and the source must be scrapped whatever its content.
+        """
+        now = time.time() if now is None else now
+        state = self.state.get(source)
+        if "last_scrape" not in state or now - state["last_scrape"] >= self.policies[source].ttl:
+            return None
+        return state.get("content_hash")
+
+    def seconds_until_next(self, now: Optional[float] = None, running=()) -> float:
+        """Time until the next source is due, at most `poll_interval`.
+
+        Args:
+            now (Optional[float]): current time, time.time() if None.
+            running: sources being scrapped, whose next run is not known yet.
+        """
+        now = time.time() if now is None else now
+        next_runs = [
+            next_run
+            for next_run in map(self.next_run, set(self.sources) - set(running))
+            if next_run is not None
+        ]
+        if not next_runs:
+            return self.poll_interval
+        return max(0.0, min(self.poll_interval, min(next_runs) - now))
@@ -0,0 +1,284 @@
+import email.utils
+import random
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Optional
+
+
+@dataclass
+class ThrottlePolicy:
+    """Throttling and retry settings of a source, read from the `throttle` section of the
+    yaml config.
+
+    Attributes:
+        rate (Optional[float]): maximum number of requests per second to a host, unbounded if
+        None.
+        burst (int): number of requests that can be sent at once after an idle period.
+        max_concurrency (int): maximum number of requests in flight to a host.
+        min_concurrency (int): the adaptive concurrency limit never goes below this value.
+        initial_concurrency (int): concurrency limit before any response is received.
+        decrease_factor (float): the concurrency limit is multiplied by this factor when a host
+        throttles (429, 503, timeouts...), and grows by one request per round of successful
+        requests otherwise (AIMD).
+        max_retries (int): maximum number of retries of a request.
+        retry_budget (int): maximum number of retries of the source for the whole run.
+        backoff_base (float): base of the exponential backoff, in seconds.
+        backoff_max (float): maximum backoff, in seconds.
+        max_retry_after (float): a Retry-After longer than this, in seconds, is not waited for.
+        retry_statuses (tuple): status codes that are retried.
+        throttle_statuses (tuple): status codes meaning the host is overloaded.
+        retry_methods (tuple): http methods that are retried. The POST requests of the
+        scrappers are read-only GraphQL queries, so they are retried too.
+    """
+
+    rate: Optional[float] = None
+    burst: int = 10
+    max_concurrency: int = 10
+    min_concurrency: int = 1
+    initial_concurrency: int = 4
+    decrease_factor: float = 0.5
+    max_retries: int = 4
+    retry_budget: int = 200
+    backoff_base: float = 0.5
+    backoff_max: float = 60
+    max_retry_after: float = 300
+    retry_statuses: tuple = (429, 500, 502, 503, 504)
+    throttle_statuses: tuple = (429, 503)
+    retry_methods: tuple = ("GET", "HEAD", "OPTIONS", "POST")
+
+    @classmethod
+    def from_config(cls, *configs: Optional[dict]) -> "ThrottlePolicy":
+        """Builds a policy from config sections, later sections overriding earlier ones."""
+        names = {field.name for field in fields(cls)}
+        settings = {}
+        for config in configs:
+            for name, value in (config or {}).items():
+                if name not in names:
+                    raise ValueError(f"Unknown throttle setting {name}.")
+                settings[name] = tuple(value) if isinstance(value, list) else value
+        return cls(**settings)
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter of the `attempt`-th retry (from 0)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Number of seconds to wait from a Retry-After header (delay or http date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class HostLimiter:
+    """Limits the requests sent to a host with a token bucket (`rate`, `burst`) and an
+    adaptive concurrency limit: additive increase on success, multiplicative decrease when the
+    host throttles. The host can also be paused, e.g. for the duration of a Retry-After.
+    """
+
+    def __init__(self, policy: ThrottlePolicy):
+        self.policy = policy
+        self.limit = float(
+            min(policy.max_concurrency, max(policy.min_concurrency, policy.initial_concurrency))
+        )
+        self.in_flight = 0
+        self.tokens = float(policy.burst)
+        self.paused_until = 0.0
+        self._refilled_at = time.monotonic()
+        self._decreased_at = 0.0
+        self._condition = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        if self.policy.rate is not None:
+            self.tokens = min(
+                self.policy.burst, self.tokens + (now - self._refilled_at) * self.policy.rate
+            )
+        self._refilled_at = now
+
+    def acquire(self) -> float:
+        """Waits for a concurrency slot and a token, and returns the time the request starts."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.in_flight >= int(self.limit):
+                    wait = None
+                elif self.policy.rate is not None and self.tokens < 1:
+                    wait = (1 - self.tokens) / self.policy.rate
+                else:
+                    self.in_flight += 1
+                    if self.policy.rate is not None:
+                        self.tokens -= 1
+                    return now
+                self._condition.wait(wait)
+
+    def release(self, started_at: float, throttled: bool) -> None:
+        """Frees the slot of a request and adapts the concurrency limit to its outcome.
+
+        Args:
+            started_at (float): value returned by `acquire`.
+            throttled (bool): whether the host throttled the request.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                # requests sent before the last decrease were sent at the old limit
+                if started_at >= self._decreased_at:
+                    self.limit = max(
+                        self.policy.min_concurrency, self.limit * self.policy.decrease_factor
+                    )
+                    self._decreased_at = time.monotonic()
+            else:
+                self.limit = min(self.policy.max_concurrency, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """No request is sent to the host for the next `seconds`."""
+        with self._condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+# settings of a HostLimiter, as opposed to the retry settings
+LIMIT_SETTINGS: frozenset = frozenset(
+    {
+        "rate",
+        "burst",
+        "max_concurrency",
+        "min_concurrency",
+        "initial_concurrency",
+        "decrease_factor",
+    }
+)
+
+
+class LayeredLimiter:
+    """Limits of a source on a host: the limiter of the host, shared by every source sending
+    requests to it, and, when the source overrides the limits, a limiter of the source on that
+    host applied on top. A request waits for all of them; a throttling host slows all sources.
+    """
+
+    def __init__(self, limiters: list):
+        """
+        Args:
+            limiters (list): HostLimiters, acquired in this order, the one of the host last.
+        """
+        self.limiters = limiters
+
+    def acquire(self) -> float:
+        for limiter in self.limiters:
+            started_at = limiter.acquire()
+        return started_at
+
+    def release(self, started_at: float, throttled: bool) -> None:
+        for limiter in reversed(self.limiters):
+            limiter.release(started_at, throttled)
+
+    def pause(self, seconds: float) -> None:
+        for limiter in self.limiters:
+            limiter.pause(seconds)
+
+
+class RetryBudget:
+    """Maximum number of retries of a source for a whole run, so that a failing site cannot
+    keep the run busy with retries.
+    """
+
+    def __init__(self, retries: int):
+        self.remaining = retries
+        self._lock = threading.Lock()
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class Throttler:
+    """Policies, limiters and retry budgets of the process. Every host has a single limiter,
+    shared by all the sources sending requests to it; retry settings and budgets are per source.
+
+    The config has a `default` section applying to every source and host, a `hosts` section
+    overriding the limits of some hosts, and a `sources` section overriding the settings of
+    some sources. The limits of a source section apply on top of the ones of the host:
+
+        throttle:
+            default:
+                rate: 5
+                max_concurrency: 8
+            hosts:
+                www.example.com:
+                    max_concurrency: 4
+            sources:
+                HongkongLand:
+                    rate: 2
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.default: dict = config.get("default") or {}
+        self.hosts: dict = config.get("hosts") or {}
+        self.sources: dict = config.get("sources") or {}
+        self._policies: dict = {}
+        self._host_limiters: dict = {}
+        self._source_limiters: dict = {}
+        self._budgets: dict = {}
+        self._lock = threading.Lock()
+
+    def policy(self, source: str) -> ThrottlePolicy:
+        with self._lock:
+            policy = self._policies.get(source)
+            if policy is None:
+                policy = self._policies[source] = ThrottlePolicy.from_config(
+                    self.default, self.sources.get(source)
+                )
+            return policy
+
+    def host_limiter(self, host: str) -> HostLimiter:
+        """Limiter of a host, shared by all sources."""
+        with self._lock:
+            limiter = self._host_limiters.get(host)
+            if limiter is None:
+                limiter = self._host_limiters[host] = HostLimiter(
+                    ThrottlePolicy.from_config(self.default, self.hosts.get(host))
+                )
+            return limiter
+
+    def limiter(self, source: str, host: str) -> LayeredLimiter:
+        """Limits of the requests of a source to a host (see LayeredLimiter)."""
+        limiters = [self.host_limiter(host)]
+        if LIMIT_SETTINGS & set(self.sources.get(source) or {}):
+            policy = self.policy(source)
+            with self._lock:
+                limiter = self._source_limiters.get((source, host))
+                if limiter is None:
+                    limiter = self._source_limiters[(source, host)] = HostLimiter(policy)
+            limiters.insert(0, limiter)
+        return LayeredLimiter(limiters)
+
+    def budget(self, source: str) -> RetryBudget:
+        policy = self.policy(source)
+        with self._lock:
+            budget = self._budgets.get(source)
+            if budget is None:
+                budget = self._budgets[source] = RetryBudget(policy.retry_budget)
+            return budget
+
+    def reset_budget(self, source: str) -> None:
+        """Gives a source its whole retry budget back, e.g. at each run of a daemon that keeps
+        the throttler across runs.
+        """
+        with self._lock:
+            self._budgets.pop(source, None)
@@ -0,0 +1,280 @@
+import datetime
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class Task:
+    """A source of a run, leased by a worker."""
+
+    run_id: str
+    source: str
+    url: object
+    attempts: int
+    lease_until: float
+
+
+class WorkQueue:
+    """Queue of the sources of distributed runs, stored in a SQLite file shared by the workers.
+    A worker leases a source for `lease_seconds` and renews the lease while it scrapes it; the
+    lease of a worker that died expires, and the source is leased again by another worker, up
+    to `max_attempts` times. The report of every source is stored in the queue, so that the
+    run can be summarised as a whole.
+
+    SQLite locking is reliable on a local disk only: workers of several nodes need a queue on
+    a shared local volume, not on a network file system.
+    """
+
+    def __init__(
+        self,
+        path: str = ".work_queue.sqlite",
+        lease_seconds: float = 300,
+        max_attempts: int = 3,
+    ):
+        """
+        Args:
+            path (str): path of the SQLite file.
+            lease_seconds (float): duration of a lease, renewed by heartbeats.
+            max_attempts (int): maximum number of leases of a source.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    options TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS tasks (
+                    run_id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_until REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    report TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, source)
+                )"""
+            )
+
+    def _transaction(self, statements):
+        """Runs `statements(connection)` in a write transaction, serialised between workers."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._connection)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+            return result
+
+    def enqueue(self, sources: dict, options: Optional[dict] = None) -> str:
+        """Adds a run to the queue.
+
+        Args:
+            sources (dict): mapping between scrapper names and url(s).
+            options (Optional[dict]): settings of the run (mode, export format, http config...),
+            passed to the workers.
+
+        Returns:
+            str: id of the run.
+        """
+        run_id = f"{datetime.datetime.now().strftime('%Y-%m-%dT%H-%M-%S')}_{uuid.uuid4().hex[:8]}"
+        now = time.time()
+
+        def statements(connection):
+            connection.execute(
+                "INSERT INTO runs VALUES (?, ?, ?)", (run_id, json.dumps(options or {}), now)
+            )
+            connection.executemany(
+                "INSERT INTO tasks (run_id, source, url, position, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (run_id, source, json.dumps(url), position, now)
+                    for position, (source, url) in enumerate(sources.items())
+                ],
+            )
+
+        self._transaction(statements)
+        return run_id
+
+    def options(self, run_id: str) -> dict:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT options FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def _reclaim_expired(self, connection, now: float, run_id: Optional[str] = None) -> int:
+        """Makes the sources whose lease expired (their worker died) pending again, or gives
+        them up once they were leased `max_attempts` times. Returns the number of sources given
+        up.
+        """
+        failed = connection.execute(
+            """UPDATE tasks SET status = 'failed', lease_until = NULL, updated_at = ?,
+                report = json_object('source_name', source, 'succeeded', 0, 'duration', 0.0,
+                                     'error', 'lease expired ' || attempts || ' times')
+            WHERE status = 'leased' AND lease_until < ? AND attempts >= ?
+            AND (? IS NULL OR run_id = ?)""",
+            (now, now, self.max_attempts, run_id, run_id),
+        ).rowcount
+        connection.execute(
+            """UPDATE tasks SET status = 'pending', worker = NULL, lease_until = NULL,
+                updated_at = ?
+            WHERE status = 'leased' AND lease_until < ? AND (? IS NULL OR run_id = ?)""",
+            (now, now, run_id, run_id),
+        )
+        return failed
+
+    def reclaim_expired(self, run_id: Optional[str] = None) -> int:
+        """Reclaims the expired leases (see `_reclaim_expired`) without leasing anything, e.g.
+        while waiting for a run whose workers may have died.
+
+        Args:
+            run_id (Optional[str]): only reclaim sources of this run, of any run if None.
+
+        Returns:
+            int: number of sources given up.
+        """
+        now = time.time()
+        return self._transaction(
+            lambda connection: self._reclaim_expired(connection, now, run_id)
+        )
+
+    def fail_unfinished(self, run_id: str, reason: str) -> int:
+        """Gives up the pending and leased sources of a run, e.g. when it timed out. Workers
+        still scrapping them lose their lease, and their reports are discarded.
+
+        Returns:
+            int: number of sources given up.
+        """
+        now = time.time()
+
+        def statements(connection):
+            return connection.execute(
+                """UPDATE tasks SET status = 'failed', lease_until = NULL, updated_at = ?,
+                    report = json_object('source_name', source, 'succeeded', 0,
+                                         'duration', 0.0, 'error', ?)
+                WHERE run_id = ? AND status IN ('pending', 'leased')""",
+                (now, reason, run_id),
+            ).rowcount
+
+        return self._transaction(statements)
+
+    def lease(self, worker_id: str, run_id: Optional[str] = None) -> Optional[Task]:
+        """Leases the next pending source, or a source whose lease expired.
+
+        Args:
+            worker_id (str): id of the worker taking the lease.
+            run_id (Optional[str]): only lease sources of this run, of any run if None.
+
+        Returns:
+            Optional[Task]: the leased source, None if there is nothing to do.
+        """
+        now = time.time()
+
+        def statements(connection):
+            self._reclaim_expired(connection, now, run_id)
+            row = connection.execute(
+                """SELECT run_id, source, url, attempts FROM tasks
+                WHERE status = 'pending' AND (? IS NULL OR run_id = ?)
+                ORDER BY run_id, position LIMIT 1""",
+                (run_id, run_id),
+            ).fetchone()
+            if row is None:
+                return None
+            lease_until = now + self.lease_seconds
+            connection.execute(
+                """UPDATE tasks SET status = 'leased', worker = ?, lease_until = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE run_id = ? AND source = ?""",
+                (worker_id, lease_until, now, row[0], row[1]),
+            )
+            return Task(
+                run_id=row[0],
+                source=row[1],
+                url=json.loads(row[2]),
+                attempts=row[3] + 1,
+                lease_until=lease_until,
+            )
+
+        return self._transaction(statements)
+
+    def heartbeat(self, task: Task, worker_id: str) -> bool:
+        """Renews the lease of a task. Returns False if the lease was lost to another worker."""
+        now = time.time()
+
+        def statements(connection):
+            return connection.execute(
+                """UPDATE tasks SET lease_until = ?, updated_at = ?
+                WHERE run_id = ? AND source = ? AND worker = ? AND status = 'leased'""",
+                (now + self.lease_seconds, now, task.run_id, task.source, worker_id),
+            ).rowcount
+
+        return self._transaction(statements) == 1
+
+    def complete(self, task: Task, worker_id: str, succeeded: bool, report: dict) -> bool:
+        """Stores the report of a task. Returns False if the lease was lost to another worker,
+        in which case the report is discarded.
+        """
+        now = time.time()
+
+        def statements(connection):
+            return connection.execute(
+                """UPDATE tasks SET status = ?, report = ?, lease_until = NULL, updated_at = ?
+                WHERE run_id = ? AND source = ? AND worker = ? AND status = 'leased'""",
+                (
+                    "done" if succeeded else "failed",
+                    json.dumps(report),
+                    now,
+                    task.run_id,
+                    task.source,
+                    worker_id,
+                ),
+            ).rowcount
+
+        return self._transaction(statements) == 1
+
+    def status(self, run_id: str) -> dict:
+        """Number of sources of the run per status (pending, leased, done, failed)."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*) FROM tasks WHERE run_id = ? GROUP BY status",
+                (run_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def is_finished(self, run_id: str) -> bool:
+        status = self.status(run_id)
+        return not status.get("pending") and not status.get("leased")
+
+    def reports(self, run_id: str) -> list:
+        """Reports of the finished sources of the run, in the order of the config."""
+        with self._lock:
+            rows = self._connection.execute(
+                """SELECT report FROM tasks WHERE run_id = ? AND report IS NOT NULL
+                ORDER BY position""",
+                (run_id,),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
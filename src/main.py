@@ -1,7 +1,17 @@
-from asset_mapping_scrapping.scrapper.scrapper_base import ScrapperFactory
+from asset_mapping_scrapping.utils.runner import (
+    enqueue_run,
+    log_summary,
+    run_daemon,
+    run_sources,
+    run_worker,
+    wait_for_run,
+    write_metrics,
+)
 from asset_mapping_scrapping.utils.utils import parse_config
 import logging
-from asset_mapping_scrapping.utils.logger import logging_counter, logger
+import signal
+import threading
+from asset_mapping_scrapping.utils.logger import logger, set_log_directory
 import typer
 from typing import Annotated, List
 from pathlib import Path
@@ -15,6 +25,21 @@ class Mode(str, Enum):
     prod = "prod"
 
 
+class ExportFormat(str, Enum):
+    csv = "csv"
+    parquet = "parquet"
+
+
+class Compression(str, Enum):
+    gzip = "gzip"
+    zstd = "zstd"
+
+
+class Backend(str, Enum):
+    thread = "thread"
+    process = "process"
+
+
 @app.command()
 def main(
     path_yaml: Annotated[
@@ -36,32 +61,140 @@ def main(
         ),
     ] = Mode.prod,
     monitoring: bool = False,
+    delta: Annotated[
+        bool,
+        typer.Option(
+            help="Only export assets added, changed or removed since the last export."
+        ),
+    ] = False,
+    export_format: Annotated[
+        ExportFormat,
+        typer.Option(
+            "--format", case_sensitive=False, help="Format of the exported files."
+        ),
+    ] = ExportFormat.csv,
+    compression: Annotated[
+        Compression,
+        typer.Option(
+            case_sensitive=False,
+            help="Compression of csv exports (.csv.gz, .csv.zst). Not compressed by default.",
+        ),
+    ] = None,
+    workers: Annotated[
+        int, typer.Option(help="Number of sources scrapped concurrently.")
+    ] = 1,
+    backend: Annotated[
+        Backend,
+        typer.Option(
+            case_sensitive=False,
+            help="Pool used to run sources concurrently when workers > 1.",
+        ),
+    ] = Backend.thread,
+    export_workers: Annotated[
+        int, typer.Option(help="Number of files uploaded to s3 concurrently.")
+    ] = 8,
+    queue: Annotated[
+        str,
+        typer.Option(
+            help="Path to a SQLite work queue shared with workers. The sources are queued "
+            "instead of being scrapped, and the run is summarised once workers are done."
+        ),
+    ] = None,
+    worker: Annotated[
+        bool,
+        typer.Option(
+            help="Scrape sources leased from --queue. With sources, they are queued first."
+        ),
+    ] = False,
+    lease_seconds: Annotated[
+        float, typer.Option(help="Duration of the lease of a source by a worker.")
+    ] = 300,
+    idle_timeout: Annotated[
+        float, typer.Option(help="Time a worker waits for new work before stopping.")
+    ] = 60,
+    run_timeout: Annotated[
+        float,
+        typer.Option(
+            help="Time to wait for the workers to finish a queued run, after which the "
+            "sources not done are failed. No limit by default."
+        ),
+    ] = None,
+    resume: Annotated[
+        bool,
+        typer.Option(
+            help="Do not fetch again the asset pages checkpointed by a run that did not complete."
+        ),
+    ] = False,
+    daemon: Annotated[
+        bool,
+        typer.Option(
+            help="Keep running and scrape every source when it is due, according to the "
+            "schedule section of the yaml. --workers sources at most run at the same time."
+        ),
+    ] = False,
+    log_dir: Annotated[
+        str, typer.Option(help="Folder of the log files, one JSON lines file per day.")
+    ] = "logs",
 ):
+    set_log_directory(log_dir)
     logger.info("START SCRAPPING")
 
     if path_yaml is not None:
         config = parse_config(path_yaml)
-    else:
+    elif scrapper_name is not None:
         config = {"sources": {scrapper_name: scrapper_url}}
+    else:
+        config = {}
 
-    sources = config.get("sources").items()
-    for scrapper_name, url in sources:
-        scrapper = ScrapperFactory.get_handler(scrapper_name)(mode=mode)
-
-        logger.info(f"Scraping {scrapper_name}")
-
-        try:
-            # raise Exception("I would like the traceback to be correctly logged")
-            scrapper(url)
-
-            logger.info(f"{scrapper_name} ended gracefully")
-        except Exception as e:
-            logger.error(f"In {scrapper_name}:")
-            logger.exception(e)
-
-    logger.info(f"{len(sources)} sources were scrapped,")
-    logger.info(f"{logging_counter.warning_count} warnings have been encountered.")
-    logger.info(f"{logging_counter.error_count} errors have been encountered.")
+    run_options = dict(
+        mode=mode.value,
+        delta=delta,
+        export_format=export_format.value,
+        compression=compression.value if compression is not None else None,
+        http_config=config.get("http"),
+        map_cache_config=config.get("map_cache"),
+        export_workers=export_workers,
+        throttle_config=config.get("throttle"),
+        resume=resume,
+    )
+    if daemon:
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        run_daemon(
+            config.get("sources"),
+            schedule_config=config.get("schedule"),
+            workers=workers,
+            metrics_config=config.get("metrics"),
+            stop=stop,
+            **run_options,
+        )
+        return
+    if queue is None:
+        reports = run_sources(
+            config.get("sources"), workers=workers, backend=backend.value, **run_options
+        )
+    else:
+        run_id = None
+        if config.get("sources"):
+            run_id = enqueue_run(queue, config["sources"], **run_options)
+        worker_reports = []
+        if worker:
+            worker_reports = run_worker(
+                queue,
+                run_id=run_id,
+                lease_seconds=lease_seconds,
+                idle_timeout=idle_timeout if run_id is None else 0,
+            )
+        if run_id is None:
+            # worker only: the run is summarised by the process that queued it
+            log_summary(worker_reports)
+            return
+        reports = wait_for_run(
+            queue, run_id, local_reports=worker_reports, timeout=run_timeout
+        )
+    log_summary(reports)
+    write_metrics(reports, **(config.get("metrics") or {}))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _log_directory(tmp_path_factory):
+    """Writes the logs of the tests to a temporary directory, not to logs/ of the repository."""
+    from asset_mapping_scrapping.utils.logger import set_log_directory
+
+    set_log_directory(str(tmp_path_factory.mktemp("logs")))
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp_path(tmp_path, monkeypatch):
+    """Runs every test in its own directory, so that state files stay out of the
+    repository."""
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """s3 client of a mocked aws account, with the bucket of the exports."""
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
+        monkeypatch.setenv(name, "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_s3(), moto.mock_sts():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket="vuong")
+        yield client
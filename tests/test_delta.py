@@ -0,0 +1,68 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from asset_mapping_scrapping.utils.delta import (  # noqa: E402
+    SnapshotStore,
+    asset_keys,
+    compute_delta,
+    content_hash,
+)
+
+
+def portfolio(**overrides) -> pd.DataFrame:
+    df = pd.DataFrame(
+        {
+            "id": ["a", "b", None],
+            "asset_name": ["Tower A", "Tower B", "Mall"],
+            "latitude": [48.85, 48.86, 45.76],
+            "longitude": [2.35, 2.36, 4.83],
+        }
+    )
+    for column, values in overrides.items():
+        df[column] = values
+    return df
+
+
+def test_first_run_adds_every_row():
+    delta = compute_delta(portfolio(), None)
+    assert len(delta.added) == 3
+    assert delta.changed.empty and delta.removed.empty
+    assert list(delta.manifest.columns) == ["asset_key", "row_hash"]
+
+
+def test_delta_against_the_saved_manifest():
+    store = SnapshotStore()
+    assert store.load("source") is None
+    store.save("source", compute_delta(portfolio(), None).manifest)
+
+    unchanged = compute_delta(portfolio(), store.load("source"))
+    assert unchanged.is_empty
+
+    current = portfolio(asset_name=["Tower A", "Tower B2", "Mall"]).iloc[1:]
+    current = pd.concat([current, portfolio().iloc[:0].assign(id=["c"], asset_name=["New"])])
+    delta = compute_delta(current, store.load("source"))
+    assert delta.added["asset_key"].tolist() == ["c"]
+    assert delta.changed["asset_key"].tolist() == ["b"]
+    assert delta.removed["asset_key"].tolist() == ["a"]
+
+
+def test_assets_without_id_are_keyed_on_name_and_coordinates():
+    df = portfolio(id=[None, None, None], asset_name=["Mall", "Mall", "Tower"])
+    keys = asset_keys(df)
+    assert keys.is_unique
+    moved = df.assign(latitude=[48.85, 48.87, 45.76])
+    assert (asset_keys(moved) == keys).tolist() == [True, False, True]
+
+
+def test_content_hash_ignores_row_and_column_order():
+    df = portfolio()
+    shuffled = df.iloc[::-1][list(reversed(df.columns))]
+    assert content_hash(shuffled) == content_hash(df)
+    assert content_hash(portfolio(latitude=[0.0, 48.86, 45.76])) != content_hash(df)
+
+
+def test_content_hash_of_cells_that_are_not_hashable():
+    df = portfolio(id=[["a", "b"], {"id": "b"}, None])
+    assert content_hash(df) == content_hash(df.iloc[::-1])
+    assert content_hash(df) != content_hash(portfolio(id=[["a"], {"id": "b"}, None]))
@@ -0,0 +1,109 @@
+import datetime
+import gzip
+import hashlib
+import io
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from asset_mapping_scrapping.utils import export  # noqa: E402
+from asset_mapping_scrapping.utils.export import S3StreamWriter, export_source  # noqa: E402
+
+
+def frame(n_rows: int = 3) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"asset_name": [f"asset {i}" for i in range(n_rows)], "area": range(n_rows)}
+    )
+
+
+def read(s3, key: str) -> bytes:
+    return s3.get_object(Bucket="vuong", Key=key)["Body"].read()
+
+
+def test_small_file_is_put_at_once(s3):
+    writer = S3StreamWriter(s3, "vuong", "small.csv", tagging="owner=test")
+    writer.write(b"a,b\n")
+    writer.write(b"1,2\n")
+    writer.close()
+    assert read(s3, "small.csv") == b"a,b\n1,2\n"
+    assert writer.sha256 == hashlib.sha256(b"a,b\n1,2\n").hexdigest()
+    assert s3.get_object_tagging(Bucket="vuong", Key="small.csv")["TagSet"] == [
+        {"Key": "owner", "Value": "test"}
+    ]
+
+
+def test_large_file_is_uploaded_in_parts(s3, monkeypatch):
+    monkeypatch.setattr(export, "MIN_PART_SIZE", 5 * 2**20)
+    parts = [bytes([i]) * (3 * 2**20) for i in range(4)]
+    writer = S3StreamWriter(s3, "vuong", "large.csv", tagging="owner=test")
+    for part in parts:
+        writer.write(part)
+    assert writer._upload_id is not None
+    writer.close()
+    assert read(s3, "large.csv") == b"".join(parts)
+    assert writer.tell() == 12 * 2**20
+
+
+def test_aborted_upload_leaves_no_object(s3, monkeypatch):
+    monkeypatch.setattr(export, "MIN_PART_SIZE", 5 * 2**20)
+    writer = S3StreamWriter(s3, "vuong", "aborted.csv", tagging="owner=test")
+    writer.write(b"x" * (6 * 2**20))
+    writer.abort()
+    assert "Contents" not in s3.list_objects_v2(Bucket="vuong")
+    assert s3.list_multipart_uploads(Bucket="vuong").get("Uploads", []) == []
+
+
+def test_default_export_is_a_plain_csv(s3):
+    entry = export_source(frame(), "Source").result()
+    today = datetime.date.today()
+    assert entry["key"] == f"app_data/asset_mapping/input_data/Source/Source_{today}.csv"
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(read(s3, entry["key"]))), frame())
+
+
+def test_gzip_export(s3):
+    entry = export_source(frame(120_000), "Source", compression="gzip").result()
+    assert entry["key"].endswith(".csv.gz")
+    body = read(s3, entry["key"])
+    assert entry["sha256"] == hashlib.sha256(body).hexdigest()
+    pd.testing.assert_frame_equal(
+        pd.read_csv(io.BytesIO(gzip.decompress(body))), frame(120_000)
+    )
+
+
+def test_zstd_export(s3):
+    zstandard = pytest.importorskip("zstandard")
+    entry = export_source(frame(), "Source", compression="zstd").result()
+    assert entry["key"].endswith(".csv.zst")
+    body = zstandard.ZstdDecompressor().decompressobj().decompress(read(s3, entry["key"]))
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(body)), frame())
+
+
+def test_failed_export_future(s3):
+    s3.delete_bucket(Bucket="vuong")
+    future = export_source(frame(), "Source")
+    assert future.done()
+    assert future.exception() is not None
+
+
+def test_compact_dtypes_downcasts_exact_floats():
+    df = export.compact_dtypes(
+        pd.DataFrame({"area": [1.5, None, 3.0], "latitude": [22.280001, 0.1, 1.0]}),
+        {"area": "float64", "latitude": "float64"},
+    )
+    assert df["area"].dtype == "float32"
+    assert df["latitude"].dtype == "float64"
+
+
+def test_compact_dtypes_keeps_columns_it_cannot_convert(caplog):
+    df = pd.DataFrame({"area": [1000.0, "n/a", None], "sold": ["2020-01-01", "soon", None]})
+    compacted = export.compact_dtypes(df, {"area": "float64", "sold": "datetime64[ns]"})
+    pd.testing.assert_frame_equal(compacted, df)
+    assert "Column area kept as object" in caplog.text
+    assert "Column sold kept as object" in caplog.text
+
+
+def test_compact_dtypes_converts_numeric_text():
+    df = export.compact_dtypes(
+        pd.DataFrame({"area": ["1000", "2000.5", None]}), {"area": "float64"}
+    )
+    assert df["area"].tolist()[:2] == [1000.0, 2000.5]
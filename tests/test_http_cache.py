@@ -0,0 +1,125 @@
+import datetime
+import io
+import os
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from requests.structures import CaseInsensitiveDict  # noqa: E402
+from asset_mapping_scrapping.utils.http import HttpClient  # noqa: E402
+from asset_mapping_scrapping.utils.http_cache import HttpCache  # noqa: E402
+
+
+def response(body: bytes = b"", status_code: int = 200, headers: dict = None):
+    result = requests.Response()
+    result.status_code = status_code
+    result.headers = CaseInsensitiveDict(headers or {})
+    result.raw = io.BytesIO(body)
+    result.url = "https://api.example.com/items"
+    result.encoding = "utf-8"
+    result.elapsed = datetime.timedelta(0)
+    return result
+
+
+@pytest.fixture
+def cache():
+    return HttpCache("cache")
+
+
+def test_store_stream_copies_the_body_to_disk(cache):
+    body = b'{"items": [' + b", ".join(b"%d" % i for i in range(50_000)) + b"]}"
+    key = cache.key("GET", "https://api.example.com/items")
+    served = cache.store_stream(key, response(body, headers={"ETag": '"v1"'}), chunk_size=1000)
+    assert served.from_cache
+    assert b"".join(served.iter_content(4096)) == body
+    served.close()
+    with open(os.path.join("cache", f"{key}.body"), "rb") as f:
+        assert f.read() == body
+    assert cache.load(key)["headers"]["ETag"] == '"v1"'
+
+
+def test_store_stream_leaves_unstorable_responses_untouched(cache):
+    key = cache.key("GET", "https://api.example.com/items")
+    received = response(b"content")
+    assert cache.store_stream(key, received) is received
+    assert received.content == b"content"
+    assert cache.load(key) is None
+
+
+def test_interrupted_stream_stores_nothing(cache):
+    key = cache.key("GET", "https://api.example.com/items")
+    received = response(headers={"ETag": '"v1"'})
+
+    def broken(chunk_size):
+        yield b"part"
+        raise requests.ConnectionError
+
+    received.iter_content = broken
+    with pytest.raises(requests.ConnectionError):
+        cache.store_stream(key, received)
+    assert cache.load(key) is None
+    assert os.listdir("cache") == []
+
+
+@pytest.fixture
+def client():
+    client = HttpClient(cache_dir="cache")
+    yield client
+    client.close()
+
+
+def serve(client, monkeypatch, responses):
+    """Answers the requests of `client` with `responses`, and returns the headers sent."""
+    sent = []
+
+    def send(session, method, url, **kwargs):
+        sent.append(kwargs.get("headers") or {})
+        return responses.pop(0)
+
+    monkeypatch.setattr(client, "_send", send)
+    return sent
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_not_modified_response_is_served_from_disk(client, monkeypatch, stream):
+    headers = {"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"}
+    sent = serve(
+        client, monkeypatch, [response(b"content", headers=headers), response(status_code=304)]
+    )
+    url = "https://api.example.com/items"
+    assert client.get(url, stream=stream).content == b"content"
+    served = client.get(url, stream=stream)
+    assert served.from_cache
+    assert served.status_code == 200
+    assert served.content == b"content"
+    assert sent[0] == {}
+    assert sent[1] == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT",
+    }
+    assert client.cache.stats == {"hits": 1, "misses": 1, "revalidations": 0}
+
+
+def test_modified_response_replaces_the_entry(client, monkeypatch):
+    serve(
+        client,
+        monkeypatch,
+        [
+            response(b"v1", headers={"ETag": '"v1"'}),
+            response(b"v2", headers={"ETag": '"v2"'}),
+            response(status_code=304),
+        ],
+    )
+    url = "https://api.example.com/items"
+    client.get(url)
+    assert client.get(url).content == b"v2"
+    assert client.get(url).content == b"v2"
+    assert client.cache.stats == {"hits": 1, "misses": 1, "revalidations": 1}
+
+
+def test_responses_without_validators_are_not_cached(client, monkeypatch):
+    sent = serve(client, monkeypatch, [response(b"a"), response(b"b")])
+    url = "https://api.example.com/items"
+    assert client.get(url).content == b"a"
+    assert client.get(url).content == b"b"
+    assert sent == [{}, {}]
@@ -0,0 +1,108 @@
+import json
+import pytest
+from asset_mapping_scrapping.utils.json_stream import JsonItemParser, iter_json_items
+
+DOCUMENT = {
+    "items": [
+        {"name": "Tower ✓ 塔", "lat": 22.28, "tags": ["a", "b"], "empty": {}},
+        {"name": 'quote " and \\ backslash', "lat": -1e-3, "nested": [[1, 2], {"x": None}]},
+        12345,
+        "text with ] and } and , inside",
+        True,
+        None,
+        [],
+    ],
+    "total": 7,
+    "pagination": {"next": None},
+}
+
+
+def chunks(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10_000])
+def test_items_whatever_the_chunk_size(size):
+    body = json.dumps(DOCUMENT, ensure_ascii=False).encode()
+    assert list(iter_json_items(chunks(body, size), ("items", "*"))) == DOCUMENT["items"]
+
+
+def test_every_split_position():
+    body = json.dumps(DOCUMENT, ensure_ascii=False, indent=2).encode()
+    for split in range(len(body) + 1):
+        items = list(iter_json_items([body[:split], body[split:]], ("items", "*")))
+        assert items == DOCUMENT["items"], split
+
+
+def test_number_split_across_chunks():
+    items = list(iter_json_items([b'{"items": [12', b"34, 5", b".5e", b"2]}"], ("items", "*")))
+    assert items == [1234, 550.0]
+
+
+def test_top_level_number_ends_with_the_document():
+    parser = JsonItemParser(())
+    assert parser.feed("12") == []
+    assert parser.close() == [12]
+
+
+def test_nested_path_with_wildcard_keys():
+    document = {
+        "data": {
+            "hk": {"properties": {"items": [1, 2]}},
+            "sg": {"properties": {"items": [3]}, "other": {"items": [99]}},
+        }
+    }
+    body = json.dumps(document).encode()
+    path = ("data", "*", "properties", "items", "*")
+    assert list(iter_json_items(chunks(body, 5), path)) == [1, 2, 3]
+
+
+def test_index_path():
+    body = json.dumps({"items": ["a", "b", "c"]}).encode()
+    assert list(iter_json_items(chunks(body, 4), ("items", 1))) == ["b"]
+
+
+def test_items_are_yielded_before_the_end_of_the_document():
+    def body():
+        yield b'{"items": [{"a": 1}, '
+        yield b'{"a": 2}, '
+        raise ConnectionError
+
+    items = iter_json_items(body(), ("items", "*"))
+    assert next(items) == {"a": 1}
+    assert next(items) == {"a": 2}
+    with pytest.raises(ConnectionError):
+        next(items)
+
+
+@pytest.mark.parametrize("body", [b'{"items": [1, 2', b'{"items": [1, 2]}}', b'{"items": [{"a": 1]}'])
+def test_invalid_documents(body):
+    with pytest.raises(ValueError):
+        list(iter_json_items(chunks(body, 3), ("items", "*")))
+
+
+def test_missing_container_is_only_an_error_when_required():
+    body = json.dumps({"errors": [{"message": "boom"}], "data": None}).encode()
+    assert list(iter_json_items(chunks(body, 4), ("data", "items", "*"))) == []
+    with pytest.raises(ValueError, match="No container"):
+        list(iter_json_items(chunks(body, 4), ("data", "items", "*"), required=True))
+    empty = json.dumps({"data": {"items": []}}).encode()
+    assert list(iter_json_items([empty], ("data", "items", "*"), required=True)) == []
+
+
+def test_required_containers_and_collected_values():
+    body = json.dumps(
+        {
+            "errors": [{"message": "map1 not found"}],
+            "data": {"map0": {"items": [1, 2]}, "map1": None, "map2": {"items": [3]}},
+        }
+    ).encode()
+    required = [("data", f"map{i}", "items") for i in range(3)]
+    errors = []
+    items = iter_json_items(
+        chunks(body, 5), ("data", "*", "items", "*"), required, {("errors", "*"): errors}
+    )
+    assert [next(items) for _ in range(3)] == [1, 2, 3]
+    with pytest.raises(ValueError, match="'map1'"):
+        next(items)
+    assert errors == [{"message": "map1 not found"}]
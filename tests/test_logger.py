@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def run(code: str) -> None:
+    subprocess.run(
+        [sys.executable, "-c", code], check=True, env={**os.environ, "PYTHONPATH": SRC}
+    )
+
+
+def test_import_writes_nothing():
+    run("import asset_mapping_scrapping.utils.logger")
+    assert os.listdir(".") == []
+
+
+def test_records_are_written_to_the_log_directory():
+    run(
+        "from asset_mapping_scrapping.utils.logger import logger, set_log_directory\n"
+        "set_log_directory('custom')\n"
+        "logger.info('hello')\n"
+    )
+    assert not os.path.exists("logs")
+    [name] = os.listdir("custom")
+    assert name.endswith(".jsonl")
+    with open(os.path.join("custom", name)) as f:
+        assert '"message": "hello"' in f.read()
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from asset_mapping_scrapping.utils import map_cache
+from asset_mapping_scrapping.utils.map_cache import ResolutionCache, configure_resolution_cache
+
+
+def test_resolve_caches_normalised_urls():
+    cache = ResolutionCache()
+    calls = []
+
+    def resolver(url):
+        calls.append(url)
+        return [1.0, 2.0]
+
+    assert cache.resolve("coords", "HTTPS://Example.com/map/?b=2&a=1", resolver) == [1.0, 2.0]
+    assert cache.resolve("coords", "https://example.com/map?a=1&b=2#x", resolver) == [1.0, 2.0]
+    assert len(calls) == 1
+    assert ResolutionCache().get("coords", "https://example.com/map?a=1&b=2") == [1.0, 2.0]
+
+
+def test_threads_use_their_own_connection():
+    cache = ResolutionCache()
+    connections = []
+
+    def lookup():
+        cache.get("coords", "https://example.com")
+        connections.append(cache._connection())
+
+    threads = [threading.Thread(target=lookup) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(connection) for connection in connections}) == 4
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_forked_process_opens_its_own_connection():
+    cache = ResolutionCache()
+    cache.set("coords", "https://example.com/a", [1.0, 2.0])
+    parent_connection = cache._connection()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            ok = (
+                cache.get("coords", "https://example.com/a") == [1.0, 2.0]
+                and cache._connection() is not parent_connection
+            )
+            cache.set("coords", "https://example.com/b", [3.0, 4.0])
+        except BaseException:
+            ok = False
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert cache.get("coords", "https://example.com/b") == [3.0, 4.0]
+
+
+def test_configure_closes_the_previous_cache(monkeypatch):
+    monkeypatch.setattr(map_cache, "_resolution_cache", None)
+    previous = configure_resolution_cache(path="previous.sqlite")
+    connection = previous._connection()
+    configure_resolution_cache(path="next.sqlite")
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
+    # still usable: a new connection is opened
+    assert previous.get("coords", "https://example.com") is None
+    map_cache._resolution_cache.close()
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("pandas")
+
+from asset_mapping_scrapping.utils.map_parser import (  # noqa: E402
+    _extract_init_embed,
+    _extract_init_embed_legacy,
+    _parse_init_embed,
+    parse_embed_page,
+)
+
+
+def embed_page(l_content: list) -> bytes:
+    """Embed page shaped like the ones served by google maps."""
+    script = f"(function(){{window.APP_OPTIONS=[];}})();initEmbed({json.dumps(l_content)});"
+    return f"<html><head><script>{script}</script></head><body></body></html>".encode()
+
+
+def with_place(address: str, full_address, latitude: float, longitude: float) -> list:
+    place = [None] * 14
+    place[0] = [None, address, [latitude, longitude]]
+    place[13] = full_address
+    l_content = [None] * 30
+    l_content[0] = [[0, "tile 0", None, [0.25, 0.5]]]
+    l_content[21] = [None, None, None, place, None, None]
+    return l_content
+
+
+def without_place(address: str, latitude: float, longitude: float) -> list:
+    l_content = [None] * 30
+    l_content[21] = [[[None, longitude, latitude]], None, None, None, None, [address]]
+    return l_content
+
+
+PAGES = {
+    "place": with_place("1 Example Road", "1 Example Road, Central, Hong Kong", 22.28, 114.16),
+    "place-short-full-address": with_place("1 Example Road, Central", "Central", -33.8, 151.2),
+    "place-without-full-address": with_place("Rue de l'Église", None, 48.85, 2.35),
+    "no-place": without_place("Zürich \"Nord\"", 47.3769, 8.5417),
+    "small-coordinates": without_place("Null Island", 1e-05, -0.0),
+}
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_fast_and_legacy_paths_agree(name):
+    page = embed_page(PAGES[name])
+    fast = _parse_init_embed(_extract_init_embed(page))
+    legacy = _parse_init_embed(_extract_init_embed_legacy(page))
+    assert fast == legacy
+    assert parse_embed_page(page) == fast
+    assert parse_embed_page(page.decode()) == fast
+
+
+def test_address_is_the_longest_one():
+    page = embed_page(PAGES["place-short-full-address"])
+    assert parse_embed_page(page) == ("1 Example Road, Central", -33.8, 151.2)
+
+
+def test_payload_that_is_not_json_falls_back_to_the_legacy_path():
+    payload = repr(without_place("Central", 22.28, 114.16)).replace("None", "null")
+    page = f"<script>initEmbed({payload});</script>"
+    with pytest.raises(ValueError):
+        _extract_init_embed(page)
+    assert parse_embed_page(page) == ("Central", 22.28, 114.16)
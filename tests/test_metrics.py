@@ -0,0 +1,57 @@
+import gzip
+import io
+import pytest
+
+requests = pytest.importorskip("requests")
+urllib3 = pytest.importorskip("urllib3")
+
+from requests.structures import CaseInsensitiveDict  # noqa: E402
+from asset_mapping_scrapping.utils.logger import source_context  # noqa: E402
+from asset_mapping_scrapping.utils.metrics import Metrics  # noqa: E402
+
+
+def response(body: bytes, headers: dict) -> requests.Response:
+    result = requests.Response()
+    result.status_code = 200
+    result.headers = CaseInsensitiveDict(headers)
+    result.raw = urllib3.HTTPResponse(
+        io.BytesIO(body), headers=headers, preload_content=False, decode_content=True
+    )
+    return result
+
+
+def downloaded(metrics: Metrics, source: str) -> float:
+    return sum(
+        entry["value"]
+        for entry in metrics.snapshot(source=source)
+        if entry["name"] == "http_downloaded_bytes_total"
+    )
+
+
+def test_streamed_body_is_counted_as_read():
+    metrics = Metrics()
+    body = b"x" * 100_000
+    # compressed and chunked: Content-Length is missing
+    received = response(gzip.compress(body), {"Content-Encoding": "gzip"})
+    with source_context("A"):
+        metrics.record_response("https://example.com/items", received, streamed=True)
+    assert downloaded(metrics, "A") == 0
+    assert b"".join(received.iter_content(4096)) == body
+    assert downloaded(metrics, "A") == len(body)
+
+
+def test_streamed_content_is_counted():
+    metrics = Metrics()
+    received = response(b"abc", {"Content-Length": "3"})
+    with source_context("A"):
+        metrics.record_response("https://example.com/items", received, streamed=True)
+    assert received.content == b"abc"
+    assert downloaded(metrics, "A") == 3
+
+
+def test_read_body_is_counted_at_once():
+    metrics = Metrics()
+    received = response(b"abcd", {})
+    with source_context("A"):
+        metrics.record_response("https://example.com/items", received)
+    assert downloaded(metrics, "A") == 4
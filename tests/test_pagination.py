@@ -0,0 +1,85 @@
+import logging
+from urllib.parse import parse_qsl, urlsplit
+from asset_mapping_scrapping.utils.pagination import (
+    iter_cursor_pages,
+    iter_pages,
+    iter_streamed_pages,
+    page_urls,
+)
+
+ITEMS = list(range(250))
+
+
+def api(max_limit: int = 1000):
+    """Offset API over ITEMS, returning at most `max_limit` items per page."""
+    requested = []
+
+    def fetch(url: str) -> dict:
+        query = dict(parse_qsl(urlsplit(url).query))
+        requested.append(int(query["skip"]))
+        skip, limit = int(query["skip"]), min(int(query["limit"]), max_limit)
+        return {"items": ITEMS[skip : skip + limit]}
+
+    return fetch, requested
+
+
+def extract(page: dict) -> list:
+    return page["items"]
+
+
+def test_all_items_in_order():
+    fetch, _ = api()
+    urls = page_urls("https://api.example.com/items", page_size=100)
+    assert list(iter_pages(fetch, urls, extract, page_size=100)) == ITEMS
+
+
+def test_stops_at_the_first_empty_page():
+    fetch, requested = api()
+    urls = page_urls("https://api.example.com/items", page_size=50)
+    assert list(iter_pages(fetch, urls, extract, page_size=50, prefetch=0)) == ITEMS
+    assert requested == [0, 50, 100, 150, 200, 250]
+
+
+def test_short_page_does_not_end_the_feed(caplog):
+    fetch, _ = api(max_limit=40)
+    urls = page_urls("https://api.example.com/items", page_size=50)
+    with caplog.at_level(logging.WARNING):
+        items = list(iter_pages(fetch, urls, extract, page_size=50))
+    # items beyond the first short page are still yielded, and the cap is reported once
+    assert items[:40] == ITEMS[:40] and len(items) == 200
+    assert caplog.text.count("caps the page size") == 1
+
+
+def test_last_short_page_does_not_warn(caplog):
+    fetch, _ = api()
+    urls = page_urls("https://api.example.com/items", page_size=100)
+    with caplog.at_level(logging.WARNING):
+        list(iter_pages(fetch, urls, extract, page_size=100))
+    assert "caps the page size" not in caplog.text
+
+
+def test_cursor_pages():
+    pages = {
+        "https://api.example.com/1": {"items": [1, 2], "next": "https://api.example.com/2"},
+        "https://api.example.com/2": {"items": [3], "next": None},
+    }
+    items = iter_cursor_pages(pages.get, "https://api.example.com/1", extract, lambda p: p["next"])
+    assert list(items) == [1, 2, 3]
+
+
+def test_streamed_pages_are_consumed_lazily():
+    fetch, requested = api()
+    parsed = []
+
+    def stream_page(url):
+        for item in extract(fetch(url)):
+            parsed.append(item)
+            yield item
+
+    urls = page_urls("https://api.example.com/items", page_size=100)
+    items = iter_streamed_pages(stream_page, urls, page_size=100)
+    assert next(items) == 0
+    # a single item was parsed, no page is held
+    assert parsed == [0]
+    assert list(items) == ITEMS[1:]
+    assert requested == [0, 100, 200, 300]
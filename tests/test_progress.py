@@ -0,0 +1,34 @@
+import threading
+import pytest
+
+pytest.importorskip("rich")
+
+from asset_mapping_scrapping.utils import progress  # noqa: E402
+
+
+def test_concurrent_tracks_share_one_display():
+    errors = []
+    barrier = threading.Barrier(4)
+
+    def scrap(name):
+        try:
+            for i in progress.track(range(50), description=name, total=50):
+                if i == 0:
+                    barrier.wait(timeout=5)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=scrap, args=(f"source {i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert progress._progress is None and progress._task_count == 0
+
+
+def test_display_stops_when_a_source_fails():
+    with pytest.raises(RuntimeError):
+        for _ in progress.track(range(3), description="failing", total=3):
+            raise RuntimeError
+    assert progress._progress is None and progress._task_count == 0
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def test_scrapper_lookup_does_not_import_parsing_and_validation_libraries():
+    pytest.importorskip("pandas")
+    pytest.importorskip("requests")
+    code = (
+        "import sys\n"
+        "from asset_mapping_scrapping.scrapper.registry import ScrapperFactory\n"
+        "ScrapperFactory.get_handler('HongkongLand')\n"
+        "print(sorted({'bs4', 'pandera'} & set(sys.modules)))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": SRC},
+    )
+    assert result.stdout.strip() == "[]"
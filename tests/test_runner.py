@@ -0,0 +1,116 @@
+import os
+import time
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pandera")
+pytest.importorskip("requests")
+
+from dataclasses import dataclass, field  # noqa: E402
+from asset_mapping_scrapping.scrapper.scrapper_base import Scrapper, ScrapperFactory  # noqa: E402
+from asset_mapping_scrapping.utils.runner import run_sources  # noqa: E402
+
+
+@dataclass
+@ScrapperFactory.register_handler()
+class FakePortfolio(Scrapper):
+    sector: str = "Real Estate"
+
+    def get_data_from_main_page(self, url) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "asset_name": ["Tower 1", "Tower 2"],
+                "latitude": [22.28, 22.29],
+                "longitude": [114.16, 114.17],
+                "address": ["1 Example Road", "2 Example Road"],
+                "city": "Hong Kong",
+                "country": "China",
+                "state": "",
+                "status": "Operating",
+                "subtype": "office",
+                "area": [1000.0, 2000.0],
+                "unit": "sqm",
+                "sector": "Real Estate",
+                "company_name": "Example",
+            }
+        )
+
+    def get_data_from_asset_page(self, asset_url: str) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+def exported_keys(s3) -> list:
+    return [
+        item["Key"]
+        for item in s3.list_objects_v2(Bucket="vuong").get("Contents", [])
+        if "/_runs/" not in item["Key"]
+    ]
+
+
+def checkpoint(source_name: str = "FakePortfolio") -> str:
+    """Checkpoint left by an interrupted run of the source."""
+    os.makedirs(".checkpoints", exist_ok=True)
+    path = os.path.join(".checkpoints", f"{source_name}.jsonl")
+    with open(path, "w") as f:
+        f.write('{"asset_url": "https://example.com/1", "rows": []}\n')
+    return path
+
+
+def test_exported_source_succeeds(s3):
+    path = checkpoint()
+    [report] = run_sources({"FakePortfolio": "https://example.com"})
+    assert report.succeeded
+    assert not os.path.exists(path)
+    [key] = exported_keys(s3)
+    assert key.startswith("app_data/asset_mapping/input_data/FakePortfolio/FakePortfolio_")
+
+
+def test_failed_export_fails_the_source(s3):
+    s3.delete_bucket(Bucket="vuong")
+    path = checkpoint()
+    [report] = run_sources({"FakePortfolio": "https://example.com"})
+    assert not report.succeeded
+    # kept for a rerun to resume
+    assert os.path.exists(path)
+
+
+def test_main_page_is_only_hashed_when_asked():
+    from asset_mapping_scrapping.scrapper.scrapper_base import SourceUnchanged
+
+    scrapper = FakePortfolio(mode="dev")
+    scrapper("https://example.com")
+    assert scrapper.content_hash is None
+
+    scrapper = FakePortfolio(mode="dev", hash_main_page=True)
+    scrapper("https://example.com")
+    assert scrapper.content_hash is not None
+    with pytest.raises(SourceUnchanged):
+        FakePortfolio(mode="dev", unchanged_hash=scrapper.content_hash)("https://example.com")
+
+
+
+@dataclass
+class SlowAssetPages(FakePortfolio):
+    asset_page_workers: int = 2
+    fetched: list = field(default_factory=list)
+
+    def get_data_from_asset_page(self, asset_url: str) -> pd.DataFrame:
+        time.sleep(0.02)
+        self.fetched.append(asset_url)
+        return pd.DataFrame({"area": [1.0]})
+
+
+def test_asset_pages_are_fetched_in_order():
+    urls = [f"https://example.com/{i}" for i in range(20)]
+    pages = SlowAssetPages(mode="dev")._fetch_asset_pages(urls)
+    assert [url for url, _ in pages] == urls
+
+
+def test_stopped_consumer_only_waits_for_the_pages_being_fetched():
+    scrapper = SlowAssetPages(mode="dev")
+    urls = [f"https://example.com/{i}" for i in range(100)]
+    pages = scrapper._fetch_asset_pages(urls)
+    assert next(pages)[0] == urls[0]
+    pages.close()
+    # 2 * asset_page_workers pages are submitted ahead, the ones not started are cancelled
+    assert len(scrapper.fetched) <= 1 + 2 * 2
@@ -0,0 +1,167 @@
+import json
+import pytest
+from asset_mapping_scrapping.utils.scheduler import (
+    SchedulePolicy,
+    Scheduler,
+    SchedulerState,
+    parse_duration,
+)
+
+CONFIG = {
+    "default": {"every": "1h", "ttl": "1d", "retry_every": "10m"},
+    "sources": {"Hourly": {}, "Daily": {"every": "1d"}, "Off": {"enabled": False}},
+}
+SOURCES = {"Hourly": "https://hourly", "Daily": "https://daily", "Off": "https://off"}
+
+
+@pytest.fixture
+def scheduler():
+    return Scheduler(SOURCES, {**CONFIG, "state_path": "state.json"})
+
+
+def test_parse_duration():
+    assert parse_duration(90) == 90
+    assert parse_duration("30m") == 1800
+    assert parse_duration("1.5h") == 5400
+    assert parse_duration("2d") == 172800
+    with pytest.raises(ValueError):
+        parse_duration("soon")
+
+
+def test_policy_overrides():
+    policy = SchedulePolicy.from_config(CONFIG["default"], CONFIG["sources"]["Daily"])
+    assert (policy.every, policy.ttl, policy.retry_every) == (86400, 86400, 600)
+    with pytest.raises(ValueError):
+        SchedulePolicy.from_config({"evry": "1h"})
+
+
+def test_concurrency_is_not_a_schedule_setting():
+    with pytest.raises(ValueError):
+        Scheduler(SOURCES, {"max_concurrency": 2})
+
+
+def test_never_checked_sources_are_due(scheduler):
+    assert set(scheduler.due(now=0)) == {"Hourly", "Daily"}
+
+
+def test_due_after_every(scheduler):
+    scheduler.state.record("Hourly", "ok", 1000, content_hash="abc")
+    scheduler.state.record("Daily", "ok", 0, content_hash="def")
+    assert scheduler.due(now=1000 + 3599) == []
+    assert scheduler.due(now=1000 + 3600) == ["Hourly"]
+    # most overdue first
+    assert scheduler.due(now=86400 + 4600) == ["Hourly", "Daily"]
+
+
+def test_failed_source_is_retried_sooner(scheduler):
+    scheduler.state.record("Hourly", "failed", 1000)
+    scheduler.state.record("Daily", "ok", 1000)
+    assert scheduler.due(now=1000 + 600) == ["Hourly"]
+
+
+def test_unchanged_hash_until_ttl(scheduler):
+    assert scheduler.unchanged_hash("Hourly", now=0) is None
+    scheduler.state.record("Hourly", "ok", 1000, content_hash="abc")
+    # a skipped check does not renew the full scrape
+    scheduler.state.record("Hourly", "skipped", 5000)
+    assert scheduler.unchanged_hash("Hourly", now=5000) == "abc"
+    assert scheduler.unchanged_hash("Hourly", now=1000 + 86400) is None
+
+
+def test_state_record_and_reload():
+    state = SchedulerState("state/state.json")
+    state.record("A", "ok", 10, content_hash="abc")
+    state.record("A", "failed", 20)
+    state.record("A", "failed", 30)
+    entry = SchedulerState("state/state.json").get("A")
+    assert entry == {
+        "last_attempt": 30,
+        "status": "failed",
+        "failures": 2,
+        "last_success": 10,
+        "last_scrape": 10,
+        "content_hash": "abc",
+    }
+    state.record("A", "skipped", 40)
+    entry = SchedulerState("state/state.json").get("A")
+    assert (entry["failures"], entry["last_success"], entry["last_scrape"]) == (0, 40, 10)
+    with open("state/state.json") as f:
+        assert json.load(f)["A"]["status"] == "skipped"
+
+
+def test_seconds_until_next(scheduler):
+    scheduler.state.record("Hourly", "ok", 1000)
+    scheduler.state.record("Daily", "ok", 1000)
+    assert scheduler.seconds_until_next(now=1000 + 3000) == 60
+    assert scheduler.seconds_until_next(now=1000 + 3590) == 10
+    assert scheduler.seconds_until_next(now=1000 + 3590, running=["Hourly"]) == 60
+
+
+def test_check_that_raised_is_recorded_as_failed(scheduler, monkeypatch):
+    pytest.importorskip("pandas")
+    pytest.importorskip("requests")
+    from asset_mapping_scrapping.utils import runner
+
+    def run_source(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(runner, "run_source", run_source)
+    with pytest.raises(RuntimeError):
+        runner._run_scheduled(scheduler, "Hourly", 1000, {"mode": "dev"})
+    assert scheduler.state.get("Hourly")["status"] == "failed"
+    assert "Hourly" not in scheduler.due(now=1001)
+
+
+def test_daemon_waits_for_a_slot_without_spinning(monkeypatch):
+    pytest.importorskip("pandas")
+    pytest.importorskip("requests")
+    import threading
+    import time
+    from asset_mapping_scrapping.utils import runner
+
+    stop = threading.Event()
+    checked = []
+
+    def run_scheduled(scheduler, source, started_at, options):
+        time.sleep(0.3)
+        scheduler.state.record(source, "ok", started_at)
+        checked.append(source)
+        if len(checked) == 2:
+            stop.set()
+        return runner.SourceReport(source_name=source, succeeded=True, duration=0.3)
+
+    n_polls = []
+    due = Scheduler.due
+    monkeypatch.setattr(Scheduler, "due", lambda self, *args: n_polls.append(1) or due(self))
+    monkeypatch.setattr(runner, "_run_scheduled", run_scheduled)
+    monkeypatch.setattr(runner, "write_metrics", lambda *args, **kwargs: None)
+    runner.run_daemon(
+        {"Hourly": "https://hourly", "Daily": "https://daily"},
+        {**CONFIG, "state_path": "state.json"},
+        stop=stop,
+        workers=1,
+    )
+    assert sorted(checked) == ["Daily", "Hourly"]
+    # one poll per completed check, not a busy loop while the slot is taken
+    assert len(n_polls) < 10
+
+
+def test_every_check_has_the_whole_retry_budget(scheduler, monkeypatch):
+    pytest.importorskip("pandas")
+    pytest.importorskip("requests")
+    from asset_mapping_scrapping.utils import runner
+    from asset_mapping_scrapping.utils.http import get_http_client
+
+    remaining = []
+
+    def run_source(source, *args, **kwargs):
+        budget = get_http_client().throttler.budget(source)
+        remaining.append(budget.remaining)
+        while budget.spend():
+            pass
+        return runner.SourceReport(source_name=source, succeeded=True, duration=0.0)
+
+    monkeypatch.setattr(runner, "run_source", run_source)
+    runner._run_scheduled(scheduler, "Hourly", 1000, {"mode": "dev"})
+    runner._run_scheduled(scheduler, "Hourly", 5000, {"mode": "dev"})
+    assert remaining == [200, 200]
@@ -0,0 +1,87 @@
+import io
+import json
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pandera")
+requests = pytest.importorskip("requests")
+
+from asset_mapping_scrapping.scrapper.individual_scrappers.real_estate import (  # noqa: E402
+    aryaduta_hotel_group,
+    axa_im,
+)
+
+AryadutaHotelGroup = aryaduta_hotel_group.AryadutaHotelGroup
+AXAIM = axa_im.AXAIM
+from asset_mapping_scrapping.utils.http import get_http_client  # noqa: E402
+
+
+def serve(monkeypatch, document):
+    """Answers every request of the http client with `document`."""
+
+    def request(method, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(json.dumps(document).encode())
+        return response
+
+    monkeypatch.setattr(get_http_client(), "request", request)
+
+
+def test_feed_is_parsed(monkeypatch):
+    hotel = {
+        "properties": [{"name": " Hotel ", "address": "1 Road", "city": {"name": "Jakarta"}}]
+    }
+    serve(monkeypatch, {"data": {"items": [hotel, hotel]}})
+    df = AryadutaHotelGroup(mode="dev")._get_list_assets("https://example.com")
+    assert df["asset_name"].tolist() == ["Hotel", "Hotel"]
+
+
+def test_error_payload_fails_instead_of_returning_no_asset(monkeypatch):
+    serve(monkeypatch, {"errors": [{"message": "unavailable"}], "data": None})
+    with pytest.raises(ValueError, match="No container"):
+        AryadutaHotelGroup(mode="dev")._get_list_assets("https://example.com")
+
+
+def axa_map(*names):
+    return {
+        "properties": {
+            "items": [
+                {
+                    "id": name,
+                    "name": name,
+                    "assetType": "office",
+                    "addressLine1": "1 Road",
+                    "city": {"country": "France", "name": "Paris"},
+                    "latitude": 48.85,
+                    "longitude": 2.35,
+                    "squareMeters": 100.0,
+                }
+                for name in names
+            ]
+        }
+    }
+
+
+def test_every_axa_map_is_parsed(monkeypatch):
+    serve(
+        monkeypatch,
+        {"data": {"map0": axa_map("a", "b"), "map1": axa_map(), "map2": axa_map("c")}},
+    )
+    df = AXAIM(mode="dev")._get_list_assets("https://example.com")
+    assert df["id"].tolist() == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        {"data": {"map0": axa_map("a"), "map1": None, "map2": axa_map("c")}},
+        {"data": {"map0": axa_map("a"), "map2": axa_map("c")}},
+        {"errors": [{"message": "unavailable"}], "data": None},
+        {"errors": [{"message": "field"}], "data": {f"map{i}": axa_map() for i in range(3)}},
+    ],
+)
+def test_incomplete_axa_response_fails(monkeypatch, document):
+    serve(monkeypatch, document)
+    with pytest.raises(ValueError):
+        AXAIM(mode="dev")._get_list_assets("https://example.com")
@@ -0,0 +1,79 @@
+import threading
+import time
+from asset_mapping_scrapping.utils.throttle import HostLimiter, ThrottlePolicy, Throttler
+
+
+def test_sources_share_the_limiter_of_a_host():
+    throttler = Throttler({"default": {"max_concurrency": 1, "initial_concurrency": 1}})
+    first = throttler.limiter("A", "example.com")
+    second = throttler.limiter("B", "example.com")
+    other_host = throttler.limiter("B", "other.com")
+    assert first.limiters == second.limiters
+    assert first.limiters != other_host.limiters
+
+    started_at = first.acquire()
+    acquired = threading.Event()
+
+    def send():
+        second.release(second.acquire(), throttled=False)
+        acquired.set()
+
+    thread = threading.Thread(target=send)
+    thread.start()
+    # the slot of the host is held by source A
+    assert not acquired.wait(0.1)
+    first.release(started_at, throttled=False)
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_source_limits_apply_on_top_of_the_host():
+    throttler = Throttler(
+        {
+            "default": {"max_concurrency": 8},
+            "hosts": {"example.com": {"max_concurrency": 4}},
+            "sources": {
+                "Slow": {"max_concurrency": 2, "initial_concurrency": 2},
+                "Retry": {"max_retries": 1},
+            },
+        }
+    )
+    slow = throttler.limiter("Slow", "example.com")
+    assert [limiter.policy.max_concurrency for limiter in slow.limiters] == [2, 4]
+    # retry settings do not add a limiter
+    assert len(throttler.limiter("Retry", "example.com").limiters) == 1
+    assert throttler.policy("Retry").max_retries == 1
+
+    slow.acquire()
+    slow.acquire()
+    host = throttler.host_limiter("example.com")
+    assert host.in_flight == 2
+    assert slow.limiters[0].in_flight == 2
+
+
+def test_throttled_host_slows_every_source():
+    throttler = Throttler({"default": {"initial_concurrency": 4}})
+    first = throttler.limiter("A", "example.com")
+    first.release(first.acquire(), throttled=True)
+    assert throttler.host_limiter("example.com").limit == 2
+    second = throttler.limiter("B", "example.com")
+    second.pause(0.2)
+    start = time.monotonic()
+    first.release(first.acquire(), throttled=False)
+    assert time.monotonic() - start >= 0.15
+
+
+def test_token_bucket_rate():
+    limiter = HostLimiter(ThrottlePolicy(rate=20, burst=1))
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.release(limiter.acquire(), throttled=False)
+    assert time.monotonic() - start >= 4 / 20 * 0.9
+
+
+def test_reset_budget():
+    throttler = Throttler({"sources": {"A": {"retry_budget": 1}}})
+    assert throttler.budget("A").spend()
+    assert not throttler.budget("A").spend()
+    throttler.reset_budget("A")
+    assert throttler.budget("A").spend()
@@ -0,0 +1,98 @@
+import warnings
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pa = pytest.importorskip("pandera")
+
+from asset_mapping_scrapping.scrapper.schema import real_estate_schema  # noqa: E402
+from asset_mapping_scrapping.scrapper.validation import get_plan, validate  # noqa: E402
+
+
+def portfolio(n_rows: int = 200, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "asset_name": [f"asset {i}" for i in range(n_rows)],
+            "latitude": rng.uniform(-90, 90, n_rows),
+            "longitude": rng.uniform(-180, 180, n_rows),
+            "address": np.where(rng.random(n_rows) < 0.1, None, "1 Example Road"),
+            "city": "Hong Kong",
+            "country": "China",
+            "state": "",
+            "status": "Operating",
+            "subtype": "office",
+            "area": rng.uniform(100, 10000, n_rows),
+            "unit": "sqm",
+            "sector": "Real Estate",
+            "company_name": "Example",
+        }
+    )
+
+
+def outcome(validator, df: pd.DataFrame) -> tuple:
+    """(error type, name of the failing check, last line of every check warning) of a
+    validation.
+    """
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        try:
+            validator(df)
+            error, check = None, None
+        except pa.errors.SchemaError as e:
+            error, check = type(e).__name__, getattr(e.check, "name", None)
+    # only the warnings of failing checks, pandera may also emit deprecation warnings
+    return error, check, sorted(
+        str(w.message).splitlines()[-1] for w in caught if issubclass(w.category, UserWarning)
+    )
+
+
+def test_named_builtin_checks_are_vectorised():
+    kinds = {
+        check.name: kind
+        for column_plan in get_plan(real_estate_schema).columns
+        for _, kind, check in column_plan.checks
+    }
+    assert kinds["latitude_range"] == "in_range"
+    assert kinds["longitude_range"] == "in_range"
+    assert kinds["ownership_pct_range"] == "in_range"
+    assert kinds["pct_occupied_range"] == "in_range"
+    assert kinds["missing_city"] == "missing_ratio"
+
+
+@pytest.mark.parametrize(
+    "make",
+    [
+        lambda df: df,
+        lambda df: df.assign(latitude=df["latitude"] + 200),
+        lambda df: df.assign(longitude=-df["longitude"].abs() - 181),
+        lambda df: df.assign(area=-df["area"]),
+        lambda df: df.assign(ownership=150.0),
+        lambda df: df.assign(pct_occupied=np.where(df.index % 2, 50.0, -1.0)),
+        lambda df: df.assign(sector="Mining"),
+        lambda df: df.assign(city=None),
+        lambda df: df.assign(area=np.nan),
+        lambda df: df.drop(columns=["unit"]),
+        lambda df: df.assign(extra=1),
+        lambda df: df.assign(city=[852 if i == 3 else "Hong Kong" for i in range(len(df))]),
+    ],
+    ids=[
+        "valid",
+        "latitude",
+        "longitude",
+        "area",
+        "ownership",
+        "pct_occupied",
+        "sector",
+        "missing_city",
+        "missing_area",
+        "area_without_unit",
+        "extra_column",
+        "number_in_string_column",
+    ],
+)
+def test_same_outcome_as_pandera(make):
+    df = make(portfolio())
+    assert outcome(lambda df: validate(real_estate_schema, df), df) == outcome(
+        real_estate_schema.validate, df
+    )
@@ -0,0 +1,95 @@
+import time
+import pytest
+from asset_mapping_scrapping.utils.work_queue import WorkQueue
+
+
+@pytest.fixture
+def queue():
+    queue = WorkQueue("queue.sqlite", lease_seconds=0.05, max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def expire(queue: WorkQueue) -> None:
+    time.sleep(queue.lease_seconds * 2)
+
+
+def test_sources_are_leased_in_config_order(queue):
+    run_id = queue.enqueue({"A": "https://a", "B": ["https://b1", "https://b2"]})
+    first = queue.lease("w1", run_id)
+    second = queue.lease("w2", run_id)
+    assert (first.source, first.url, first.attempts) == ("A", "https://a", 1)
+    assert (second.source, second.url) == ("B", ["https://b1", "https://b2"])
+    assert queue.lease("w3", run_id) is None
+    assert queue.status(run_id) == {"leased": 2}
+
+
+def test_expired_lease_is_leased_again(queue):
+    run_id = queue.enqueue({"A": "https://a"})
+    task = queue.lease("w1", run_id)
+    expire(queue)
+    retried = queue.lease("w2", run_id)
+    assert (retried.source, retried.attempts) == ("A", 2)
+    # the first worker lost its lease, its report is discarded
+    assert not queue.heartbeat(task, "w1")
+    assert not queue.complete(task, "w1", True, {"source_name": "A"})
+    assert queue.complete(retried, "w2", True, {"source_name": "A", "succeeded": True})
+    assert queue.is_finished(run_id)
+    assert queue.reports(run_id) == [{"source_name": "A", "succeeded": True}]
+
+
+def test_heartbeat_keeps_the_lease(queue):
+    run_id = queue.enqueue({"A": "https://a"})
+    task = queue.lease("w1", run_id)
+    for _ in range(3):
+        time.sleep(queue.lease_seconds / 2)
+        assert queue.heartbeat(task, "w1")
+        assert queue.lease("w2", run_id) is None
+
+
+def test_source_is_given_up_after_max_attempts(queue):
+    run_id = queue.enqueue({"A": "https://a"})
+    for _ in range(queue.max_attempts):
+        assert queue.lease("w", run_id) is not None
+        expire(queue)
+    assert queue.lease("w", run_id) is None
+    assert queue.is_finished(run_id)
+    [report] = queue.reports(run_id)
+    assert report["succeeded"] == 0
+    assert report["error"] == "lease expired 2 times"
+
+
+def test_reclaim_without_worker(queue):
+    run_id = queue.enqueue({"A": "https://a", "B": "https://b"})
+    queue.lease("w", run_id)
+    expire(queue)
+    assert queue.reclaim_expired(run_id) == 0
+    assert queue.status(run_id) == {"pending": 2}
+    assert queue.lease("w", run_id).attempts == 2
+    expire(queue)
+    assert queue.reclaim_expired(run_id) == 1
+    assert queue.status(run_id) == {"failed": 1, "pending": 1}
+
+
+def test_fail_unfinished(queue):
+    run_id = queue.enqueue({"A": "https://a", "B": "https://b"})
+    task = queue.lease("w", run_id)
+    assert queue.fail_unfinished(run_id, "timed out") == 2
+    assert queue.is_finished(run_id)
+    assert not queue.complete(task, "w", True, {})
+    assert [report["error"] for report in queue.reports(run_id)] == ["timed out"] * 2
+
+
+def test_wait_for_run_times_out_when_workers_died():
+    pytest.importorskip("requests")
+    from asset_mapping_scrapping.utils.runner import wait_for_run
+
+    queue = WorkQueue("queue.sqlite", lease_seconds=0.05)
+    run_id = queue.enqueue({"A": "https://a"})
+    queue.lease("dead worker", run_id)
+    queue.close()
+    start = time.monotonic()
+    [report] = wait_for_run("queue.sqlite", run_id, poll_interval=0.01, timeout=0.2)
+    assert time.monotonic() - start < 5
+    assert not report.succeeded
+    assert report.source_name == "A"